@@ -0,0 +1,17 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'run_at', 'queue_wait_ms', 'duration_ms', 'finished_date')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'locked_by', 'last_error')
+    readonly_fields = ('created_date', 'started_date', 'finished_date', 'locked_by', 'locked_at', 'queue_wait_ms', 'duration_ms')
+    actions = ['retry_jobs']
+
+    @admin.action(description='Retry selected jobs now')
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status='running').update(status='queued', run_at=timezone.now(), attempts=0)
+        self.message_user(request, f'{updated} job(s) queued for retry.')
@@ -0,0 +1,129 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.models import Avg, Count, Max, Q
+
+from jobs.models import Job
+from jobs.queue import claim_jobs, requeue_stale, run_job
+
+logger = logging.getLogger(__name__)
+
+
+def worker_loop(worker_id, stop, options):
+    """Claim and run jobs until stopped (or, with --once, until the queue is idle)"""
+    processed = 0
+    try:
+        while not stop.is_set():
+            try:
+                close_old_connections()
+                jobs = claim_jobs(worker_id, limit=options['batch'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    stop.wait(options['poll_interval'])
+                    continue
+                for job in jobs:
+                    run_job(job)
+                    processed += 1
+            except Exception:
+                # A transient database error ("database is locked") must not
+                # silently shrink the pool; jobs claimed but not finished are
+                # returned to the queue by requeue_stale()
+                logger.exception('Worker %s failed; retrying in %ss', worker_id, options['poll_interval'])
+                connections.close_all()
+                stop.wait(options['poll_interval'])
+                continue
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+    finally:
+        connections.close_all()
+    return processed
+
+
+def process_main(process_index, options, stop=None):
+    """One worker process: a pool of threads sharing a stop flag"""
+    stop = stop or threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+
+    prefix = f'{socket.gethostname()}:{os.getpid()}'
+    threads = [
+        threading.Thread(target=worker_loop, args=(f'{prefix}:{i}', stop, options), daemon=True)
+        for i in range(options['threads'])
+    ]
+    for thread in threads:
+        thread.start()
+
+    last_reap = 0.0
+    while any(thread.is_alive() for thread in threads):
+        if process_index == 0 and time.monotonic() - last_reap > 60:
+            # One reaper per pool is enough to recover jobs from dead workers
+            requeue_stale()
+            close_old_connections()
+            last_reap = time.monotonic()
+        for thread in threads:
+            thread.join(timeout=1)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers (processes x threads) against the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to fork')
+        parser.add_argument('--threads', type=int, default=4, help='Worker threads per process')
+        parser.add_argument('--batch', type=int, default=1, help='Jobs claimed per round trip')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Stop each thread after this many jobs (0 = no limit)')
+        parser.add_argument('--once', action='store_true', help='Exit once no runnable jobs are left')
+        parser.add_argument('--stats', action='store_true', help='Print per-task timing metrics and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.print_stats()
+
+        self.stdout.write(f'Starting {options["processes"]} process(es) x {options["threads"]} thread(s)')
+        if options['processes'] == 1:
+            process_main(0, options)
+            return
+
+        # Children must not inherit the parent's open database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=process_main, args=(i, options)) for i in range(options['processes'])]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+                process.join()
+
+    def print_stats(self):
+        rows = (
+            Job.objects.values('name')
+            .annotate(
+                total=Count('id'),
+                queued=Count('id', filter=Q(status='queued')),
+                running=Count('id', filter=Q(status='running')),
+                failed=Count('id', filter=Q(status='failed')),
+                avg_ms=Avg('duration_ms', filter=Q(status='succeeded')),
+                max_ms=Max('duration_ms', filter=Q(status='succeeded')),
+                avg_wait_ms=Avg('queue_wait_ms'),
+            )
+            .order_by('name')
+        )
+        self.stdout.write(f'{"task":40} {"total":>7} {"queued":>7} {"running":>7} {"failed":>7} {"avg ms":>9} {"max ms":>9} {"wait ms":>9}')
+        for row in rows:
+            self.stdout.write(
+                f'{row["name"]:40} {row["total"]:7} {row["queued"]:7} {row["running"]:7} {row["failed"]:7} '
+                f'{row["avg_ms"] or 0:9.1f} {row["max_ms"] or 0:9.1f} {row["avg_wait_ms"] or 0:9.1f}'
+            )
@@ -0,0 +1,137 @@
+"""
+A small database-backed job queue.
+
+Register work with ``@register`` in an app's ``tasks.py`` and hand it off from
+a view with ``enqueue('app.task_name', **kwargs)``; the row is written in the
+caller's transaction, so a job is never visible for data that was rolled back.
+
+Workers (``manage.py run_workers``) claim runnable jobs in priority order.
+On PostgreSQL the claim is ``SELECT ... FOR UPDATE SKIP LOCKED``; on SQLite,
+which serializes writers, it is a conditional ``UPDATE ... WHERE
+status = 'queued'`` so only one claimant can flip each row to running.
+Failures are retried with exponential backoff until ``max_attempts``.
+"""
+import random
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+_registry = {}
+
+
+def register(func=None, *, name=None):
+    """Register a task function; usable as ``@register`` or ``@register(name=...)``"""
+    def decorator(func):
+        task_name = name or f'{func.__module__.rsplit(".", 1)[0]}.{func.__name__}'
+        _registry[task_name] = func
+        return func
+    return decorator(func) if func is not None else decorator
+
+
+def get_task(name):
+    """Look up a registered task function by name"""
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'No task registered as "{name}".')
+
+
+def enqueue(name, *, priority=0, run_at=None, max_attempts=None, **payload):
+    """Queue a registered task with JSON-serializable keyword arguments"""
+    get_task(name)
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_once(name, *, priority=0, run_at=None, **payload):
+    """Queue a task unless an identical one is already waiting to run"""
+    pending = Job.objects.filter(name=name, status='queued', payload=payload).first()
+    return pending or enqueue(name, priority=priority, run_at=run_at, **payload)
+
+
+def claim_jobs(worker_id, limit=1):
+    """Atomically mark up to ``limit`` runnable jobs as running for this worker"""
+    now = timezone.now()
+    claim = f'{worker_id}:{uuid.uuid4().hex[:8]}'[:100]
+    runnable = Job.objects.filter(status='queued', run_at__lte=now).order_by('-priority', 'run_at', 'id')
+    claimed = {
+        'status': 'running',
+        'locked_by': claim,
+        'locked_at': now,
+        'started_date': now,
+        'attempts': F('attempts') + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(runnable.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**claimed)
+    else:
+        ids = list(runnable.values_list('id', flat=True)[:limit])
+        # Rows another worker claimed in the meantime no longer match status='queued'
+        Job.objects.filter(id__in=ids, status='queued').update(**claimed)
+
+    if not ids:
+        return []
+    return list(Job.objects.filter(id__in=ids, locked_by=claim))
+
+
+def backoff_delay(attempts):
+    """Exponential backoff with jitter for the given number of failed attempts"""
+    delay = min(settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1), settings.JOBS_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_job(job):
+    """Run one claimed job and record its outcome and timings"""
+    started = time.perf_counter()
+    became_runnable = max(job.created_date, job.run_at)
+    outcome = {
+        'queue_wait_ms': max(0.0, (job.started_date - became_runnable).total_seconds() * 1000),
+        'locked_by': None,
+        'locked_at': None,
+    }
+    try:
+        get_task(job.name)(**job.payload)
+    except Exception:
+        outcome['last_error'] = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            outcome['status'] = 'failed'
+            outcome['finished_date'] = timezone.now()
+        else:
+            outcome['status'] = 'queued'
+            outcome['run_at'] = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+    else:
+        outcome['status'] = 'succeeded'
+        outcome['finished_date'] = timezone.now()
+        outcome['last_error'] = None
+    outcome['duration_ms'] = (time.perf_counter() - started) * 1000
+
+    # Only write back if the claim is still ours (requeue_stale may have reclaimed it)
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**outcome)
+    for field, value in outcome.items():
+        setattr(job, field, value)
+    return job
+
+
+def requeue_stale(timeout=None):
+    """Return jobs whose worker died mid-run to the queue; returns how many"""
+    timeout = timeout if timeout is not None else settings.JOBS_LOCK_TIMEOUT
+    stale = Job.objects.filter(status='running', locked_at__lt=timezone.now() - timedelta(seconds=timeout))
+    released = {'locked_by': None, 'locked_at': None, 'last_error': 'Worker lock expired.'}
+    # A job that keeps killing its worker must not be retried forever
+    stale.filter(attempts__gte=F('max_attempts')).update(status='failed', finished_date=timezone.now(), **released)
+    return stale.update(status='queued', **released)
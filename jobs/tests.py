@@ -0,0 +1,100 @@
+import threading
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings, skipIfDBFeature
+from django.utils import timezone
+
+from .management.commands import run_workers
+from .models import Job
+from .queue import backoff_delay, claim_jobs, enqueue, register, run_job
+
+calls = []
+
+
+@register(name='jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@register(name='jobs.tests.fail')
+def fail():
+    raise ValueError('upstream timed out')
+
+
+WORKER_OPTIONS = {'batch': 1, 'once': True, 'poll_interval': 0, 'max_jobs': 0}
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_two_workers_never_claim_the_same_job(self):
+        for value in range(5):
+            enqueue('jobs.tests.record', value=value)
+        first = claim_jobs('worker-a', limit=3)
+        second = claim_jobs('worker-b', limit=3)
+        self.assertEqual((len(first), len(second)), (3, 2))
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(claim_jobs('worker-c', limit=3), [])
+
+    @skipIfDBFeature('has_select_for_update_skip_locked')
+    def test_claim_loses_a_job_taken_since_it_was_read(self):
+        job = enqueue('jobs.tests.record', value=1)
+        select = Job.objects.filter
+
+        def taken_meanwhile(*args, **kwargs):
+            if 'id__in' in kwargs and kwargs.get('status') == 'queued':
+                # Another worker flips the row between this one's read and its conditional UPDATE
+                select(pk=job.pk).update(status='running', locked_by='worker-a')
+            return select(*args, **kwargs)
+
+        with mock.patch.object(Job.objects, 'filter', side_effect=taken_meanwhile):
+            self.assertEqual(claim_jobs('worker-b'), [])
+        self.assertEqual(Job.objects.get().locked_by, 'worker-a')
+
+    @override_settings(JOBS_BACKOFF_BASE=10, JOBS_BACKOFF_MAX=60)
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        job = enqueue('jobs.tests.fail', max_attempts=2)
+        before = timezone.now()
+        run_job(claim_jobs('worker')[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('queued', 1, None))
+        self.assertIn('upstream timed out', job.last_error)
+        # 10s base, with up to 20% jitter
+        self.assertGreaterEqual((job.run_at - before).total_seconds(), 8)
+        self.assertEqual(claim_jobs('worker'), [])
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_job(claim_jobs('worker')[0])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.finished_date)
+
+    @override_settings(JOBS_BACKOFF_BASE=10, JOBS_BACKOFF_MAX=60)
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertTrue(8 <= backoff_delay(1) <= 12)
+        self.assertTrue(16 <= backoff_delay(2) <= 24)
+        self.assertTrue(48 <= backoff_delay(10) <= 72)
+
+
+class WorkerLoopTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_survives_a_database_error(self):
+        enqueue('jobs.tests.record', value='after the error')
+        failures = [OperationalError('database is locked')]
+
+        def flaky_claim(worker_id, limit=1):
+            if failures:
+                raise failures.pop()
+            return claim_jobs(worker_id, limit)
+
+        with mock.patch.object(run_workers, 'claim_jobs', flaky_claim):
+            with self.assertLogs(run_workers.logger, 'ERROR') as logs:
+                processed = run_workers.worker_loop('host:1:0', threading.Event(), WORKER_OPTIONS)
+        self.assertEqual(processed, 1)
+        self.assertEqual(calls, ['after the error'])
+        self.assertIn('host:1:0', logs.output[0])
+        self.assertIn('database is locked', logs.output[0])
@@ -1,16 +1,23 @@
-from django.contrib import admin
-from .models import Lead, Activity, TaskNote, Category, Product, LeadProduct
+from collections import defaultdict
+
+from django.contrib import admin, messages
+
+from .archive import restore_leads
+from .assignment import recount_open_leads
+from .dedup import merge_leads
+from .models import Lead, Activity, TaskNote, Category, Product, LeadProduct, LeadIngestItem, PackedRecording, DuplicateLead, ManagerCapacity, ArchivedLead, SavedLeadView
 
 @admin.register(Lead)
 class LeadAdmin(admin.ModelAdmin):
     list_display = ('name', 'number', 'email', 'lead_status', 'lead_stage', 'leadsource', 'pincode', 'created_date', 'lead_manager')
-    list_filter = ('lead_status', 'lead_stage', 'leadsource', 'created_date', 'lead_manager')
+    list_filter = ('lead_status', 'lead_stage', 'leadsource', 'territory', 'created_date', 'lead_manager')
     search_fields = ('name', 'email', 'number', 'pincode')
-    readonly_fields = ('lead_id', 'created_date')
+    readonly_fields = ('lead_id', 'territory', 'created_date')
+    actions = ['merge_selected']
     
     fieldsets = (
         ('Basic Information', {
-            'fields': ('lead_id', 'name', 'email', 'number', 'whatsapp_url', 'address', 'pincode')
+            'fields': ('lead_id', 'name', 'email', 'number', 'whatsapp_url', 'address', 'pincode', 'territory')
         }),
         ('Lead Management', {
             'fields': ('leadsource', 'lead_status', 'lead_stage', 'lead_manager', 'categories')
@@ -23,18 +30,32 @@ class LeadAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('lead_manager')
 
+    @admin.action(description='Merge selected leads into the oldest one')
+    def merge_selected(self, request, queryset):
+        leads = list(queryset.order_by('created_date'))
+        if len(leads) < 2:
+            self.message_user(request, 'Select at least two leads to merge.', messages.WARNING)
+            return
+        merged = merge_leads(leads[0], leads[1:])
+        self.message_user(request, f'Merged {merged} lead(s) into {leads[0]}.')
+
 
 @admin.register(Activity)
 class ActivityAdmin(admin.ModelAdmin):
     list_display = ('lead', 'activity_type', 'description', 'created_by', 'created_date', 'due_date', 'priority', 'is_completed', 'recording')
     list_filter = ('activity_type', 'priority', 'is_completed', 'created_date', 'due_date', 'created_by')
     search_fields = ('lead__name', 'description', 'created_by__username')
-    readonly_fields = ('created_date',)
+    readonly_fields = ('created_date', 'recording_duration', 'recording_bitrate', 'recording_size', 'recording_codec', 'recording_checksum')
     
     fieldsets = (
         ('Activity Information', {
             'fields': ('lead', 'activity_type', 'description', 'recording', 'created_by', 'created_date')
         }),
+        ('Recording Details', {
+            'fields': ('recording_duration', 'recording_bitrate', 'recording_size', 'recording_codec', 'recording_checksum'),
+            'classes': ('collapse',),
+            'description': 'Read from the recording file in the background after upload.'
+        }),
         ('Task Details', {
             'fields': ('due_date', 'priority', 'is_completed'),
             'description': 'These fields are only relevant for task-type activities.'
@@ -76,7 +97,7 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('category', 'name', 'description', 'is_active', 'created_date')
         }),
         ('Pricing', {
-            'fields': ('price',),
+            'fields': ('price', 'url'),
         }),
     )
     
@@ -102,3 +123,108 @@ class LeadProductAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('lead', 'product', 'product__category')
+
+
+@admin.register(LeadIngestItem)
+class LeadIngestItemAdmin(admin.ModelAdmin):
+    list_display = ('idempotency_key', 'source', 'status', 'phone_normalized', 'lead', 'received_date', 'processed_date')
+    list_filter = ('status', 'source', 'received_date')
+    search_fields = ('idempotency_key', 'phone_normalized')
+    readonly_fields = ('received_date', 'processed_date', 'batch_id')
+    raw_id_fields = ('lead',)
+
+
+@admin.register(PackedRecording)
+class PackedRecordingAdmin(admin.ModelAdmin):
+    list_display = ('name', 'pack', 'codec', 'size', 'length', 'archived_date', 'verified_date')
+    list_filter = ('pack', 'codec', 'archived_date')
+    search_fields = ('name', 'checksum')
+    readonly_fields = ('name', 'pack', 'offset', 'length', 'size', 'codec', 'checksum', 'archived_date', 'verified_date')
+
+
+@admin.register(DuplicateLead)
+class DuplicateLeadAdmin(admin.ModelAdmin):
+    list_display = ('lead', 'duplicate_of', 'reason', 'dismissed', 'detected_date')
+    list_filter = ('reason', 'dismissed', 'detected_date')
+    search_fields = ('lead__name', 'lead__number', 'lead__email', 'duplicate_of__name', 'duplicate_of__number', 'duplicate_of__email')
+    readonly_fields = ('lead', 'duplicate_of', 'reason', 'detected_date')
+    actions = ['merge_flagged', 'dismiss_flagged']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('lead', 'duplicate_of')
+
+    @admin.action(description='Merge flagged leads into the original lead')
+    def merge_flagged(self, request, queryset):
+        groups = defaultdict(list)
+        for flag in queryset.filter(dismissed=False).select_related('lead', 'duplicate_of'):
+            groups[flag.duplicate_of].append(flag.lead)
+        merged = sum(merge_leads(survivor, duplicates) for survivor, duplicates in groups.items())
+        self.message_user(request, f'Merged {merged} lead(s).')
+
+    @admin.action(description='Dismiss: not duplicates')
+    def dismiss_flagged(self, request, queryset):
+        dismissed = queryset.update(dismissed=True)
+        self.message_user(request, f'Dismissed {dismissed} flag(s).')
+
+
+@admin.register(ManagerCapacity)
+class ManagerCapacityAdmin(admin.ModelAdmin):
+    list_display = ('user', 'is_accepting', 'weight', 'max_open_leads', 'open_leads', 'last_assigned_date')
+    list_editable = ('is_accepting', 'weight', 'max_open_leads')
+    list_filter = ('is_accepting',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    readonly_fields = ('open_leads', 'last_assigned_date')
+    actions = ['recount']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+    @admin.action(description='Recount open leads from the lead table')
+    def recount(self, request, queryset):
+        corrected = recount_open_leads()
+        self.message_user(request, f'Corrected {corrected} counter(s).')
+
+
+@admin.register(ArchivedLead)
+class ArchivedLeadAdmin(admin.ModelAdmin):
+    list_display = ('name', 'number', 'email', 'lead_status', 'lead_stage', 'created_date', 'archived_date', 'lead_manager')
+    list_filter = ('lead_status', 'lead_stage', 'archived_date')
+    search_fields = ('name', 'email', 'number', 'pincode')
+    actions = ['restore_selected']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('lead_manager')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        # Archived rows are only ever restored, not edited in place
+        return False
+
+    @admin.action(description='Restore selected leads to the active lead list')
+    def restore_selected(self, request, queryset):
+        restored = restore_leads(list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Restored {restored} lead(s).')
+
+
+@admin.register(SavedLeadView)
+class SavedLeadViewAdmin(admin.ModelAdmin):
+    list_display = ('name', 'owner', 'is_shared', 'result_count', 'built_date', 'refreshed_date', 'is_stale')
+    list_filter = ('is_shared', 'is_stale')
+    search_fields = ('name', 'owner__username')
+    readonly_fields = ('result_count', 'built_date', 'refreshed_date', 'is_stale')
+    actions = ['rebuild_selected']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('owner').defer('lead_ids', 'lead_index')
+
+    def save_model(self, request, obj, form, change):
+        # The filters may have changed; rebuild the cached results when next opened
+        obj.is_stale = True
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description='Rebuild cached results when next opened')
+    def rebuild_selected(self, request, queryset):
+        marked = queryset.update(is_stale=True)
+        self.message_user(request, f'Marked {marked} saved view(s) for rebuilding.')
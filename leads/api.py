@@ -0,0 +1,345 @@
+"""
+Read-only JSON API (v1) over leads, activities, tasks and task notes.
+
+Every list endpoint supports:
+
+* ``fields=a,b,c`` - sparse fieldsets (see the ``*_FIELDS`` maps below)
+* ``cursor=...`` / ``limit=N`` - keyset pagination on ``(-created_date, -pk)``
+* the same filters as the matching HTML view (``filter_leads``/``filter_tasks``)
+* ``ETag``/``If-None-Match`` (the detail endpoint also sends
+  ``Last-Modified`` for ``If-Modified-Since``; a list's newest timestamp does
+  not change when a row is deleted, so lists are validated by ETag only)
+
+Freshness is computed from a single ``COUNT``/``MAX(updated_date)`` aggregate,
+so an unchanged poll is answered with a 304 before any row is fetched. Rows
+are read with ``values_list()`` and zipped into dicts, no model instances are
+built on the hot path.
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime
+from functools import wraps
+from typing import NamedTuple
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Q, QuerySet
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_GET
+
+from .filters import filter_leads, filter_tasks
+from .models import Lead, Activity, TaskNote
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# API field name -> ORM path passed to values_list()
+LEAD_FIELDS = {
+    'lead_id': 'lead_id',
+    'name': 'name',
+    'email': 'email',
+    'number': 'number',
+    'whatsapp_url': 'whatsapp_url',
+    'address': 'address',
+    'pincode': 'pincode',
+    'leadsource': 'leadsource',
+    'lead_status': 'lead_status',
+    'lead_stage': 'lead_stage',
+    'notes': 'notes',
+    'remarks': 'remarks',
+    'products_data': 'products_data',
+    'lead_manager': 'lead_manager__username',
+    'created_date': 'created_date',
+    'updated_date': 'updated_date',
+}
+LEAD_DEFAULT_FIELDS = ('lead_id', 'name', 'number', 'email', 'pincode', 'lead_status', 'lead_stage', 'updated_date')
+
+ACTIVITY_FIELDS = {
+    'id': 'id',
+    'lead_id': 'lead_id',
+    'lead_name': 'lead__name',
+    'lead_number': 'lead__number',
+    'activity_type': 'activity_type',
+    'description': 'description',
+    'recording': 'recording',
+    'due_date': 'due_date',
+    'priority': 'priority',
+    'is_completed': 'is_completed',
+    'created_by': 'created_by__username',
+    'created_date': 'created_date',
+    'updated_date': 'updated_date',
+}
+ACTIVITY_DEFAULT_FIELDS = ('id', 'lead_id', 'activity_type', 'description', 'created_by', 'created_date')
+TASK_DEFAULT_FIELDS = ('id', 'lead_id', 'lead_name', 'description', 'due_date', 'priority', 'is_completed', 'updated_date')
+
+NOTE_FIELDS = {
+    'id': 'id',
+    'task_id': 'activity_id',
+    'note': 'note',
+    'created_by': 'created_by__username',
+    'created_date': 'created_date',
+}
+NOTE_DEFAULT_FIELDS = ('id', 'task_id', 'note', 'created_by', 'created_date')
+
+
+class ApiError(Exception):
+    """Client error reported as a JSON body with a 400 status"""
+
+
+def api_login_required(view_func):
+    """Like login_required, but answers 401 JSON instead of redirecting"""
+    if iscoroutinefunction(view_func):
+        async def _wrapped_view(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return JsonResponse({'error': 'Authentication required.'}, status=401)
+            try:
+                return await view_func(request, *args, **kwargs)
+            except ApiError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+    else:
+        def _wrapped_view(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({'error': 'Authentication required.'}, status=401)
+            try:
+                return view_func(request, *args, **kwargs)
+            except ApiError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+    _wrapped_view = wraps(view_func)(_wrapped_view)
+    if iscoroutinefunction(view_func):
+        markcoroutinefunction(_wrapped_view)
+    return _wrapped_view
+
+
+def parse_fields(params, field_map, default_fields):
+    """Resolve the ``fields`` query parameter against a resource's field map"""
+    requested = params.get('fields', '')
+    if not requested:
+        return list(default_fields)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in field_map]
+    if unknown:
+        raise ApiError(f'Unknown field(s): {", ".join(unknown)}.')
+    return names
+
+
+def parse_limit(params):
+    """Read the page size, clamped to MAX_PAGE_SIZE"""
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit must be an integer.')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(created_date, pk):
+    """Opaque cursor pointing just past the given row"""
+    raw = json.dumps([created_date.isoformat(), str(pk)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model):
+    """Inverse of encode_cursor for a model's rows; raises ApiError for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        decoded = json.loads(raw)
+        if not (isinstance(decoded, list) and len(decoded) == 2 and all(isinstance(part, str) for part in decoded)):
+            raise ApiError('Invalid cursor.')
+        created_date = datetime.fromisoformat(decoded[0])
+        if created_date.tzinfo is None:
+            raise ApiError('Invalid cursor.')
+        # UUID for leads, integer for activities and notes
+        return created_date, model._meta.pk.to_python(decoded[1])
+    except (ValueError, TypeError, ValidationError):
+        raise ApiError('Invalid cursor.')
+
+
+def freshness_paths(field_map, fields, own_path):
+    """Timestamps whose maximum changes whenever the selected payload can change"""
+    paths = [own_path]
+    if any(field_map[name].startswith('lead__') for name in fields):
+        paths.append('lead__updated_date')
+    return paths
+
+
+def freshness_aggregates(version_paths):
+    """Aggregate expressions used to validate a cached response"""
+    aggregates = {f'max_{i}': Max(path) for i, path in enumerate(version_paths)}
+    aggregates['total'] = Count('pk')
+    return aggregates
+
+
+def validators(request, state, dated=False):
+    """
+    Build the (etag, last_modified) pair from a freshness_aggregates() result.
+
+    The validators come from the row count (catches deletes) and the max of
+    the version timestamps. The full path, including cursor/fields/filters,
+    is folded into the ETag so every page and projection is validated
+    separately. last_modified is None unless dated: on its own it misses
+    deletes, so only the single-lead response sends it.
+    """
+    stamps = [value for key, value in sorted(state.items()) if key.startswith('max_') and value is not None]
+    # Whole seconds, as http_date() sends it; a fractional part would never compare equal
+    last_modified = int(max(stamps).timestamp()) if stamps and dated else None
+    fingerprint = '|'.join([request.get_full_path(), str(state['total'])] + [s.isoformat() for s in stamps])
+    return '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest(), last_modified
+
+
+def finalize(response, etag, last_modified):
+    """Attach validators and revalidate-always caching headers"""
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_json(request, queryset, version_paths, build_payload, dated=False):
+    """Answer with 304 when the client's ETag (or, when dated, Last-Modified) still matches"""
+    state = queryset.order_by().aggregate(**freshness_aggregates(version_paths))
+    etag, last_modified = validators(request, state, dated)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        payload = build_payload(state['total'])
+        if isinstance(payload, JsonResponse):
+            return payload
+        response = JsonResponse(payload)
+    return finalize(response, etag, last_modified)
+
+
+def page_queryset(queryset, field_map, fields, params):
+    """Keyset-filtered values_list() for one page, plus the page size"""
+    limit = parse_limit(params)
+    queryset = queryset.order_by('-created_date', '-pk')
+
+    cursor = params.get('cursor')
+    if cursor:
+        created_date, pk = decode_cursor(cursor, queryset.model)
+        queryset = queryset.filter(Q(created_date__lt=created_date) | Q(created_date=created_date, pk__lt=pk))
+
+    # The two trailing columns are only used to build the next cursor;
+    # zip() stops at the last requested field name.
+    paths = [field_map[name] for name in fields] + ['created_date', 'pk']
+    return queryset.values_list(*paths)[:limit + 1], limit
+
+
+def page_payload(rows, fields, limit):
+    """Turn fetched tuples into the results/next_cursor payload"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'results': [dict(zip(fields, row)) for row in rows],
+        'next_cursor': encode_cursor(rows[-1][-2], rows[-1][-1]) if has_more else None,
+    }
+
+
+def fetch_page(queryset, field_map, fields, params):
+    """Serialize one keyset page straight from values_list() tuples"""
+    rows, limit = page_queryset(queryset, field_map, fields, params)
+    return page_payload(list(rows), fields, limit)
+
+
+class ApiQuery(NamedTuple):
+    """What an endpoint reads, built once for the sync view and its async twin in async_views.py"""
+    queryset: QuerySet
+    field_map: dict
+    fields: list
+    version_paths: list
+
+
+def lead_list_query(params):
+    fields = parse_fields(params, LEAD_FIELDS, LEAD_DEFAULT_FIELDS)
+    return ApiQuery(filter_leads(Lead.objects.all(), params), LEAD_FIELDS, fields, ['updated_date'])
+
+
+def lead_detail_query(params, lead_id):
+    fields = parse_fields(params, LEAD_FIELDS, LEAD_FIELDS.keys())
+    return ApiQuery(Lead.objects.filter(lead_id=lead_id), LEAD_FIELDS, fields, ['updated_date'])
+
+
+def lead_activities_query(params, lead_id):
+    fields = parse_fields(params, ACTIVITY_FIELDS, ACTIVITY_DEFAULT_FIELDS)
+    queryset = Activity.objects.filter(lead_id=lead_id)
+    activity_type = params.get('type', '')
+    if activity_type:
+        queryset = queryset.filter(activity_type=activity_type)
+    return ApiQuery(queryset, ACTIVITY_FIELDS, fields, freshness_paths(ACTIVITY_FIELDS, fields, 'updated_date'))
+
+
+def task_list_query(params, user):
+    fields = parse_fields(params, ACTIVITY_FIELDS, TASK_DEFAULT_FIELDS)
+    queryset = filter_tasks(Activity.objects.filter(activity_type='task'), params, user=user)
+    return ApiQuery(queryset, ACTIVITY_FIELDS, fields, freshness_paths(ACTIVITY_FIELDS, fields, 'updated_date'))
+
+
+def task_notes_query(params, activity_id):
+    fields = parse_fields(params, NOTE_FIELDS, NOTE_DEFAULT_FIELDS)
+    # Notes are append-only, so created_date doubles as the change marker
+    return ApiQuery(TaskNote.objects.filter(activity_id=activity_id), NOTE_FIELDS, fields, ['created_date'])
+
+
+def detail_row_queryset(query):
+    return query.queryset.values_list(*[query.field_map[name] for name in query.fields])
+
+
+def detail_payload(query, row):
+    """The single-row payload, or a 404 response when the row is gone"""
+    if row is None:
+        return JsonResponse({'error': 'Lead not found.'}, status=404)
+    return dict(zip(query.fields, row))
+
+
+def list_json(request, query):
+    """Conditional, keyset-paginated list response for an ApiQuery"""
+    return conditional_json(
+        request, query.queryset, query.version_paths,
+        lambda total: dict(fetch_page(query.queryset, query.field_map, query.fields, request.GET), count=total),
+    )
+
+
+@api_login_required
+@require_GET
+def lead_list_api(request):
+    """GET /leads/api/v1/leads/ - filtered, paginated leads"""
+    return list_json(request, lead_list_query(request.GET))
+
+
+@api_login_required
+@require_GET
+def lead_detail_api(request, lead_id):
+    """GET /leads/api/v1/leads/<lead_id>/ - a single lead"""
+    query = lead_detail_query(request.GET, lead_id)
+    return conditional_json(
+        request, query.queryset, query.version_paths,
+        lambda total: detail_payload(query, detail_row_queryset(query).first()), dated=True,
+    )
+
+
+@api_login_required
+@require_GET
+def lead_activities_api(request, lead_id):
+    """GET /leads/api/v1/leads/<lead_id>/activities/ - a lead's activity history"""
+    get_object_or_404(Lead.objects.only('lead_id'), lead_id=lead_id)
+    return list_json(request, lead_activities_query(request.GET, lead_id))
+
+
+@api_login_required
+@require_GET
+def task_list_api(request):
+    """GET /leads/api/v1/tasks/ - task activities with the task board filters"""
+    return list_json(request, task_list_query(request.GET, request.user))
+
+
+@api_login_required
+@require_GET
+def task_notes_api(request, activity_id):
+    """GET /leads/api/v1/tasks/<activity_id>/notes/ - notes on a task"""
+    get_object_or_404(Activity.objects.only('id'), id=activity_id, activity_type='task')
+    return list_json(request, task_notes_query(request.GET, activity_id))
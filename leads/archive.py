@@ -0,0 +1,239 @@
+"""
+Hot/cold partitioning of leads.
+
+Leads that are done with (``inactive``, or in a LEAD_ARCHIVE_STAGES stage),
+untouched for LEAD_ARCHIVE_AFTER_DAYS and without open tasks are moved, with
+their activities, task notes, category links and product lines, into the
+parallel ``Archived*`` tables by ``manage.py archive_leads``. Rows keep their
+primary keys, so URLs and recording names stay valid and a restore puts
+everything back exactly. The lead list, search, task board and API read the
+hot tables only; ``CombinedLeadList`` serves the lead list's "include
+archived" mode.
+
+An archived lead is restored transparently when someone adds an activity to
+it or saves it, and when the same phone number comes in again through the
+ingestion webhook.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Value
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .assignment import adjust_open_leads
+from .models import (
+    Activity, ArchivedActivity, ArchivedLead, ArchivedTaskNote, Lead, LeadIngestItem, LeadProduct, Product, TaskNote,
+)
+from .saved_views import invalidate_saved_views
+
+
+def cold_leads(now=None):
+    """Leads that qualify for archiving"""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.LEAD_ARCHIVE_AFTER_DAYS)
+    open_tasks = Activity.objects.open().filter(lead=OuterRef('pk'))
+    recent_activity = Activity.objects.filter(lead=OuterRef('pk'), created_date__gte=cutoff)
+    return (
+        Lead.objects.filter(Q(lead_status__in=settings.LEAD_ARCHIVE_STATUSES) | Q(lead_stage__in=settings.LEAD_ARCHIVE_STAGES))
+        .filter(updated_date__lt=cutoff)
+        .exclude(Exists(open_tasks))
+        .exclude(Exists(recent_activity))
+    )
+
+
+def copy_row(source, model, **values):
+    """Unsaved model instance with every column the source also has, plus values"""
+    for field in model._meta.concrete_fields:
+        if field.attname in values or not hasattr(source, field.attname):
+            continue
+        value = getattr(source, field.attname)
+        if isinstance(value, FieldFile):
+            value = value.name
+        values[field.attname] = value
+    return model(**values)
+
+
+def create_copies(model, rows, batch_size):
+    """bulk_create copied rows, keeping the updated_date they were copied with (auto_now stamps the insert)"""
+    stamps = [row.updated_date for row in rows]
+    model.objects.bulk_create(rows, batch_size=batch_size)
+    for row, stamp in zip(rows, stamps):
+        row.updated_date = stamp
+    model.objects.bulk_update(rows, ['updated_date'], batch_size=batch_size)
+
+
+def product_lines(lead_ids):
+    """{lead_id: [LeadProduct row as JSON]}"""
+    lines = defaultdict(list)
+    rows = LeadProduct.objects.filter(lead_id__in=lead_ids).values(
+        'lead_id', 'product_id', 'quantity', 'notes', 'price_quoted', 'created_date'
+    )
+    for row in rows:
+        lead_id = row.pop('lead_id')
+        row['price_quoted'] = None if row['price_quoted'] is None else str(row['price_quoted'])
+        row['created_date'] = row['created_date'].isoformat()
+        lines[lead_id].append(row)
+    return lines
+
+
+def ingest_items(lead_ids):
+    """{lead_id: [LeadIngestItem id]}; deleting the lead would otherwise lose the link for good"""
+    items = defaultdict(list)
+    for item_id, lead_id in LeadIngestItem.objects.filter(lead_id__in=lead_ids).values_list('id', 'lead_id'):
+        items[lead_id].append(item_id)
+    return items
+
+
+def relink_ingest_items(archived):
+    """Point ingest items back at their restored leads"""
+    owners = {item_id: lead.pk for lead in archived for item_id in lead.ingest_item_ids}
+    items = list(LeadIngestItem.objects.filter(pk__in=owners, lead__isnull=True).only('id'))
+    for item in items:
+        item.lead_id = owners[item.pk]
+    LeadIngestItem.objects.bulk_update(items, ['lead'], batch_size=1000)
+
+
+def open_load(leads):
+    """{manager id: open leads} for lead objects"""
+    return Counter(lead.lead_manager_id for lead in leads if lead.is_open())
+
+
+def archive_leads(lead_ids, now=None):
+    """Move the given leads (those still cold) and everything under them to the archive; returns leads moved"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Re-checked under lock: a lead may have been touched since it was picked
+        leads = list(cold_leads(now).filter(pk__in=lead_ids).select_for_update())
+        if not leads:
+            return 0
+        ids = [lead.pk for lead in leads]
+        products, items = product_lines(ids), ingest_items(ids)
+        create_copies(
+            ArchivedLead,
+            [
+                copy_row(lead, ArchivedLead, lead_products=products[lead.pk], ingest_item_ids=items[lead.pk], archived_date=now)
+                for lead in leads
+            ],
+            500,
+        )
+        through = ArchivedLead.categories.through
+        through.objects.bulk_create(
+            [
+                through(archivedlead_id=lead_id, category_id=category_id)
+                for lead_id, category_id in Lead.categories.through.objects.filter(lead_id__in=ids).values_list('lead_id', 'category_id')
+            ],
+            batch_size=1000,
+        )
+        create_copies(
+            ArchivedActivity, [copy_row(activity, ArchivedActivity) for activity in Activity.objects.filter(lead_id__in=ids).order_by('id')], 500
+        )
+        ArchivedTaskNote.objects.bulk_create(
+            [copy_row(note, ArchivedTaskNote) for note in TaskNote.objects.filter(activity__lead_id__in=ids).order_by('id')],
+            batch_size=1000,
+        )
+        # Cascades to the activities, notes, product lines and category links just copied;
+        # ingest items are set to NULL and re-linked from ingest_item_ids on restore
+        Lead.objects.filter(pk__in=ids).delete()
+        invalidate_saved_views(ids)
+        adjust_open_leads({user_id: -n for user_id, n in open_load(leads).items()})
+    return len(ids)
+
+
+def restore_leads(lead_ids):
+    """Move archived leads and everything under them back to the hot tables; returns leads restored"""
+    with transaction.atomic():
+        archived = list(ArchivedLead.objects.select_for_update().filter(pk__in=lead_ids))
+        if not archived:
+            return 0
+        ids = [lead.pk for lead in archived]
+        create_copies(Lead, [copy_row(lead, Lead) for lead in archived], 500)
+        through = Lead.categories.through
+        through.objects.bulk_create(
+            [
+                through(lead_id=lead_id, category_id=category_id)
+                for lead_id, category_id in ArchivedLead.categories.through.objects.filter(archivedlead_id__in=ids).values_list('archivedlead_id', 'category_id')
+            ],
+            batch_size=1000,
+        )
+        lines = [(lead.pk, line) for lead in archived for line in lead.lead_products]
+        # Products deleted in the meantime are dropped rather than breaking the restore
+        existing_products = set(Product.objects.filter(id__in={line['product_id'] for _, line in lines}).values_list('id', flat=True))
+        LeadProduct.objects.bulk_create(
+            [
+                LeadProduct(
+                    lead_id=lead_id,
+                    product_id=line['product_id'],
+                    quantity=line['quantity'],
+                    notes=line['notes'],
+                    price_quoted=None if line['price_quoted'] is None else Decimal(line['price_quoted']),
+                    created_date=parse_datetime(line['created_date']),
+                )
+                for lead_id, line in lines
+                if line['product_id'] in existing_products
+            ],
+            ignore_conflicts=True,
+        )
+        create_copies(
+            Activity, [copy_row(activity, Activity) for activity in ArchivedActivity.objects.filter(lead_id__in=ids).order_by('id')], 500
+        )
+        TaskNote.objects.bulk_create(
+            [copy_row(note, TaskNote) for note in ArchivedTaskNote.objects.filter(activity__lead_id__in=ids).order_by('id')],
+            batch_size=1000,
+        )
+        relink_ingest_items(archived)
+        ArchivedLead.objects.filter(pk__in=ids).delete()
+        invalidate_saved_views()
+        adjust_open_leads(open_load(archived))
+    return len(ids)
+
+
+def get_hot_lead(lead_id):
+    """The Lead with this id, restored from the archive first if it was archived; None if it does not exist"""
+    lead = Lead.objects.filter(pk=lead_id).first()
+    if lead is None and restore_leads([lead_id]):
+        lead = Lead.objects.filter(pk=lead_id).first()
+    return lead
+
+
+class CombinedLeadList:
+    """
+    Hot and archived leads matching the same filters, newest first, for Paginator.
+
+    Each page is one UNION ALL over (created_date, lead_id) of both tables,
+    followed by one lookup per table for the rows on the page. With fields,
+    the rows are values() dicts of those fields plus 'is_archived'.
+    """
+
+    def __init__(self, hot, archived, fields=None):
+        self.hot = hot
+        self.archived = archived
+        self.fields = fields
+
+    def lookup(self, model, lead_ids, archived):
+        if self.fields is None:
+            return model.objects.select_related('lead_manager').in_bulk(lead_ids)
+        rows = model.objects.filter(pk__in=lead_ids).values(*self.fields)
+        return {row['lead_id']: {**row, 'is_archived': archived} for row in rows}
+
+    def count(self):
+        return self.hot.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        keys = (
+            self.hot.order_by().values_list('created_date', 'lead_id').annotate(archived=Value(False))
+            .union(self.archived.order_by().values_list('created_date', 'lead_id').annotate(archived=Value(True)), all=True)
+            .order_by('-created_date', '-lead_id')[index]
+        )
+        keys = list(keys)
+        hot = self.lookup(Lead, [lead_id for _, lead_id, archived in keys if not archived], False)
+        cold = self.lookup(ArchivedLead, [lead_id for _, lead_id, archived in keys if archived], True)
+        return [(cold if archived else hot)[lead_id] for _, lead_id, archived in keys]
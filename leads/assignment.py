@@ -0,0 +1,222 @@
+"""
+Automatic lead assignment.
+
+Managers with an accepting ``ManagerCapacity`` entry share new leads by one of
+three strategies (``LEAD_ASSIGNMENT_STRATEGY``):
+
+- ``round_robin``: in turn, starting with whoever was assigned longest ago;
+- ``weighted``: so that open leads stay proportional to each manager's weight;
+- ``least_loaded``: to whoever has the fewest open leads.
+
+``max_open_leads`` caps every strategy. Load comes from
+``ManagerCapacity.open_leads``, which is adjusted by +/-n whenever a lead is
+assigned, reassigned, closed, reopened or deleted, so choosing a manager
+never counts leads with a GROUP BY. ``recount_open_leads`` rebuilds the
+counters if they drift (e.g. after raw SQL or queryset deletes).
+
+Assignment locks the accepting capacity rows (SELECT ... FOR UPDATE, in
+primary-key order) for the length of the transaction, so concurrent ingestion
+batches take turns instead of both handing leads to the same manager.
+Counter writes are relative (``F() + n``), so they stay correct even on
+backends without row locks.
+"""
+import heapq
+from collections import Counter
+from datetime import timedelta
+from itertools import count
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .counters import invalidate_task_counts
+from .models import Lead, ManagerCapacity
+
+STRATEGIES = ('round_robin', 'weighted', 'least_loaded')
+UNCHANGED = object()
+
+
+def adjust_open_leads(deltas):
+    """Apply {user_id: +/-n} to the managers' open-lead counters"""
+    for user_id, delta in deltas.items():
+        if user_id and delta:
+            ManagerCapacity.objects.filter(user_id=user_id).update(open_leads=Greatest(F('open_leads') + delta, Value(0)))
+
+
+def move_load(before, after):
+    """Move one lead's count between (manager id, open) states; returns after"""
+    if before != after:
+        deltas = Counter()
+        if before[1]:
+            deltas[before[0]] -= 1
+        if after[1]:
+            deltas[after[0]] += 1
+        adjust_open_leads(deltas)
+    return after
+
+
+def load_groups(leads):
+    """Current (manager id, stage) -> lead count for a queryset; grouped by the few distinct pairs"""
+    rows = leads.order_by().values_list('lead_manager_id', 'lead_stage').annotate(leads=Count('pk'))
+    return {(manager_id, stage): n for manager_id, stage, n in rows}
+
+
+def update_deltas(groups, lead_manager=UNCHANGED, lead_stage=UNCHANGED):
+    """Counter changes for setting lead_manager and/or lead_stage on every lead in groups"""
+    closed = settings.LEAD_CLOSED_STAGES
+    deltas = Counter()
+    for (manager_id, stage), n in groups.items():
+        if stage not in closed:
+            deltas[manager_id] -= n
+        new_manager_id = manager_id if lead_manager is UNCHANGED else getattr(lead_manager, 'pk', lead_manager)
+        new_stage = stage if lead_stage is UNCHANGED else lead_stage
+        if new_stage not in closed:
+            deltas[new_manager_id] += n
+    return deltas
+
+
+def choose_managers(capacities, number, strategy):
+    """
+    Manager user ids for ``number`` new leads (None once everyone is full).
+
+    Works on in-memory copies of the capacities with a heap, so a batch of
+    thousands of leads costs no queries; ``open_leads`` is advanced on the
+    given objects as leads are handed out.
+    """
+    order = count()
+    if strategy == 'round_robin':
+        # Longest since last assignment first; never-assigned managers before everyone
+        capacities = sorted(capacities, key=lambda c: (c.last_assigned_date is not None, c.last_assigned_date, c.pk))
+
+    def key(capacity, turn):
+        if strategy == 'weighted':
+            return (capacity.open_leads + 1) / max(capacity.weight, 1), turn
+        if strategy == 'least_loaded':
+            return capacity.open_leads, turn
+        return turn, 0
+
+    def has_room(capacity):
+        return capacity.max_open_leads is None or capacity.open_leads < capacity.max_open_leads
+
+    heap = []
+    for capacity in capacities:
+        if has_room(capacity):
+            turn = next(order)
+            heapq.heappush(heap, (key(capacity, turn), turn, capacity))
+
+    picks = []
+    for _ in range(number):
+        if not heap:
+            picks.append(None)
+            continue
+        _, _, capacity = heapq.heappop(heap)
+        picks.append(capacity.user_id)
+        capacity.open_leads += 1
+        if has_room(capacity):
+            turn = next(order)
+            heapq.heappush(heap, (key(capacity, turn), turn, capacity))
+    return picks
+
+
+def accepting_capacities():
+    """Locked capacity rows of managers that take new leads, in lock order"""
+    return list(
+        ManagerCapacity.objects.select_for_update()
+        .filter(is_accepting=True, user__is_active=True)
+        .order_by('pk')
+    )
+
+
+def record_assignments(picks, now):
+    """
+    Add the picked leads to the counters with one UPDATE per manager.
+
+    last_assigned_date follows the order of each manager's last pick in the
+    batch, a microsecond apart and ending at now, so the next round-robin
+    batch carries on the rotation instead of breaking a tie by primary key.
+    """
+    last_pick = {user_id: position for position, user_id in enumerate(picks) if user_id}
+    counts = Counter(user_id for user_id in picks if user_id)
+    rotation = sorted(last_pick, key=last_pick.get)
+    for rank, user_id in enumerate(rotation):
+        stamp = now - timedelta(microseconds=len(rotation) - 1 - rank)
+        ManagerCapacity.objects.filter(user_id=user_id).update(open_leads=F('open_leads') + counts[user_id], last_assigned_date=stamp)
+
+
+def assign_leads(leads, strategy=None):
+    """
+    Give unsaved or unassigned Lead objects a manager and count them.
+
+    Sets ``lead_manager_id`` on the objects; the caller saves them (e.g. with
+    ``bulk_create``) in the same transaction. Returns the number assigned.
+    """
+    strategy = strategy or settings.LEAD_ASSIGNMENT_STRATEGY
+    leads = [lead for lead in leads if lead.lead_manager_id is None and lead.is_open()]
+    if not leads:
+        return 0
+    with transaction.atomic():
+        picks = choose_managers(accepting_capacities(), len(leads), strategy)
+        for lead, user_id in zip(leads, picks):
+            lead.lead_manager_id = user_id
+            # Already counted; Lead.save() must not count it again
+            lead._counted_load = lead.load()
+        record_assignments(picks, timezone.now())
+    return sum(1 for user_id in picks if user_id)
+
+
+def distribute_leads(leads, strategy=None):
+    """
+    (Re)assign every open lead in a queryset by the strategy, e.g. a bulk import.
+
+    Returns {user_id: leads assigned}. One UPDATE per manager; closed leads are
+    left as they are.
+    """
+    strategy = strategy or settings.LEAD_ASSIGNMENT_STRATEGY
+    with transaction.atomic():
+        capacities = accepting_capacities()
+        rows = list(leads.exclude(lead_stage__in=settings.LEAD_CLOSED_STAGES).values_list('pk', 'lead_manager_id'))
+        # Release the leads from their current managers before balancing
+        released = Counter(manager_id for lead_id, manager_id in rows)
+        adjust_open_leads({user_id: -n for user_id, n in released.items()})
+        for capacity in capacities:
+            capacity.open_leads = max(0, capacity.open_leads - released.get(capacity.user_id, 0))
+
+        picks = choose_managers(capacities, len(rows), strategy)
+        by_manager = {}
+        kept = Counter()
+        for (lead_id, manager_id), user_id in zip(rows, picks):
+            if user_id is None:
+                # Everyone is at capacity: the lead stays where it was
+                kept[manager_id] += 1
+            else:
+                by_manager.setdefault(user_id, []).append(lead_id)
+        adjust_open_leads(kept)
+        now = timezone.now()
+        for user_id, ids in by_manager.items():
+            for start in range(0, len(ids), 1000):
+                Lead.objects.filter(pk__in=ids[start:start + 1000]).update(lead_manager_id=user_id, updated_date=now)
+        record_assignments(picks, now)
+    # Open tasks on these leads moved between users' counters
+    transaction.on_commit(lambda: invalidate_task_counts({*released, *by_manager}))
+    return {user_id: len(ids) for user_id, ids in by_manager.items()}
+
+
+def recount_open_leads():
+    """Rebuild every open_leads counter from the leads table; returns the number corrected"""
+    actual = dict(
+        Lead.objects.exclude(lead_stage__in=settings.LEAD_CLOSED_STAGES)
+        .exclude(lead_manager__isnull=True)
+        .order_by()
+        .values_list('lead_manager_id')
+        .annotate(leads=Count('pk'))
+    )
+    corrected = 0
+    with transaction.atomic():
+        for capacity in ManagerCapacity.objects.select_for_update().order_by('pk'):
+            open_leads = actual.get(capacity.user_id, 0)
+            if capacity.open_leads != open_leads:
+                ManagerCapacity.objects.filter(pk=capacity.pk).update(open_leads=open_leads)
+                corrected += 1
+    return corrected
@@ -0,0 +1,194 @@
+"""
+Async counterparts of the JSON endpoints, for serving under ASGI.
+
+They behave exactly like the views in ``views.py`` and ``api.py``, sharing
+their form parsing, query building and response helpers, but use the async
+ORM (``aget``/``asave``/``aaggregate``/``async for``), so a worker is not
+held while a slow mobile client trickles a request in or the database answers.
+Uploaded recordings are written to storage in a worker thread that is not the
+shared sync thread, keeping file I/O off the event loop.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpRequest, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_GET, require_POST
+
+from .api import (
+    api_login_required, detail_payload, detail_row_queryset, finalize, freshness_aggregates,
+    lead_activities_query, lead_detail_query, lead_list_query, page_payload, page_queryset,
+    task_list_query, task_notes_query, validators,
+)
+from .archive import get_hot_lead
+from .counters import arecord_task_change, task_state
+from .models import Lead, Activity, TaskNote
+from .views import (
+    activity_added, build_activity, failure, note_added, parse_new_due_date, task_postponed, task_toggled,
+)
+
+
+async def aget_object_or_404(klass, **kwargs):
+    """Async version of get_object_or_404 for a model or queryset"""
+    queryset = klass._default_manager.all() if hasattr(klass, '_default_manager') else klass
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+async def conditional_json_async(request, queryset, version_paths, build_payload, dated=False):
+    """Async version of api.conditional_json; build_payload is awaited"""
+    state = await queryset.order_by().aaggregate(**freshness_aggregates(version_paths))
+    etag, last_modified = validators(request, state, dated)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        payload = await build_payload(state['total'])
+        if isinstance(payload, JsonResponse):
+            return payload
+        response = JsonResponse(payload)
+    return finalize(response, etag, last_modified)
+
+
+async def fetch_page_async(queryset, field_map, fields, params):
+    """Async version of api.fetch_page"""
+    rows, limit = page_queryset(queryset, field_map, fields, params)
+    return page_payload([row async for row in rows], fields, limit)
+
+
+@login_required
+@require_POST
+async def add_activity_view(request: HttpRequest, lead_id: str) -> JsonResponse:
+    """Add activity to a lead via AJAX"""
+    try:
+        # An archived lead is restored by getting a new activity
+        lead = await sync_to_async(get_hot_lead)(lead_id)
+        if lead is None:
+            raise Http404('No Lead matches the given query.')
+
+        activity, error = build_activity(request.POST, request.FILES, lead, await request.auser())
+        if error:
+            return failure(error)
+
+        recording = request.FILES.get('recording') if activity.activity_type == 'call' else None
+        if recording:
+            # Store the upload off the event loop; the field is then
+            # committed so save() only writes the row
+            await sync_to_async(activity.recording.save, thread_sensitive=False)(
+                activity.get_recording_filename(), recording, save=False
+            )
+
+        await activity.asave()
+        if activity.activity_type == 'task':
+            await arecord_task_change(activity)
+        return activity_added(activity)
+
+    except Exception as e:
+        return failure(str(e))
+
+
+@login_required
+@require_POST
+async def mark_task_complete(request: HttpRequest, activity_id: int) -> JsonResponse:
+    """Mark a task as complete"""
+    try:
+        activity = await aget_object_or_404(Activity, id=activity_id, activity_type='task')
+        before = task_state(activity)
+        activity.is_completed = not activity.is_completed  # Toggle completion
+        await activity.asave()
+        await arecord_task_change(activity, before)
+        return task_toggled(activity)
+    except Exception as e:
+        return failure(str(e))
+
+
+@login_required
+@require_POST
+async def add_task_note(request: HttpRequest, activity_id: int) -> JsonResponse:
+    """Add a note to a task"""
+    try:
+        activity = await aget_object_or_404(Activity, id=activity_id, activity_type='task')
+        note_content = request.POST.get('note')
+
+        if not note_content:
+            return failure('Note content is required.')
+
+        await TaskNote.objects.acreate(activity=activity, note=note_content, created_by=await request.auser())
+        return note_added()
+
+    except Exception as e:
+        return failure(str(e))
+
+
+@login_required
+@require_POST
+async def postpone_task(request: HttpRequest, activity_id: int) -> JsonResponse:
+    """Postpone a task by updating its due date"""
+    try:
+        activity = await aget_object_or_404(Activity, id=activity_id, activity_type='task')
+
+        new_due_date, error = parse_new_due_date(request.POST)
+        if error:
+            return failure(error)
+
+        old_due_date = activity.get_ist_due_date()
+        before = task_state(activity)
+        activity.due_date = new_due_date
+        await activity.asave()
+        await arecord_task_change(activity, before)
+        return task_postponed(activity, old_due_date)
+
+    except Exception as e:
+        return failure(str(e))
+
+
+async def list_json_async(request, query):
+    """Async version of api.list_json"""
+    async def build_payload(total):
+        return dict(await fetch_page_async(query.queryset, query.field_map, query.fields, request.GET), count=total)
+
+    return await conditional_json_async(request, query.queryset, query.version_paths, build_payload)
+
+
+@api_login_required
+@require_GET
+async def lead_list_api(request):
+    """Async GET /leads/async/api/v1/leads/"""
+    return await list_json_async(request, lead_list_query(request.GET))
+
+
+@api_login_required
+@require_GET
+async def lead_detail_api(request, lead_id):
+    """Async GET /leads/async/api/v1/leads/<lead_id>/"""
+    query = lead_detail_query(request.GET, lead_id)
+
+    async def build_payload(total):
+        return detail_payload(query, await detail_row_queryset(query).afirst())
+
+    return await conditional_json_async(request, query.queryset, query.version_paths, build_payload, dated=True)
+
+
+@api_login_required
+@require_GET
+async def lead_activities_api(request, lead_id):
+    """Async GET /leads/async/api/v1/leads/<lead_id>/activities/"""
+    if not await Lead.objects.filter(lead_id=lead_id).aexists():
+        raise Http404('No Lead matches the given query.')
+    return await list_json_async(request, lead_activities_query(request.GET, lead_id))
+
+
+@api_login_required
+@require_GET
+async def task_list_api(request):
+    """Async GET /leads/async/api/v1/tasks/"""
+    return await list_json_async(request, task_list_query(request.GET, await request.auser()))
+
+
+@api_login_required
+@require_GET
+async def task_notes_api(request, activity_id):
+    """Async GET /leads/async/api/v1/tasks/<activity_id>/notes/"""
+    if not await Activity.objects.filter(id=activity_id, activity_type='task').aexists():
+        raise Http404('No Activity matches the given query.')
+    return await list_json_async(request, task_notes_query(request.GET, activity_id))
@@ -0,0 +1,292 @@
+"""
+Pure-Python metadata extraction for call recordings.
+
+Only container headers are parsed (plus a small tail read for OGG), so a
+recording's duration is known without decoding any audio. Supported formats
+are the ones phones and dialers upload: MP3, M4A/MP4 (AAC/ALAC), WAV and OGG
+(Vorbis/Opus). Anything else still gets its size and checksum.
+"""
+import hashlib
+import os
+import struct
+
+CHUNK_SIZE = 64 * 1024
+
+# MPEG audio frame header tables: bitrates in kbps indexed by [version key][layer][index]
+MP3_BITRATES = {
+    1: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    2: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+class UnsupportedAudio(ValueError):
+    """The file is not in a format we can read a duration from"""
+
+
+def file_size(fileobj):
+    """Size in bytes of a seekable file object"""
+    position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(position)
+    return size
+
+
+def sha256_of(fileobj):
+    """Hex SHA-256 of the whole file, read in chunks"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def probe_wav(fileobj, size):
+    """RIFF/WAVE: the fmt chunk gives the byte rate, the data chunk the length"""
+    fileobj.seek(12)
+    codec, byte_rate, data_size = None, None, None
+    while data_size is None:
+        header = fileobj.read(8)
+        if len(header) < 8:
+            break
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            fmt = fileobj.read(chunk_size)
+            audio_format, channels, sample_rate, byte_rate = struct.unpack('<HHII', fmt[:12])
+            codec = 'pcm' if audio_format in (1, 0xFFFE) else f'wav-0x{audio_format:04x}'
+            fileobj.seek(chunk_size % 2, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            # Recorders that stream WAV often leave the size as 0 or 0xFFFFFFFF
+            remaining = size - fileobj.tell()
+            data_size = remaining if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, remaining)
+        else:
+            fileobj.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+    if not byte_rate or data_size is None:
+        raise UnsupportedAudio('WAV file without fmt/data chunks.')
+    return {'codec': codec, 'duration': data_size / byte_rate, 'bitrate': byte_rate * 8}
+
+
+def parse_mp3_frame_header(header):
+    """Decode a 4-byte MPEG audio frame header, or return None if it is not one"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    layer = 4 - layer_bits
+    sample_rate = MP3_SAMPLE_RATES[version_bits][sample_rate_index]
+    if version_bits == 3:
+        samples_per_frame = 384 if layer == 1 else 1152
+    else:
+        samples_per_frame = 384 if layer == 1 else (1152 if layer == 2 else 576)
+    return {
+        'mpeg1': version_bits == 3,
+        'layer': layer,
+        'bitrate': MP3_BITRATES[1 if version_bits == 3 else 2][layer][bitrate_index] * 1000,
+        'sample_rate': sample_rate,
+        'samples_per_frame': samples_per_frame,
+        'mono': (header[3] >> 6) == 3,
+    }
+
+
+def probe_mp3(fileobj, size):
+    """MPEG audio: Xing/Info or VBRI frame counts for VBR, otherwise bitrate x length"""
+    fileobj.seek(0)
+    start = 0
+    head = fileobj.read(10)
+    if head[:3] == b'ID3':
+        # ID3v2 tag size is a 28-bit syncsafe integer
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+
+    # Find the first frame sync within a reasonable window after the tag
+    fileobj.seek(start)
+    window = fileobj.read(CHUNK_SIZE)
+    frame = None
+    for offset in range(len(window) - 3):
+        if window[offset] == 0xFF:
+            frame = parse_mp3_frame_header(window[offset:offset + 4])
+            if frame:
+                start += offset
+                window = window[offset:]
+                break
+    if frame is None:
+        raise UnsupportedAudio('No MPEG audio frame found.')
+
+    end = size
+    fileobj.seek(max(0, size - 128))
+    if fileobj.read(3) == b'TAG':
+        end -= 128
+
+    # The Xing/Info header sits after the side information of the first frame
+    side_info = (17 if frame['mono'] else 32) if frame['mpeg1'] else (9 if frame['mono'] else 17)
+    frames = None
+    xing = window[4 + side_info:4 + side_info + 12]
+    if xing[:4] in (b'Xing', b'Info') and struct.unpack('>I', xing[4:8])[0] & 0x01:
+        frames = struct.unpack('>I', xing[8:12])[0]
+    elif window[36:40] == b'VBRI':
+        frames = struct.unpack('>I', window[50:54])[0]
+
+    if frames:
+        duration = frames * frame['samples_per_frame'] / frame['sample_rate']
+        bitrate = int((end - start) * 8 / duration) if duration else frame['bitrate']
+    else:
+        bitrate = frame['bitrate']
+        duration = (end - start) * 8 / bitrate
+    return {'codec': f'mp{frame["layer"]}', 'duration': duration, 'bitrate': bitrate}
+
+
+def iter_mp4_boxes(fileobj, start, end):
+    """Yield (type, payload_start, payload_end) for the boxes between start and end"""
+    position = start
+    while position + 8 <= end:
+        fileobj.seek(position)
+        box_size, box_type = struct.unpack('>I4s', fileobj.read(8))
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack('>Q', fileobj.read(8))[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - position
+        if box_size < header_size:
+            return
+        yield box_type, position + header_size, min(position + box_size, end)
+        position += box_size
+
+
+def find_mp4_box(fileobj, path, start, end):
+    """Payload bounds of the box at a path like [b'moov', b'mvhd'], or None"""
+    for box_type, payload_start, payload_end in iter_mp4_boxes(fileobj, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload_start, payload_end
+            found = find_mp4_box(fileobj, path[1:], payload_start, payload_end)
+            if found:
+                return found
+    return None
+
+
+def probe_mp4(fileobj, size):
+    """ISO base media (M4A/MP4): duration from mvhd, codec from the first sample entry"""
+    mvhd = find_mp4_box(fileobj, [b'moov', b'mvhd'], 0, size)
+    if not mvhd:
+        raise UnsupportedAudio('MP4 file without a movie header.')
+    fileobj.seek(mvhd[0])
+    version = fileobj.read(4)[0]
+    if version == 1:
+        timescale, duration = struct.unpack('>16xIQ', fileobj.read(28))
+    else:
+        timescale, duration = struct.unpack('>8xII', fileobj.read(16))
+    if not timescale:
+        raise UnsupportedAudio('MP4 movie header without a timescale.')
+
+    codec = None
+    stsd = find_mp4_box(fileobj, [b'moov', b'trak', b'mdia', b'minf', b'stbl', b'stsd'], 0, size)
+    if stsd:
+        # Full box header (4) + entry count (4), then the first entry's size and format
+        fileobj.seek(stsd[0] + 12)
+        fourcc = fileobj.read(4).decode('latin-1').strip()
+        codec = {'mp4a': 'aac'}.get(fourcc, fourcc) or None
+
+    seconds = duration / timescale
+    return {'codec': codec, 'duration': seconds, 'bitrate': int(size * 8 / seconds) if seconds else None}
+
+
+def probe_ogg(fileobj, size):
+    """Ogg: codec and sample rate from the first packet, length from the last granule position"""
+    fileobj.seek(0)
+    first_page = fileobj.read(CHUNK_SIZE)
+    segments = first_page[26]
+    packet = first_page[27 + segments:]
+    if packet[:7] == b'\x01vorbis':
+        codec, sample_rate, pre_skip = 'vorbis', struct.unpack('<I', packet[12:16])[0], 0
+    elif packet[:8] == b'OpusHead':
+        # Opus granule positions always count 48 kHz samples
+        codec, sample_rate, pre_skip = 'opus', 48000, struct.unpack('<H', packet[10:12])[0]
+    elif packet[:5] == b'\x7fFLAC':
+        codec = 'flac'
+        sample_rate, pre_skip = struct.unpack('>I', packet[27:31])[0] >> 12, 0
+    else:
+        raise UnsupportedAudio('Unknown Ogg codec.')
+
+    fileobj.seek(max(0, size - CHUNK_SIZE))
+    tail = fileobj.read()
+    last_page = tail.rfind(b'OggS')
+    if last_page < 0 or not sample_rate:
+        raise UnsupportedAudio('Ogg file without a final page.')
+    granule = struct.unpack('<q', tail[last_page + 6:last_page + 14])[0]
+    duration = max(0, granule - pre_skip) / sample_rate
+    return {'codec': codec, 'duration': duration, 'bitrate': int(size * 8 / duration) if duration else None}
+
+
+def sniff_format(head):
+    """Container format from the first bytes of a file"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return probe_wav
+    if head[:4] == b'OggS':
+        return probe_ogg
+    if head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide'):
+        return probe_mp4
+    if head[:3] == b'ID3' or parse_mp3_frame_header(head[:4]):
+        return probe_mp3
+    return None
+
+
+def probe(fileobj):
+    """
+    Read a recording's metadata from a seekable binary file object.
+
+    Returns a dict with size (bytes), checksum (hex SHA-256), and duration
+    (seconds), bitrate (bits per second) and codec when the format is known.
+    """
+    size = file_size(fileobj)
+    metadata = {'size': size, 'checksum': sha256_of(fileobj), 'duration': None, 'bitrate': None, 'codec': None}
+    fileobj.seek(0)
+    parser = sniff_format(fileobj.read(16))
+    if parser:
+        try:
+            metadata.update(parser(fileobj, size))
+        except (UnsupportedAudio, struct.error, IndexError, UnicodeDecodeError):
+            # Truncated or unusual headers: keep size and checksum
+            pass
+    if metadata['bitrate'] is not None:
+        metadata['bitrate'] = int(metadata['bitrate'])
+    return metadata
+
+
+def format_duration(seconds):
+    """Seconds as m:ss (or h:mm:ss); empty for unknown lengths"""
+    if seconds is None:
+        return ''
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def recording_fields(fieldfile):
+    """Activity.recording_* column values for a stored recording"""
+    with fieldfile.open('rb') as fileobj:
+        metadata = probe(fileobj)
+    return {
+        'recording_duration': metadata['duration'],
+        'recording_bitrate': metadata['bitrate'],
+        'recording_size': metadata['size'],
+        'recording_codec': metadata['codec'],
+        'recording_checksum': metadata['checksum'],
+    }
@@ -0,0 +1,88 @@
+"""
+Bulk actions for the lead list and the task board.
+
+Every action is one set-based statement (plus one INSERT for category links)
+inside a single transaction, whether 3 or 10,000 rows are selected. Selections
+are either explicit ids or "everything matching the list filters", which is
+applied in the UPDATE's WHERE clause so the ids never round-trip through
+Python.
+
+``update()`` bypasses ``save()``, so ``updated_date`` is set explicitly, the
+managers' open-lead counters are adjusted and the cached task counters of
+everyone affected are dropped afterwards.
+"""
+from django.db import transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from .assignment import adjust_open_leads, load_groups, update_deltas
+from .counters import invalidate_task_counts
+from .filters import filter_leads, filter_tasks
+from .models import Activity, Lead
+
+
+def selected_leads(data):
+    """Leads picked on the lead list: explicit ids, or all matching the submitted filters"""
+    if data.get('select_all') == '1':
+        return filter_leads(Lead.objects.all(), QueryDict(data.get('filter_query', '')))
+    return Lead.objects.filter(lead_id__in=data.getlist('selected'))
+
+
+def selected_tasks(data, user=None):
+    """Tasks picked on the task board: explicit ids, or all matching the submitted filters"""
+    tasks = Activity.objects.filter(activity_type='task')
+    if data.get('select_all') == '1':
+        return filter_tasks(tasks, QueryDict(data.get('filter_query', '')), user=user)
+    return tasks.filter(id__in=[value for value in data.getlist('selected') if value.isdigit()])
+
+
+def _managers_of(leads):
+    return set(leads.order_by().values_list('lead_manager_id', flat=True).distinct())
+
+
+def update_leads(leads, **fields):
+    """Set lead_stage / lead_status / lead_manager on every selected lead; returns the row count"""
+    with transaction.atomic():
+        affected_users = _managers_of(leads) if 'lead_manager' in fields else set()
+        if fields.keys() & {'lead_manager', 'lead_stage'}:
+            # Managers' open-lead counters, from one GROUP BY over the selection
+            deltas = update_deltas(load_groups(leads), **{name: fields[name] for name in ('lead_manager', 'lead_stage') if name in fields})
+        else:
+            deltas = {}
+        count = leads.update(updated_date=timezone.now(), **fields)
+        adjust_open_leads(deltas)
+    if 'lead_manager' in fields:
+        # Open tasks on these leads moved between users' counters
+        affected_users.add(getattr(fields['lead_manager'], 'pk', fields['lead_manager']))
+        transaction.on_commit(lambda: invalidate_task_counts(affected_users))
+    return count
+
+
+def add_categories(leads, categories):
+    """Link categories to every selected lead, skipping links that exist; returns leads touched"""
+    through = Lead.categories.through
+    with transaction.atomic():
+        lead_ids = list(leads.values_list('pk', flat=True))
+        through.objects.bulk_create(
+            [through(lead_id=lead_id, category_id=category.pk) for lead_id in lead_ids for category in categories],
+            batch_size=2000,
+            ignore_conflicts=True,
+        )
+        leads.update(updated_date=timezone.now())
+    return len(lead_ids)
+
+
+def _task_owners(tasks):
+    owners = set()
+    for created_by_id, lead_manager_id in tasks.order_by().values_list('created_by_id', 'lead__lead_manager_id').distinct():
+        owners.update((created_by_id, lead_manager_id))
+    return owners
+
+
+def update_tasks(tasks, **fields):
+    """Complete or reschedule every selected task; returns the row count"""
+    with transaction.atomic():
+        owners = _task_owners(tasks)
+        count = tasks.update(updated_date=timezone.now(), **fields)
+    transaction.on_commit(lambda: invalidate_task_counts(owners))
+    return count
@@ -0,0 +1,179 @@
+"""
+Product name autocomplete for the lead product entry forms.
+
+Suggestions come from the active Product catalog (with its price and URL) and
+from the names staff have typed into leads' ``products_data`` before. Both
+are held in an in-memory index per process: for each category, a sorted list
+of lowercased keys, one for the whole name and one starting at each later
+word, so "roy" finds "Recliner Royale" as well as "rec" does. A lookup is two
+bisects and a short scan, with no database query.
+
+The index is reloaded when a Product is saved or deleted (a version stamp in
+the cache, which also reaches other processes when the cache is shared) and
+at least every CATALOG_INDEX_TTL seconds. Collecting the names used on leads
+takes a scan of every ``products_data``, so it never runs on a request: a
+background job rebuilds the ProductNameUse table, and the index only reads
+that. Saving a lead's products queues the job to run CATALOG_HISTORY_DELAY
+seconds later, so a burst of edits costs one scan.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.queue import enqueue_once
+
+from .models import ArchivedLead, Lead, Product, ProductNameUse
+
+VERSION_KEY = 'product_catalog:version'
+# Word positions a name is indexed from ("sofa cum bed", "cum bed", "bed")
+MAX_KEY_WORDS = 6
+# Matching keys looked at per lookup, so one-letter prefixes stay cheap
+MAX_SCAN = 1000
+END = chr(0x10FFFF)
+
+_lock = threading.Lock()
+_index = {'version': None, 'loaded': None, 'categories': {}}
+
+
+def normalize(name):
+    return ' '.join(str(name).lower().split())
+
+
+def catalog_changed():
+    """Make every process reload its index on the next lookup"""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def collect_history(models=(Lead, ArchivedLead)):
+    """{category id: {normalized name: (name, uses, price, url)}} from the products_data of every lead"""
+    names = defaultdict(dict)
+    for model in models:
+        for products_data in model.objects.order_by().values_list('products_data', flat=True).iterator(chunk_size=2000):
+            for category_id, category in (products_data or {}).items():
+                if not isinstance(category, dict) or not str(category_id).isdigit():
+                    continue
+                for product in category.get('products', []):
+                    if not isinstance(product, dict) or not str(product.get('name') or '').strip():
+                        continue
+                    name = str(product['name']).strip()
+                    key = normalize(name)
+                    known = names[int(category_id)].get(key)
+                    uses = known[1] + 1 if known else 1
+                    # The most recently seen price and URL win over empty ones
+                    price = str(product.get('price') or '') or (known[2] if known else '')
+                    url = str(product.get('url') or '') or (known[3] if known else '')
+                    names[int(category_id)][key] = (known[0] if known else name, uses, price, url)
+    return dict(names)
+
+
+def store_history(names, model=ProductNameUse):
+    """Replace the stored lead product names with collect_history() output"""
+    with transaction.atomic():
+        model.objects.all().delete()
+        model.objects.bulk_create(
+            [
+                model(category_id=category_id, name=name, uses=uses, price=price, url=url)
+                for category_id, category_names in names.items()
+                for name, uses, price, url in category_names.values()
+            ],
+            batch_size=1000,
+        )
+
+
+def rebuild_history():
+    """Recollect the product names used on leads and make every process reload its index"""
+    store_history(collect_history())
+    catalog_changed()
+
+
+def history_changed():
+    """Queue a history rebuild; saves within CATALOG_HISTORY_DELAY share it"""
+    enqueue_once('leads.rebuild_product_history', run_at=timezone.now() + timedelta(seconds=settings.CATALOG_HISTORY_DELAY))
+
+
+def history():
+    """The stored lead product names, in collect_history()'s shape"""
+    names = defaultdict(dict)
+    for category_id, name, uses, price, url in ProductNameUse.objects.values_list('category_id', 'name', 'uses', 'price', 'url'):
+        names[category_id][normalize(name)] = (name, uses, price, url)
+    return names
+
+
+def build_index(products, names):
+    """
+    {category id: (sorted keys, entry number per key, entries)} from catalog
+    (category id, name, price, url) rows and collected lead product names
+    """
+    by_category = defaultdict(dict)
+    for category_id, name, price, url in products:
+        by_category[category_id][normalize(name)] = {
+            'name': name,
+            'price': '' if price is None else str(price),
+            'url': url,
+            'source': 'catalog',
+            'uses': 0,
+        }
+    for category_id, category_names in names.items():
+        for key, (name, uses, price, url) in category_names.items():
+            entry = by_category[category_id].get(key)
+            if entry is not None:
+                # Catalog price and URL win; usage still counts towards ranking
+                entry['uses'] += uses
+            else:
+                by_category[category_id][key] = {'name': name, 'price': price, 'url': url, 'source': 'history', 'uses': uses}
+
+    index = {}
+    for category_id, entries_by_key in by_category.items():
+        # Best first, so a scan in entry order is already ranked
+        entries = sorted(entries_by_key.values(), key=lambda entry: (entry['source'] != 'catalog', -entry['uses'], entry['name'].lower()))
+        pairs = []
+        for number, entry in enumerate(entries):
+            words = normalize(entry['name']).split(' ')
+            for start in range(min(len(words), MAX_KEY_WORDS)):
+                pairs.append((' '.join(words[start:]), number))
+        pairs.sort()
+        index[category_id] = ([key for key, _ in pairs], [number for _, number in pairs], entries)
+    return index
+
+
+def current_index():
+    """The process's index, reloaded when the catalog changed or CATALOG_INDEX_TTL has passed"""
+    version = cache.get(VERSION_KEY)
+    now = time.monotonic()
+    if _index['loaded'] is None or _index['version'] != version or now - _index['loaded'] > settings.CATALOG_INDEX_TTL:
+        with _lock:
+            if _index['loaded'] is None or _index['version'] != version or now - _index['loaded'] > settings.CATALOG_INDEX_TTL:
+                products = Product.objects.filter(is_active=True).order_by().values_list('category_id', 'name', 'price', 'url')
+                _index['categories'] = build_index(products, history())
+                _index['version'] = version
+                _index['loaded'] = time.monotonic()
+    return _index['categories']
+
+
+def lookup(category_index, prefix, limit):
+    keys, numbers, entries = category_index
+    if not prefix:
+        return entries[:limit]
+    start = bisect_left(keys, prefix)
+    stop = min(bisect_right(keys, prefix + END, lo=start), start + MAX_SCAN)
+    # Entry numbers are ranks; the smallest distinct ones are the best matches
+    return [entries[number] for number in sorted(set(numbers[start:stop]))[:limit]]
+
+
+def suggest(query, category_id=None, limit=10):
+    """Best product names starting (at any word) with query, in one category or all of them"""
+    index = current_index()
+    prefix = normalize(query)
+    if category_id is not None:
+        return lookup(index[category_id], prefix, limit) if category_id in index else []
+    matches = [entry for category_index in index.values() for entry in lookup(category_index, prefix, limit)]
+    matches.sort(key=lambda entry: (entry['source'] != 'catalog', -entry['uses'], entry['name'].lower()))
+    return matches[:limit]
@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .counters import get_task_counts
+
+
+def task_counts(request):
+    """Task badge counts for the navigation; read from the cache only when a template uses them"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'task_counts': SimpleLazyObject(lambda: get_task_counts(user))}
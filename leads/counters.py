@@ -0,0 +1,131 @@
+"""
+Per-user task counters for the navigation badges.
+
+Each user's open / overdue / due-today counts are cached under one key. Views
+that create, complete or reschedule a task apply the change to the cached
+counts of everyone it belongs to (the lead manager and the creator) instead
+of dropping the entry, so the badges stay current without a recount.
+
+Time alone also moves tasks between buckets (a task becomes overdue at its
+due time; "today" rolls over at IST midnight). Each entry therefore expires
+at the earliest of TASK_COUNTS_TTL, the next such transition and the next
+IST midnight, and is recomputed with a single aggregate on the next read.
+The TTL also bounds drift from caches that are not shared between processes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import OPEN_TASKS, Activity, Lead, ist_day_start
+
+
+def cache_key(user_id):
+    return f'task_counts:{user_id}'
+
+
+def task_state(activity):
+    """The parts of a task that decide its buckets, captured before a change"""
+    return {
+        'is_open': activity.activity_type == 'task' and not activity.is_completed,
+        'due_date': activity.due_date,
+    }
+
+
+def buckets(state, now):
+    """Counter names a task in this state counts towards"""
+    if not state or not state['is_open']:
+        return set()
+    names = {'open'}
+    due_date = state['due_date']
+    if due_date is not None:
+        if due_date < now:
+            names.add('overdue')
+        if ist_day_start(now) <= due_date < ist_day_start(now, 1):
+            names.add('today')
+    return names
+
+
+def compute_task_counts(user, now=None):
+    """Counts from the database plus the moment they next change on their own"""
+    now = now or timezone.now()
+    today, tomorrow = ist_day_start(now), ist_day_start(now, 1)
+    counts = Activity.objects.for_user(user).aggregate(
+        open=Count('id', filter=OPEN_TASKS),
+        overdue=Count('id', filter=OPEN_TASKS & Q(due_date__lt=now)),
+        today=Count('id', filter=OPEN_TASKS & Q(due_date__gte=today, due_date__lt=tomorrow)),
+        next_due=Min('due_date', filter=OPEN_TASKS & Q(due_date__gte=now)),
+    )
+    next_due = counts.pop('next_due')
+    counts['expires'] = min(
+        now + timedelta(seconds=settings.TASK_COUNTS_TTL),
+        tomorrow,
+        # Becomes overdue one microsecond after its due time
+        next_due + timedelta(microseconds=1) if next_due else tomorrow,
+    )
+    return counts
+
+
+def store(user_id, counts, now):
+    timeout = (counts['expires'] - now).total_seconds()
+    if timeout > 0:
+        cache.set(cache_key(user_id), counts, timeout)
+
+
+def get_task_counts(user):
+    """Cached counts for the navigation badges; one query on a miss, none on a hit"""
+    counts = cache.get(cache_key(user.pk))
+    if counts is None:
+        now = timezone.now()
+        counts = compute_task_counts(user, now)
+        store(user.pk, counts, now)
+    return counts
+
+
+def apply_change(counts, before, after, now):
+    """Move a task between buckets in a cached entry"""
+    counts = dict(counts)
+    for name in buckets(before, now):
+        counts[name] = max(0, counts[name] - 1)
+    for name in buckets(after, now):
+        counts[name] += 1
+    if after and after['is_open'] and after['due_date'] is not None and after['due_date'] >= now:
+        # The entry must expire when this task turns overdue
+        counts['expires'] = min(counts['expires'], after['due_date'] + timedelta(microseconds=1))
+    return counts
+
+
+def owner_ids(*user_ids):
+    """Users whose counters include a task: its creator and its lead's manager"""
+    return {user_id for user_id in user_ids if user_id}
+
+
+def record_task_change(activity, before=None):
+    """Apply a created/completed/rescheduled task to its owners' cached counters"""
+    now = timezone.now()
+    after = task_state(activity)
+    for user_id in owner_ids(activity.created_by_id, activity.lead.lead_manager_id):
+        counts = cache.get(cache_key(user_id))
+        if counts is not None:
+            store(user_id, apply_change(counts, before, after, now), now)
+
+
+async def arecord_task_change(activity, before=None):
+    """record_task_change for async views"""
+    now = timezone.now()
+    after = task_state(activity)
+    lead_manager_id = await Lead.objects.filter(pk=activity.lead_id).values_list('lead_manager_id', flat=True).afirst()
+    for user_id in owner_ids(activity.created_by_id, lead_manager_id):
+        counts = await cache.aget(cache_key(user_id))
+        if counts is not None:
+            counts = apply_change(counts, before, after, now)
+            timeout = (counts['expires'] - now).total_seconds()
+            if timeout > 0:
+                await cache.aset(cache_key(user_id), counts, timeout)
+
+
+def invalidate_task_counts(user_ids):
+    """Drop cached counters, e.g. after bulk updates or a change of lead manager"""
+    cache.delete_many([cache_key(user_id) for user_id in set(user_ids) if user_id])
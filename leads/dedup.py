@@ -0,0 +1,268 @@
+"""
+Duplicate lead detection and merging.
+
+Leads are compared only through blocking keys kept in indexed columns:
+``phone_normalized``, ``email_normalized`` and ``name_pincode_key`` (see
+``Lead.save``). Two leads sharing any key are candidates, and candidates are
+joined transitively with a union-find forest, so the phone match from
+WhatsApp and the email match from Instagram end up in one cluster. Nothing
+is ever compared pairwise: the batch scan is one GROUP BY per key plus one
+ordered pass over the rows whose key occurs more than once, and a new lead
+costs one indexed count per key plus one indexed OR query.
+
+Every cluster is rooted at its oldest lead. The other members are recorded as
+``DuplicateLead`` flags for review; ``merge_leads`` folds them into the root.
+Keys shared by more than DEDUP_MAX_BLOCK_SIZE leads are placeholders
+("na@na.com", a shop's own number) and are ignored.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .assignment import adjust_open_leads
+from .counters import invalidate_task_counts
+from .models import Activity, DuplicateLead, Lead, LeadIngestItem, LeadProduct
+from .saved_views import invalidate_saved_views
+from .search import move_entries
+
+# Flag reason -> blocking key column on Lead
+DEDUP_KEYS = {
+    'phone': 'phone_normalized',
+    'email': 'email_normalized',
+    'name_pincode': 'name_pincode_key',
+}
+
+# Copied from a merged duplicate when the surviving lead has no value
+FILL_FIELDS = (
+    'name', 'email', 'number', 'whatsapp_url', 'address', 'pincode', 'leadsource',
+    'lead_manager_id', 'interested_categories', 'activity', 'task',
+)
+# Combined from every merged lead
+APPEND_FIELDS = ('notes', 'remarks')
+
+
+class LeadForest:
+    """Union-find over lead ids; each set is rooted at its oldest lead"""
+
+    def __init__(self):
+        self.parent = {}
+        self.order = {}
+        self.reasons = {}
+
+    def add(self, lead_id, created_date):
+        if lead_id not in self.parent:
+            self.parent[lead_id] = lead_id
+            self.order[lead_id] = (created_date, str(lead_id))
+
+    def find(self, lead_id):
+        root = lead_id
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression
+        while self.parent[lead_id] != root:
+            self.parent[lead_id], lead_id = root, self.parent[lead_id]
+        return root
+
+    def union(self, first, second, reason):
+        self.reasons.setdefault(first, reason)
+        self.reasons.setdefault(second, reason)
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return
+        if self.order[second] < self.order[first]:
+            first, second = second, first
+        self.parent[second] = first
+
+    def clusters(self):
+        """{root: [(member, reason), ...]} for every set with more than one lead"""
+        members = defaultdict(list)
+        for lead_id in self.parent:
+            root = self.find(lead_id)
+            if root != lead_id:
+                members[root].append((lead_id, self.reasons[lead_id]))
+        return dict(members)
+
+
+def link_blocks(forest, rows):
+    """Union leads that share a key; rows are (reason, key, lead_id, created_date) grouped by key"""
+    blocks = defaultdict(list)
+    for reason, key, lead_id, created_date in rows:
+        forest.add(lead_id, created_date)
+        blocks[reason, key].append(lead_id)
+    for (reason, key), lead_ids in blocks.items():
+        if len(lead_ids) > settings.DEDUP_MAX_BLOCK_SIZE:
+            continue
+        for other in lead_ids[1:]:
+            forest.union(lead_ids[0], other, reason)
+
+
+def iter_block_rows(reason, field):
+    """(reason, key, lead_id, created_date) for every lead whose key is shared, ordered by key"""
+    shared_keys = (
+        Lead.objects.filter(**{f'{field}__isnull': False})
+        .order_by()
+        .values(field)
+        .annotate(leads=Count('pk'))
+        .filter(leads__gt=1, leads__lte=settings.DEDUP_MAX_BLOCK_SIZE)
+        .values(field)
+    )
+    rows = (
+        Lead.objects.filter(**{f'{field}__in': shared_keys})
+        .order_by(field)
+        .values_list(field, 'lead_id', 'created_date')
+    )
+    for key, lead_id, created_date in rows.iterator(chunk_size=5000):
+        yield reason, key, lead_id, created_date
+
+
+def find_clusters():
+    """Duplicate clusters across all leads, as {oldest lead_id: [(lead_id, reason), ...]}"""
+    forest = LeadForest()
+    for reason, field in DEDUP_KEYS.items():
+        # Rows arrive ordered by key, so one block is in memory at a time
+        block, block_key = [], None
+        for row in iter_block_rows(reason, field):
+            if row[1] != block_key and block:
+                link_blocks(forest, block)
+                block = []
+            block_key = row[1]
+            block.append(row)
+        link_blocks(forest, block)
+    return forest.clusters()
+
+
+def record_clusters(clusters):
+    """Store DuplicateLead flags for clusters; existing (and dismissed) flags are kept; returns flags written"""
+    now = timezone.now()
+    flags = [
+        DuplicateLead(lead_id=lead_id, duplicate_of_id=root, reason=reason, detected_date=now)
+        for root, members in clusters.items()
+        for lead_id, reason in members
+    ]
+    DuplicateLead.objects.bulk_create(flags, batch_size=1000, ignore_conflicts=True)
+    return len(flags)
+
+
+def usable_keys(field, keys):
+    """Those of keys shared by at most DEDUP_MAX_BLOCK_SIZE leads; placeholder blocks are counted in SQL, never fetched"""
+    return set(
+        Lead.objects.filter(**{f'{field}__in': keys})
+        .order_by()
+        .values(field)
+        .annotate(leads=Count('pk'))
+        .filter(leads__lte=settings.DEDUP_MAX_BLOCK_SIZE)
+        .values_list(field, flat=True)
+    )
+
+
+def flag_duplicates(leads):
+    """Flag saved leads (new ones, typically) that share a blocking key with other leads"""
+    query = Q()
+    usable = {}
+    for field in DEDUP_KEYS.values():
+        keys = {getattr(lead, field) for lead in leads} - {None, ''}
+        usable[field] = usable_keys(field, keys) if keys else set()
+        if usable[field]:
+            query |= Q(**{f'{field}__in': usable[field]})
+    if not query:
+        return 0
+
+    rows = []
+    for lead_id, created_date, *keys in Lead.objects.filter(query).order_by().values_list(
+        'lead_id', 'created_date', *DEDUP_KEYS.values()
+    ):
+        for (reason, field), key in zip(DEDUP_KEYS.items(), keys):
+            # A fetched lead's other keys may be placeholders; only usable keys link
+            if key in usable[field]:
+                rows.append((reason, key, lead_id, created_date))
+    forest = LeadForest()
+    link_blocks(forest, rows)
+
+    new_ids = {lead.pk for lead in leads}
+    clusters = {}
+    for root, members in forest.clusters().items():
+        members = [(lead_id, reason) for lead_id, reason in members if lead_id in new_ids]
+        if members:
+            clusters[root] = members
+    return record_clusters(clusters)
+
+
+def merge_values(survivor, duplicates):
+    """Fill the survivor's blank fields from the duplicates, oldest first"""
+    for field in FILL_FIELDS:
+        if getattr(survivor, field) in (None, ''):
+            for duplicate in duplicates:
+                if getattr(duplicate, field) not in (None, ''):
+                    setattr(survivor, field, getattr(duplicate, field))
+                    break
+    for field in APPEND_FIELDS:
+        texts = [getattr(lead, field) for lead in (survivor, *duplicates)]
+        texts = list(dict.fromkeys(text.strip() for text in texts if text and text.strip()))
+        setattr(survivor, field, '\n\n'.join(texts) or None)
+    products_data = {}
+    for lead in (*reversed(duplicates), survivor):
+        products_data.update(lead.products_data or {})
+    survivor.products_data = products_data
+
+
+def merge_leads(survivor, duplicates):
+    """
+    Fold duplicate leads into survivor in one transaction.
+
+    Activities, ingestion rows, products and categories are re-pointed with
+    set-based statements; where both leads have the same product, the
+    survivor's line is kept. Blank fields are filled from the duplicates,
+    which are then deleted. Returns the number of leads merged.
+    """
+    duplicate_ids = [lead.pk for lead in duplicates if lead.pk != survivor.pk]
+    if not duplicate_ids:
+        return 0
+
+    with transaction.atomic():
+        survivor = Lead.objects.select_for_update().filter(pk=survivor.pk).first()
+        duplicates = list(Lead.objects.select_for_update().filter(pk__in=duplicate_ids).order_by('created_date'))
+        if survivor is None or not duplicates:
+            # Already merged elsewhere
+            return 0
+        duplicate_ids = [lead.pk for lead in duplicates]
+        affected_users = {survivor.lead_manager_id, *(lead.lead_manager_id for lead in duplicates)}
+
+        Activity.objects.filter(lead_id__in=duplicate_ids).update(lead=survivor, updated_date=timezone.now())
+        LeadIngestItem.objects.filter(lead_id__in=duplicate_ids).update(lead=survivor)
+
+        # (lead, product) is unique: move one line per product the survivor lacks
+        have = set(survivor.lead_products.values_list('product_id', flat=True))
+        moving = []
+        for line_id, product_id in (
+            LeadProduct.objects.filter(lead_id__in=duplicate_ids).order_by('created_date').values_list('id', 'product_id')
+        ):
+            if product_id not in have:
+                have.add(product_id)
+                moving.append(line_id)
+        LeadProduct.objects.filter(id__in=moving).update(lead=survivor)
+
+        through = Lead.categories.through
+        category_ids = set(through.objects.filter(lead_id__in=duplicate_ids).values_list('category_id', flat=True))
+        through.objects.bulk_create(
+            [through(lead_id=survivor.pk, category_id=category_id) for category_id in category_ids],
+            ignore_conflicts=True,
+        )
+
+        merge_values(survivor, duplicates)
+        survivor.save()
+        move_entries(duplicate_ids, survivor.pk)
+        # Cascades to what was left behind: duplicate product lines, category links, flags
+        Lead.objects.filter(pk__in=duplicate_ids).delete()
+        invalidate_saved_views()
+        released = Counter()
+        for lead in duplicates:
+            if lead.is_open():
+                released[lead.lead_manager_id] -= 1
+        adjust_open_leads(released)
+
+    # Tasks on the merged leads may now count towards a different manager
+    transaction.on_commit(lambda: invalidate_task_counts(affected_users))
+    return len(duplicate_ids)
@@ -0,0 +1,138 @@
+"""
+Daily task digest emails (run with `manage.py send_task_digests`).
+
+Every user with open tasks gets one email listing them in three sections:
+overdue, due today and due in the next TASK_DIGEST_UPCOMING_DAYS days, with
+day boundaries in IST. A task belongs to its creator and to its lead's
+manager, as on the task board.
+
+The tasks for everyone come from a single query, which includes the lead's
+name and phone and the latest note as a subquery. The rows are then shared
+out between their owners in Python, with due dates formatted and long texts
+cut once per task. A task usually appears in two digests (its creator's and
+its lead manager's), so its text and HTML rows are rendered once, from
+partials, and reused; like the list page rows, the partials render with
+Jinja2 when LIST_TEMPLATE_ENGINE says so. All the digests are sent over one
+connection of the configured email backend.
+"""
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import OuterRef, Q, Subquery
+from django.template import engines
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import Activity, TaskNote, ist_day_start
+
+SECTIONS = {'overdue': 'Overdue', 'today': 'Due today', 'upcoming': 'Coming up'}
+TASK_FIELDS = [
+    'id', 'description', 'due_date', 'priority', 'created_by_id', 'lead__lead_manager_id',
+    'lead_id', 'lead__name', 'lead__number', 'lead__whatsapp_url', 'latest_note',
+]
+
+
+def ist_labels(moment):
+    """('Oct 19', '4:30 PM') in IST, without the per-call cost of |date"""
+    local = timezone.localtime(moment)
+    return f'{local:%b} {local.day}', f'{local.hour % 12 or 12}:{local:%M} {local:%p}'
+
+
+def shorten(text, length=200):
+    if text and len(text) > length:
+        return text[:length - 1] + '…'
+    return text
+
+
+def digest_tasks(now, upcoming_days, user_ids=None):
+    """Open tasks due before the end of the upcoming window (overdue ones included), as dicts, soonest first"""
+    latest_note = TaskNote.objects.filter(activity=OuterRef('pk')).order_by('-created_date', '-id').values('note')[:1]
+    tasks = Activity.objects.open().filter(due_date__lt=ist_day_start(now, 1 + upcoming_days))
+    if user_ids is not None:
+        tasks = tasks.filter(Q(created_by_id__in=user_ids) | Q(lead__lead_manager_id__in=user_ids))
+    rows = tasks.annotate(latest_note=Subquery(latest_note)).order_by('due_date', 'id').values_list(*TASK_FIELDS)
+    return (dict(zip(TASK_FIELDS, row)) for row in rows.iterator(chunk_size=5000))
+
+
+def build_digests(now, upcoming_days, user_ids=None):
+    """{user id: {section: [task]}} for every owner of a task in the window"""
+    tomorrow = ist_day_start(now, 1)
+    # reverse() once; the lead id is swapped in per task
+    placeholder = uuid.UUID(int=0)
+    lead_url = settings.SITE_URL.rstrip('/') + reverse('leads:lead_detail', kwargs={'lead_id': placeholder})
+    digests = defaultdict(lambda: {section: [] for section in SECTIONS})
+    for task in digest_tasks(now, upcoming_days, user_ids):
+        if task['due_date'] < now:
+            section = 'overdue'
+        elif task['due_date'] < tomorrow:
+            section = 'today'
+        else:
+            section = 'upcoming'
+        task['lead_url'] = lead_url.replace(str(placeholder), str(task['lead_id']))
+        task['due_day'], task['due_time'] = ist_labels(task['due_date'])
+        task['description'] = shorten(task['description']) or '(no description)'
+        task['latest_note'] = shorten(task['latest_note'])
+        for owner_id in {task['created_by_id'], task['lead__lead_manager_id']}:
+            if owner_id and (user_ids is None or owner_id in user_ids):
+                digests[owner_id][section].append(task)
+    return digests
+
+
+def recipients(user_ids):
+    """Active users with an email address among user_ids"""
+    return User.objects.filter(pk__in=user_ids, is_active=True).exclude(email='').only('id', 'email', 'first_name', 'last_name', 'username')
+
+
+def digest_messages(digests, users, now, connection=None):
+    """One EmailMultiAlternatives per user, rendered from templates compiled once"""
+    text_template = get_template('leads/email/task_digest.txt')
+    html_template = get_template('leads/email/task_digest.html')
+    engine = engines[settings.LIST_TEMPLATE_ENGINE]
+    task_text = engine.get_template('leads/email/_task_digest_task.txt')
+    task_html = engine.get_template('leads/email/_task_digest_task.html')
+    limit = settings.TASK_DIGEST_MAX_TASKS
+    tasks_url = settings.SITE_URL.rstrip('/') + reverse('leads:tasks')
+    day, time = ist_labels(now)
+    as_of = f'{timezone.localtime(now):%a}, {day}, {time}'
+    for user in users:
+        digest = digests[user.pk]
+        sections = [
+            {
+                'name': section,
+                'title': title,
+                'tasks': digest[section][:limit],
+                'total': len(digest[section]),
+                'more': max(0, len(digest[section]) - limit),
+            }
+            for section, title in SECTIONS.items()
+        ]
+        for section in sections:
+            for task in section['tasks']:
+                if 'text' not in task:
+                    # Jinja2 drops a template's final newline and Django keeps it
+                    task['text'] = task_text.render({'task': task}).rstrip('\n')
+                    task['html'] = mark_safe(task_html.render({'task': task}).rstrip('\n'))
+        context = {
+            'user': user,
+            'name': user.first_name or user.username,
+            'now': now,
+            'as_of': as_of,
+            'sections': sections,
+            'tasks_url': tasks_url,
+        }
+        counts = {section['name']: section['total'] for section in sections}
+        subject = f"Tasks: {counts['overdue']} overdue, {counts['today']} due today, {counts['upcoming']} upcoming"
+        message = EmailMultiAlternatives(
+            subject,
+            text_template.render(context),
+            settings.DEFAULT_FROM_EMAIL,
+            [user.email],
+            connection=connection,
+        )
+        message.attach_alternative(html_template.render(context), 'text/html')
+        yield message
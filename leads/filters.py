@@ -0,0 +1,158 @@
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Q, Value
+from django.utils import timezone
+
+from .models import IST
+from .territories import territory_codes
+
+
+# Lead list sort orders: GET value -> order_by(); the first is the default
+LEAD_SORTS = {
+    'newest': ('-created_date', '-lead_id'),
+    'oldest': ('created_date', 'lead_id'),
+    'updated': ('-updated_date', '-lead_id'),
+}
+
+
+def filter_leads(leads_queryset, params):
+    """Apply the lead list search/status/stage/source/territory/pincode/idle filters and sort from a GET QueryDict"""
+    # Filter by search query
+    search_query = params.get('search', '')
+    if search_query:
+        leads_queryset = leads_queryset.filter(
+            Q(name__icontains=search_query) |
+            Q(number__icontains=search_query) |
+            Q(email__icontains=search_query) |
+            Q(pincode__icontains=search_query)
+        )
+
+    # Filter by lead status
+    status_filter = params.get('status', '')
+    if status_filter:
+        leads_queryset = leads_queryset.filter(lead_status=status_filter)
+
+    # Filter by lead stage
+    stage_filter = params.get('stage', '')
+    if stage_filter:
+        leads_queryset = leads_queryset.filter(lead_stage=stage_filter)
+
+    # Filter by lead source
+    source_filter = params.get('source', '')
+    if source_filter:
+        leads_queryset = leads_queryset.filter(leadsource=source_filter)
+
+    # City or region, by the indexed territory column
+    territory_filter = params.get('territory', '')
+    if territory_filter:
+        leads_queryset = leads_queryset.filter(territory__in=territory_codes(territory_filter))
+
+    # Pincode prefix ("560" for Bengaluru)
+    pincode_filter = params.get('pincode', '').strip()
+    if pincode_filter:
+        leads_queryset = leads_queryset.filter(pincode__startswith=pincode_filter)
+
+    # No activity in the last N days
+    idle_days = idle_days_param(params)
+    if idle_days:
+        cutoff = timezone.now() - timedelta(days=idle_days)
+        leads_queryset = leads_queryset.exclude(activities__created_date__gte=cutoff)
+
+    return leads_queryset.order_by(*LEAD_SORTS.get(params.get('sort', ''), LEAD_SORTS['newest']))
+
+
+def idle_days_param(params):
+    """The "no activity in N days" filter as a positive int, or None"""
+    value = params.get('idle_days', '')
+    return int(value) if value.isdigit() and int(value) > 0 else None
+
+
+# Task board tabs: GET value -> ActivityQuerySet method
+TASK_TABS = {
+    'overdue': 'overdue',
+    'today': 'due_today',
+    'week': 'due_this_week',
+    'upcoming': 'upcoming',
+}
+
+
+def filter_tasks(task_activities, params, user=None):
+    """Apply the task board tab/owner/status/priority/territory filters from a GET QueryDict"""
+    # Schedule tabs (open tasks only, IST day boundaries)
+    tab = params.get('tab', '')
+    if tab in TASK_TABS:
+        task_activities = getattr(task_activities, TASK_TABS[tab])()
+
+    # Only the requesting user's tasks
+    if user is not None and params.get('owner') == 'me':
+        task_activities = task_activities.for_user(user)
+
+    # Filter by completion status - default to showing all tasks
+    status_filter = params.get('status', 'all')
+    if status_filter == 'completed':
+        task_activities = task_activities.filter(is_completed=True)
+    elif status_filter == 'pending':
+        task_activities = task_activities.filter(is_completed=Value(False))
+    # 'all' shows everything
+
+    # Filter by priority
+    priority_filter = params.get('priority', '')
+    if priority_filter:
+        task_activities = task_activities.filter(priority=priority_filter)
+
+    # Filter by the lead's city or region
+    territory_filter = params.get('territory', '')
+    if territory_filter:
+        task_activities = task_activities.filter(lead__territory__in=territory_codes(territory_filter))
+
+    return task_activities
+
+
+# Recording sort options: GET value -> ordering
+RECORDING_SORTS = {
+    'newest': ('-created_date',),
+    'oldest': ('created_date',),
+    'longest': ('-recording_duration', '-created_date'),
+    'shortest': ('recording_duration', '-created_date'),
+    'largest': ('-recording_size', '-created_date'),
+}
+
+
+def filter_call_recordings(call_activities, params):
+    """Apply the call recordings search, staff, date, length filters and sort from a GET QueryDict"""
+    # Search by lead, description or staff member
+    search_query = params.get('search', '')
+    if search_query:
+        call_activities = call_activities.filter(
+            Q(lead__name__icontains=search_query) |
+            Q(description__icontains=search_query) |
+            Q(created_by__username__icontains=search_query)
+        )
+
+    # Filter by the staff member who logged the call
+    staff_filter = params.get('staff', '')
+    if staff_filter.isdigit():
+        call_activities = call_activities.filter(created_by_id=int(staff_filter))
+
+    # Filter by call date range, given as IST dates (both ends inclusive)
+    for param, lookup, days in (('date_from', 'created_date__gte', 0), ('date_to', 'created_date__lt', 1)):
+        try:
+            day = datetime.strptime(params.get(param, ''), '%Y-%m-%d').date() + timedelta(days=days)
+        except (ValueError, OverflowError):
+            # Unparseable, or the day after 9999-12-31: no bound
+            continue
+        if day == date.min:
+            # Midnight IST on the first day is before datetime.min in UTC; no call is older anyway
+            continue
+        call_activities = call_activities.filter(**{lookup: datetime.combine(day, time.min, tzinfo=IST)})
+
+    # Filter by length, given in minutes
+    for param, lookup in (('min_minutes', 'recording_duration__gte'), ('max_minutes', 'recording_duration__lte')):
+        try:
+            minutes = float(params.get(param, ''))
+        except ValueError:
+            continue
+        call_activities = call_activities.filter(**{lookup: minutes * 60})
+
+    ordering = RECORDING_SORTS.get(params.get('sort', ''), RECORDING_SORTS['newest'])
+    return call_activities.order_by(*ordering)
@@ -0,0 +1,267 @@
+"""
+Lead ingestion webhook for ad platforms and the WhatsApp Business integration.
+
+The request path only validates the payload and inserts staging rows
+(``LeadIngestItem``) with one ``bulk_create``, so a burst of leads costs one
+commit per webhook call rather than one per lead. ``drain_ingest_queue`` (run
+by the ``leads.drain_lead_ingest`` background job, or ``manage.py
+drain_lead_ingest``) claims pending rows in batches, drops duplicates by
+normalized phone, assigns managers (see leads/assignment.py) and creates the
+leads with ``bulk_create``; leads matching an existing one by email or name
+and pincode are flagged for review.
+"""
+import hashlib
+import hmac
+import json
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from jobs.queue import enqueue_once
+
+from .archive import restore_leads
+from .assignment import assign_leads
+from .dedup import flag_duplicates
+from .models import ArchivedLead, Lead, LeadIngestItem, normalize_phone
+from .search import index_leads
+
+# Payload key -> Lead field; anything else in the payload is kept on the staging row only
+PAYLOAD_FIELDS = {
+    'name': 'name',
+    'email': 'email',
+    'number': 'number',
+    'phone': 'number',
+    'address': 'address',
+    'pincode': 'pincode',
+    'notes': 'notes',
+    'remarks': 'remarks',
+    'leadsource': 'leadsource',
+    'source': 'leadsource',
+}
+LEAD_SOURCES = {value for value, label in Lead.LEAD_SOURCE_CHOICES}
+
+
+def authenticate_source(request):
+    """Return the integration name for the request's bearer token, or None"""
+    header = request.headers.get('Authorization', '')
+    token = header[7:].strip() if header.startswith('Bearer ') else request.headers.get('X-Ingest-Token', '')
+    if not token:
+        return None
+    for known_token, source in settings.LEAD_INGEST_TOKENS.items():
+        if hmac.compare_digest(token.encode(), known_token.encode()):
+            return source
+    return None
+
+
+def lead_fields(payload):
+    """Map a payload dict onto Lead field values"""
+    fields = {}
+    for key, field in PAYLOAD_FIELDS.items():
+        value = payload.get(key)
+        if value not in (None, '') and field not in fields:
+            fields[field] = str(value).strip()
+    return fields
+
+
+def idempotency_key_for(source, payload, header_key=None):
+    """Caller-supplied key if any, otherwise a hash of the canonical payload"""
+    key = payload.get('idempotency_key') or header_key
+    if key:
+        return f'{source}:{key}'[:128]
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return f'{source}:sha256:{hashlib.sha256(canonical.encode()).hexdigest()}'
+
+
+@csrf_exempt
+@require_POST
+def ingest_leads_view(request):
+    """Accept one lead, a list of leads or {"leads": [...]} and stage them"""
+    source = authenticate_source(request)
+    if source is None:
+        return JsonResponse({'error': 'Invalid or missing ingestion token.'}, status=401)
+
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid Content-Length.'}, status=400)
+    if content_length > settings.LEAD_INGEST_MAX_BYTES:
+        return JsonResponse({'error': 'Payload too large.'}, status=413)
+    try:
+        # Read the stream directly: request.body enforces DATA_UPLOAD_MAX_MEMORY_SIZE
+        data = json.loads(request.read() or b'null')
+    except ValueError:
+        return JsonResponse({'error': 'Body must be JSON.'}, status=400)
+
+    if isinstance(data, dict):
+        payloads = data['leads'] if isinstance(data.get('leads'), list) else [data]
+    elif isinstance(data, list):
+        payloads = data
+    else:
+        return JsonResponse({'error': 'Expected a lead object or a list of leads.'}, status=400)
+    if len(payloads) > settings.LEAD_INGEST_MAX_BATCH:
+        return JsonResponse({'error': f'At most {settings.LEAD_INGEST_MAX_BATCH} leads per request.'}, status=413)
+
+    header_key = request.headers.get('Idempotency-Key') if len(payloads) == 1 else None
+    items, rejected = {}, []
+    for index, payload in enumerate(payloads):
+        if not isinstance(payload, dict):
+            rejected.append({'index': index, 'error': 'Lead must be an object.'})
+            continue
+        fields = lead_fields(payload)
+        if not (fields.get('name') or fields.get('number') or fields.get('email')):
+            rejected.append({'index': index, 'error': 'A name, number or email is required.'})
+            continue
+        key = idempotency_key_for(source, payload, header_key)
+        items.setdefault(key, LeadIngestItem(
+            idempotency_key=key,
+            source=source,
+            payload=payload,
+            phone_normalized=normalize_phone(fields.get('number')) or None,
+        ))
+
+    # One read to report replays, one INSERT for everything new
+    already_seen = set(
+        LeadIngestItem.objects.filter(idempotency_key__in=list(items)).values_list('idempotency_key', flat=True)
+    )
+    LeadIngestItem.objects.bulk_create(
+        [item for key, item in items.items() if key not in already_seen],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    if len(items) > len(already_seen):
+        # Hand the import to a worker; one queued drain picks up every staged row
+        enqueue_once('leads.drain_lead_ingest')
+
+    return JsonResponse({
+        'accepted': len(items) - len(already_seen),
+        'duplicates': len(payloads) - len(rejected) - len(items) + len(already_seen),
+        'rejected': rejected,
+    }, status=202)
+
+
+def claim_pending(batch_size):
+    """
+    Claim up to batch_size pending rows for this drain run.
+
+    The claim is a conditional UPDATE (``status='pending'`` in the WHERE
+    clause), so concurrent drainers never both win the same row on any
+    backend; each run then reads back only the rows stamped with its id.
+    """
+    batch_id = uuid.uuid4()
+    ids = list(
+        LeadIngestItem.objects.filter(status='pending').order_by('id').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    LeadIngestItem.objects.filter(id__in=ids, status='pending').update(status='processing', batch_id=batch_id)
+    return list(LeadIngestItem.objects.filter(batch_id=batch_id).order_by('id'))
+
+
+def build_lead(item, fields):
+    """Unsaved Lead for a staging row; mirrors what Lead.save() derives"""
+    lead = Lead(**{name: value for name, value in fields.items() if name != 'leadsource'})
+    source = fields.get('leadsource', item.source).lower()
+    lead.leadsource = source if source in LEAD_SOURCES else None
+    lead.phone_normalized = item.phone_normalized
+    if item.phone_normalized:
+        lead.whatsapp_url = f"https://wa.me/+{item.phone_normalized}"
+    lead.set_dedup_keys()
+    lead.set_territory()
+    return lead
+
+
+def record_outcomes(items):
+    """
+    Write back each staging row's outcome with one prepared UPDATE.
+
+    bulk_update() would compile a CASE expression per column over the whole
+    batch, which costs more than the inserts themselves at these sizes.
+    """
+    meta = LeadIngestItem._meta
+    fields = [meta.get_field(name) for name in ('status', 'lead', 'error', 'processed_date')]
+    qn = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        qn(meta.db_table),
+        ', '.join(f'{qn(field.column)} = %s' for field in fields),
+        qn(meta.pk.column),
+    )
+    rows = [
+        [field.get_db_prep_save(getattr(item, field.attname), connection) for field in fields] + [item.pk]
+        for item in items
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def release_batch(batch_id):
+    """Return a claimed batch to the queue, for the next drain to pick up"""
+    return LeadIngestItem.objects.filter(batch_id=batch_id, status='processing').update(status='pending', batch_id=None)
+
+
+def drain_ingest_queue(batch_size=500):
+    """Turn one batch of staged rows into leads; returns (imported, duplicates, failed)"""
+    items = claim_pending(batch_size)
+    if not items:
+        return 0, 0, 0
+    try:
+        return import_batch(items)
+    except Exception:
+        # The claim committed on its own; without this the rolled-back batch
+        # would sit in 'processing' where no drain looks for it
+        release_batch(items[0].batch_id)
+        raise
+
+
+def import_batch(items):
+    """Create the leads for claimed rows and record every row's outcome"""
+    phones = {item.phone_normalized for item in items if item.phone_normalized}
+    known_phones = dict(
+        Lead.objects.filter(phone_normalized__in=phones).values_list('phone_normalized', 'lead_id')
+    )
+    # A returning customer whose lead was archived gets that lead back
+    archived = dict(
+        ArchivedLead.objects.filter(phone_normalized__in=phones - known_phones.keys()).values_list('phone_normalized', 'lead_id')
+    )
+    if archived:
+        restore_leads(archived.values())
+        known_phones.update(archived)
+
+    new_leads = []
+    now = timezone.now()
+    for item in items:
+        item.processed_date = now
+        phone = item.phone_normalized
+        if phone and phone in known_phones:
+            # Same customer already exists (or arrived earlier in this batch)
+            item.status = 'duplicate'
+            item.lead_id = known_phones[phone]
+            continue
+        try:
+            lead = build_lead(item, lead_fields(item.payload))
+            lead.full_clean(exclude=['lead_manager', 'categories', 'products_data'], validate_unique=False)
+        except Exception as e:
+            item.status = 'failed'
+            item.error = str(e)
+            continue
+        item.status = 'imported'
+        item.lead_id = lead.lead_id
+        new_leads.append(lead)
+        if phone:
+            known_phones[phone] = lead.lead_id
+
+    with transaction.atomic():
+        # Spread the new leads over the managers taking assignments
+        assign_leads(new_leads)
+        Lead.objects.bulk_create(new_leads, batch_size=1000)
+        record_outcomes(items)
+        # bulk_create skips Lead.save(), so flag email / name matches and index the text here
+        flag_duplicates(new_leads)
+        index_leads(new_leads)
+
+    duplicates = sum(1 for item in items if item.status == 'duplicate')
+    return len(new_leads), duplicates, len(items) - len(new_leads) - duplicates
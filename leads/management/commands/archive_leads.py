@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from leads.archive import archive_leads, cold_leads, restore_leads
+
+
+class Command(BaseCommand):
+    help = 'Move cold leads, with their activities and notes, into the archive tables, or restore archived leads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Leads moved per transaction')
+        parser.add_argument('--limit', type=int, default=0, help='Archive at most this many leads (0 = no limit)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many leads would be archived')
+        parser.add_argument('--restore', nargs='+', metavar='LEAD_ID', help='Move these archived leads back to the hot tables')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            restored = restore_leads(options['restore'])
+            self.stdout.write(self.style.SUCCESS(f'Restored {restored} lead(s)'))
+            return
+
+        now = timezone.now()
+        candidates = cold_leads(now).order_by('created_date', 'lead_id')
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} lead(s) due for archiving')
+            return
+
+        total = 0
+        while not options['limit'] or total < options['limit']:
+            size = options['batch_size']
+            if options['limit']:
+                size = min(size, options['limit'] - total)
+            batch = list(candidates.values_list('created_date', 'lead_id')[:size])
+            if not batch:
+                break
+            total += archive_leads([lead_id for _, lead_id in batch], now)
+            # Continue after this batch so leads that stopped qualifying are not retried
+            last_created, last_id = batch[-1]
+            candidates = candidates.filter(
+                Q(created_date__gt=last_created) | Q(created_date=last_created, lead_id__gt=last_id)
+            )
+            self.stdout.write(f'Archived {total} lead(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {total} lead(s) archived'))
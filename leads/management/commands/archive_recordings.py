@@ -0,0 +1,94 @@
+import zlib
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from leads.models import Activity, PackedRecording
+from leads.recording_archive import (
+    ArchiveError, archivable_recordings, archive_batch, archive_lock, restore_recording, verify_entry,
+)
+
+
+class Command(BaseCommand):
+    help = 'Move old call recordings into compressed archive packs, verify packs, or restore recordings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Recordings appended per pack write and index commit')
+        parser.add_argument('--limit', type=int, default=0, help='Archive at most this many recordings (0 = no limit)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+        parser.add_argument('--verify', action='store_true', help='Check every archived recording against its checksum')
+        parser.add_argument('--restore', type=int, nargs='+', metavar='ACTIVITY_ID', help='Unpack these activities\' recordings back to raw files')
+
+    def handle(self, *args, **options):
+        storage = Activity._meta.get_field('recording').storage
+        try:
+            if options['restore']:
+                return self.restore(options['restore'], storage)
+            if options['verify']:
+                return self.verify()
+            self.archive(options, storage)
+        except ArchiveError as e:
+            raise CommandError(str(e))
+
+    def archive(self, options, storage):
+        candidates = archivable_recordings()
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} recording(s) due for archival')
+            return
+
+        total = bytes_in = bytes_out = 0
+        with archive_lock():
+            while not options['limit'] or total < options['limit']:
+                size = options['batch_size']
+                if options['limit']:
+                    size = min(size, options['limit'] - total)
+                batch = list(candidates.only('id', 'created_date', 'recording', 'recording_checksum')[:size])
+                if not batch:
+                    break
+                archived, batch_in, batch_out = archive_batch(batch, storage)
+                # Continue after this batch so recordings missing on disk are not retried forever
+                last = batch[-1]
+                candidates = candidates.filter(
+                    Q(created_date__gt=last.created_date) | Q(created_date=last.created_date, id__gt=last.id)
+                )
+                total += archived
+                bytes_in += batch_in
+                bytes_out += batch_out
+                self.stdout.write(f'Archived {total} recording(s)')
+
+        saved = bytes_in - bytes_out
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {total} recording(s), {bytes_in / 1e6:.1f} MB packed into {bytes_out / 1e6:.1f} MB '
+            f'({saved / 1e6:.1f} MB saved by compression)'
+        ))
+
+    def verify(self):
+        checked = failed = 0
+        for packed in PackedRecording.objects.iterator(chunk_size=500):
+            checked += 1
+            try:
+                if verify_entry(packed):
+                    PackedRecording.objects.filter(pk=packed.pk).update(verified_date=timezone.now())
+                    continue
+                error = 'checksum mismatch'
+            except (ArchiveError, OSError, zlib.error) as e:
+                error = str(e)
+            failed += 1
+            self.stderr.write(f'{packed.name} in {packed.pack}: {error}')
+        stored = PackedRecording.objects.aggregate(size=Sum('size'), length=Sum('length'))
+        self.stdout.write(f'{checked} archived recording(s), {(stored["size"] or 0) / 1e6:.1f} MB in '
+                          f'{(stored["length"] or 0) / 1e6:.1f} MB of packs')
+        if failed:
+            raise CommandError(f'{failed} archived recording(s) failed verification')
+        self.stdout.write(self.style.SUCCESS('All archived recordings verified'))
+
+    def restore(self, activity_ids, storage):
+        names = Activity.objects.filter(id__in=activity_ids).exclude(recording='').values_list('recording', flat=True)
+        restored = 0
+        with archive_lock():
+            for name in names:
+                if PackedRecording.objects.filter(name=name).exists():
+                    restore_recording(name, storage)
+                    restored += 1
+        self.stdout.write(self.style.SUCCESS(f'Restored {restored} recording(s)'))
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+
+from leads.assignment import STRATEGIES, distribute_leads, recount_open_leads
+from leads.models import Lead
+
+
+class Command(BaseCommand):
+    help = 'Assign unassigned open leads to managers, or rebuild the open-lead counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strategy', choices=STRATEGIES, help='Defaults to LEAD_ASSIGNMENT_STRATEGY')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Leads assigned per transaction')
+        parser.add_argument('--recount', action='store_true', help='Only rebuild ManagerCapacity.open_leads from the leads table')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            corrected = recount_open_leads()
+            self.stdout.write(self.style.SUCCESS(f'Corrected {corrected} counter(s)'))
+            return
+
+        unassigned = Lead.objects.filter(lead_manager__isnull=True).exclude(lead_stage__in=settings.LEAD_CLOSED_STAGES)
+        totals = {}
+        while True:
+            batch_ids = list(unassigned.order_by('created_date').values_list('pk', flat=True)[:options['batch_size']])
+            if not batch_ids:
+                break
+            assigned = distribute_leads(Lead.objects.filter(pk__in=batch_ids), options['strategy'])
+            # Leads nobody had room for stay unassigned; stop rather than spin
+            if not any(user_id for user_id in assigned):
+                break
+            for user_id, n in assigned.items():
+                totals[user_id] = totals.get(user_id, 0) + n
+            self.stdout.write(f'Assigned {sum(totals.values())} lead(s)')
+
+        usernames = dict(User.objects.filter(id__in=totals).values_list('id', 'username'))
+        for user_id, n in sorted(totals.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'  {usernames.get(user_id, user_id)}: {n}')
+        self.stdout.write(self.style.SUCCESS(f'Done: {sum(totals.values())} lead(s) assigned'))
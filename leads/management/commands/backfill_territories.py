@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from leads.models import ArchivedLead, Lead
+from leads.saved_views import invalidate_saved_views
+from leads.territories import backfill_territories, table
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the territory of every lead, hot and archived, from its pincode. '
+        'Run after changing the pincode territory table (PINCODE_TERRITORIES_FILE).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Leads read per query')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        territories = table()
+        self.stdout.write(f"{len(territories['prefixes'])} prefixes, {len(territories['territories'])} territories in {len(territories['regions'])} regions")
+        started = time.perf_counter()
+        total = 0
+        for model in (Lead, ArchivedLead):
+            seen, changed = backfill_territories(
+                model,
+                batch_size=options['batch_size'],
+                progress=lambda seen, changed, model=model: self.stdout.write(f'{model._meta.verbose_name_plural}: {seen} checked, {changed} changed'),
+            )
+            total += changed
+        if total:
+            # The territory changes leave no trace in updated_date
+            invalidate_saved_views()
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - started:.1f}s: {total} territories changed'))
@@ -0,0 +1,150 @@
+import json
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from leads.benchmarks import git_commit, latency_summary
+from leads.models import Activity, Lead, TaskNote
+
+# scenario -> (url name, list of query strings cycled through per request)
+SCENARIOS = {
+    'lead_list': ('leads:lead_list', ['', 'stage=cold_follow_up', 'search=sharma', 'status=active&page=50']),
+    'lead_detail': ('leads:lead_detail', None),
+    'tasks': ('leads:tasks', ['tab=today', 'tab=overdue', 'tab=week&owner=me', 'status=pending&priority=high']),
+    'call_recordings': ('leads:call_recordings', ['', 'sort=longest', 'min_minutes=5', 'page=20']),
+    'search': ('leads:search', ['q=teak recliner', 'q=samples', 'q=discount&page=3']),
+    'product_autocomplete': ('leads:product_autocomplete', ['q=s', 'q=sofa m', 'q=model 4', 'q=', 'q=rec']),
+    'admin_leads': ('admin:leads_lead_changelist', ['', 'q=sharma', 'p=10']),
+    'admin_activities': ('admin:leads_activity_changelist', ['', 'activity_type__exact=task']),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main pages through the test client: latency percentiles, queries per request '
+        'and peak RSS, saved as JSON for comparison across commits. Seed data first with seed_bench.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User to authenticate as (default: first superuser)')
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                            help='Scenario(s) to run; repeatable (default: all)')
+        parser.add_argument('--requests', type=int, default=100, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario first')
+        parser.add_argument('--output', help='JSON results file (default: bench-results/<commit>-<time>.json)')
+        parser.add_argument('--compare', help='Earlier JSON results to print p50/p95 and query changes against')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the sampled leads')
+
+    def handle(self, *args, **options):
+        # The test client sends Host: testserver, which the test runner normally allows
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            results = self.run(options)
+
+        output = Path(options['output'] or f'bench-results/{results["commit"][:12]}-{time.strftime("%Y%m%d-%H%M%S")}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'\nResults written to {output}'))
+
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), results)
+
+    def run(self, options):
+        user = self.get_user(options['username'])
+        client = Client()
+        client.force_login(user)
+        lead_ids = self.sample_leads(options['seed'], 50)
+
+        scenarios = {}
+        for name in options['scenario'] or list(SCENARIOS):
+            url_name, queries = SCENARIOS[name]
+            if queries is None:
+                if not lead_ids:
+                    raise CommandError(f'Scenario "{name}" needs at least one lead in the database.')
+                urls = [reverse(url_name, kwargs={'lead_id': lead_id}) for lead_id in lead_ids]
+            else:
+                base = reverse(url_name)
+                urls = [f'{base}?{query}' if query else base for query in queries]
+
+            for i in range(options['warmup']):
+                client.get(urls[i % len(urls)])
+
+            latencies, query_counts, errors = [], [], 0
+            for i in range(options['requests']):
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.get(urls[i % len(urls)])
+                    latencies.append((time.perf_counter() - started) * 1000)
+                query_counts.append(len(captured))
+                errors += response.status_code >= 400
+
+            scenarios[name] = {
+                **latency_summary(latencies),
+                'queries_avg': round(sum(query_counts) / len(query_counts), 1) if query_counts else 0,
+                'queries_max': max(query_counts, default=0),
+                'errors': errors,
+            }
+            self.report(name, scenarios[name])
+
+        return {
+            'commit': git_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'python': sys.version.split()[0],
+            'database': connection.vendor,
+            'rows': {
+                'leads': Lead.objects.count(),
+                'activities': Activity.objects.count(),
+                'task_notes': TaskNote.objects.count(),
+            },
+            'requests': options['requests'],
+            # ru_maxrss is in KB on Linux (bytes on macOS)
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1),
+            'scenarios': scenarios,
+        }
+
+    def get_user(self, username):
+        users = User.objects.all()
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No user to authenticate as; pass --username or create a superuser.')
+        return user
+
+    def sample_leads(self, seed, number):
+        """Random lead ids spread over the table, by sampling offsets rather than ORDER BY RANDOM()"""
+        total = Lead.objects.count()
+        if not total:
+            return []
+        rng = random.Random(seed)
+        ids = Lead.objects.order_by('-created_date').values_list('lead_id', flat=True)
+        return [ids[rng.randrange(total)] for _ in range(min(number, total))]
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:18} p50 {result["p50_ms"]:8.2f} ms   p95 {result["p95_ms"]:8.2f} ms   '
+            f'p99 {result["p99_ms"]:8.2f} ms   queries {result["queries_avg"]:5.1f} (max {result["queries_max"]})   '
+            f'errors {result["errors"]}'
+        )
+
+    def compare(self, before, after):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nCompared with {before["commit"][:12]} ({before["timestamp"]})'))
+        for name, result in after['scenarios'].items():
+            old = before['scenarios'].get(name)
+            if old is None:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms'):
+                change = (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                changes.append(f'{key[:3]} {old[key]:.2f} -> {result[key]:.2f} ms ({change:+.0f}%)')
+            changes.append(f'queries {old["queries_avg"]} -> {result["queries_avg"]}')
+            self.stdout.write(f'{name:18} ' + '   '.join(changes))
+        self.stdout.write(f'{"peak RSS":18} {before["peak_rss_mb"]} -> {after["peak_rss_mb"]} MB')
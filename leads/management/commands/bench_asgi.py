@@ -0,0 +1,120 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from leads.benchmarks import latency_summary
+from leads.models import Activity
+
+# endpoint name -> (sync url name, async url name, needs a task id, method)
+ENDPOINTS = {
+    'leads': ('leads:api_lead_list', 'leads:async_api_lead_list', False, 'get'),
+    'tasks': ('leads:api_tasks', 'leads:async_api_tasks', False, 'get'),
+    'notes': ('leads:api_task_notes', 'leads:async_api_task_notes', True, 'get'),
+    'add-note': ('leads:add_task_note', 'leads:async_add_task_note', True, 'post'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test: concurrent-request throughput of the WSGI handler with the sync views '
+        'versus the ASGI handler with the async views, in this one process. '
+        'Run it against a database seeded with realistic data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User to authenticate as (default: first superuser)')
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), action='append',
+                            help='Endpoint(s) to hit; repeatable (default: leads and tasks)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and handler')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+
+    def handle(self, *args, **options):
+        # The test clients send Host: testserver, which the test runner normally allows
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.run(options)
+
+    def run(self, options):
+        user = self.get_user(options['username'])
+        task_id = Activity.objects.filter(activity_type='task').values_list('id', flat=True).first()
+
+        for name in options['endpoint'] or ['leads', 'tasks']:
+            sync_name, async_name, needs_task, method = ENDPOINTS[name]
+            if needs_task and task_id is None:
+                raise CommandError(f'Endpoint "{name}" needs at least one task in the database.')
+            kwargs = {'activity_id': task_id} if needs_task else {}
+            data = {'note': 'bench_asgi load test note'} if method == 'post' else None
+
+            wsgi = self.run_wsgi(user, reverse(sync_name, kwargs=kwargs), method, data, options)
+            asgi = self.run_asgi(user, reverse(async_name, kwargs=kwargs), method, data, options)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name} ({options["requests"]} requests, concurrency {options["concurrency"]})'))
+            for label, (elapsed, latencies, errors) in (('WSGI/sync ', wsgi), ('ASGI/async', asgi)):
+                summary = latency_summary(latencies)
+                self.stdout.write(
+                    f'  {label}  {len(latencies) / elapsed:8.1f} req/s   '
+                    f'p50 {summary["p50_ms"]:7.2f} ms   p95 {summary["p95_ms"]:7.2f} ms   '
+                    f'p99 {summary["p99_ms"]:7.2f} ms   errors {errors}'
+                )
+
+    def get_user(self, username):
+        users = User.objects.all()
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No user to authenticate as; pass --username or create a superuser.')
+        return user
+
+    def run_wsgi(self, user, url, method, data, options):
+        """Thread pool of test clients driving the WSGI handler"""
+        remaining = iter(range(options['requests']))
+
+        def worker():
+            client = Client()
+            client.force_login(user)
+            latencies, errors = [], 0
+            for _ in remaining:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += response.status_code >= 400
+            connections.close_all()
+            return latencies, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = [f.result() for f in [pool.submit(worker) for _ in range(options['concurrency'])]]
+        elapsed = time.perf_counter() - started
+        return elapsed, [ms for latencies, _ in results for ms in latencies], sum(e for _, e in results)
+
+    def run_asgi(self, user, url, method, data, options):
+        """Concurrent coroutines driving the ASGI handler on one event loop"""
+        clients = []
+        for _ in range(options['concurrency']):
+            # force_login touches the database synchronously, so do it before the loop starts
+            client = AsyncClient()
+            client.force_login(user)
+            clients.append(client)
+        remaining = iter(range(options['requests']))
+
+        async def worker(client):
+            latencies, errors = [], 0
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await getattr(client, method)(url, data)
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += response.status_code >= 400
+            return latencies, errors
+
+        async def main():
+            return await asyncio.gather(*(worker(client) for client in clients))
+
+        started = time.perf_counter()
+        results = asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        return elapsed, [ms for latencies, _ in results for ms in latencies], sum(e for _, e in results)
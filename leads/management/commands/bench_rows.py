@@ -0,0 +1,122 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.formats import date_format, time_format
+
+from leads.benchmarks import latency_summary
+from leads.models import Activity, Lead, TaskNote
+from leads.projections import CALL_ROW_FIELDS, LEAD_ROW_FIELDS, call_rows, lead_rows, task_rows
+
+
+def lead_labels(lead):
+    """What _lead_rows.html read from a Lead instance"""
+    created = lead.get_ist_created_date()
+    return (
+        reverse('leads:lead_detail', kwargs={'lead_id': lead.lead_id}), lead.get_whatsapp_link(), lead.get_products_summary(),
+        lead.get_lead_stage_display(), lead.get_lead_status_display(), date_format(created, 'M d, Y'), time_format(created, 'h:i A'),
+    )
+
+
+def owner_label(user):
+    return user.get_full_name() or user.username
+
+
+def task_labels(task):
+    """What _task_board.html read from an Activity instance, its lead and its notes"""
+    lead = task.lead
+    due = task.get_ist_due_date() if task.due_date else None
+    return (
+        reverse('leads:lead_detail', kwargs={'lead_id': lead.lead_id}), lead.get_whatsapp_link(),
+        lead.get_lead_stage_display(), lead.get_lead_status_display(), task.get_priority_display(),
+        due and (date_format(due, 'M d, Y'), date_format(due, 'g:i A'), date_format(due, 'M d, Y g:i A')),
+        owner_label(task.created_by), date_format(task.get_ist_created_date(), 'M d, Y g:i A'),
+        [(owner_label(note.created_by), date_format(note.get_ist_created_date(), 'M d, Y g:i A')) for note in task.notes.all()],
+    )
+
+
+def call_labels(call):
+    """What call_recordings.html read from an Activity instance and its lead"""
+    lead = call.lead
+    return (
+        reverse('leads:lead_detail', kwargs={'lead_id': lead.lead_id}), lead.get_whatsapp_link(),
+        lead.get_lead_stage_display(), lead.get_lead_status_display(), call.recording.url, call.recording.name,
+        call.get_recording_duration_display(), owner_label(call.created_by), date_format(call.get_ist_created_date(), 'M d, Y g:i A'),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark building the rows of the lead list, task board and call recordings pages: model instances '
+        'and their display helpers against the values() projections the pages use (see leads/projections.py). '
+        'Reports time and memory per row on the current database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows per page built (default: 500)')
+        parser.add_argument('--repeat', type=int, default=10, help='Measured builds per page and path')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows and --repeat must be at least 1.')
+        rows = options['rows']
+        leads = Lead.objects.order_by('-created_date')
+        # The same tasks for both paths, picked once: the board's sort over every task costs both the same and would swamp the rows
+        task_ids = list(Activity.objects.filter(activity_type='task').order_by('due_date', 'created_date').values_list('pk', flat=True)[:rows])
+        tasks = Activity.objects.filter(pk__in=task_ids).order_by('due_date', 'created_date').with_schedule(timezone.now())
+        calls = Activity.objects.filter(activity_type='call', recording__isnull=False).exclude(recording='').order_by('-created_date')
+        notes = Prefetch('notes', queryset=TaskNote.objects.select_related('created_by'))
+        pages = {
+            'lead list': (
+                lambda: [(lead, lead_labels(lead)) for lead in leads.select_related('lead_manager')[:rows]],
+                lambda: lead_rows(leads.values(*LEAD_ROW_FIELDS)[:rows]),
+            ),
+            'task board': (
+                lambda: [(task, task_labels(task)) for task in tasks.select_related('lead', 'created_by').prefetch_related(notes)[:rows]],
+                lambda: task_rows(tasks[:rows]),
+            ),
+            'call recordings': (
+                lambda: [(call, call_labels(call)) for call in calls.select_related('lead', 'created_by')[:rows]],
+                lambda: call_rows(calls.values(*CALL_ROW_FIELDS)[:rows]),
+            ),
+        }
+        for page, (instances, projection) in pages.items():
+            built = len(projection())
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{page} ({built} rows)'))
+            if not built:
+                self.stdout.write('  no rows to build; skipped')
+                continue
+            results = {}
+            for path, build in (('instances', instances), ('projection', projection)):
+                results[path] = self.measure(build, built, options['repeat'])
+                timing, peak, retained = results[path]
+                self.stdout.write(
+                    f'  {path:10}  p50 {timing["p50_ms"] * 1000 / built:8.1f} us/row   '
+                    f'peak {peak / built / 1024:6.1f} KB/row   kept {retained / built / 1024:6.2f} KB/row'
+                )
+            (before, before_peak, before_kept), (after, after_peak, after_kept) = results['instances'], results['projection']
+            self.stdout.write(self.style.SUCCESS(
+                f'  projection is {before["p50_ms"] / after["p50_ms"]:.1f}x faster, '
+                f'{before_peak / after_peak:.1f}x lower peak memory, {before_kept / after_kept:.1f}x smaller rows'
+            ))
+
+    def measure(self, build, built, repeat):
+        """(latency summary, peak bytes while building, bytes still held by the built rows)"""
+        build()  # warm-up
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            build()
+            timings.append((time.perf_counter() - started) * 1000)
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = build()
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+        return latency_summary(timings), peak - baseline, retained - baseline
@@ -0,0 +1,126 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.utils import timezone
+
+from leads.benchmarks import latency_summary
+from leads.models import Lead
+from leads.projections import LEAD_FIELDS, NoteRow, TaskRow, detail_url_template, lead_rows
+
+# Row partials of the lead list and task board; rendered from the 'leads' and 'task_activities' context variables
+PARTIALS = ['leads/_lead_rows.html', 'leads/_task_board.html']
+# The two engines escape quotes differently (&#x27; / &#39;, &quot; / &#34;)
+ESCAPES = {'&#x27;': '&#39;', '&quot;': '&#34;'}
+
+
+def normalized(html):
+    """Rendered output with whitespace collapsed and quote escapes unified, for comparing engines"""
+    html = ' '.join(html.split())
+    for escape, replacement in ESCAPES.items():
+        html = html.replace(escape, replacement)
+    return html
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark rendering the lead list and task board row partials with the Django and Jinja2 '
+        'template engines at several row counts, using generated rows (no database queries).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, action='append', help='Row count(s) to render; repeatable (default: 25, 500, 5000)')
+        parser.add_argument('--repeat', type=int, default=10, help='Measured renders per partial, engine and row count')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the generated rows')
+
+    def handle(self, *args, **options):
+        available = [name for name in ('django', 'jinja2') if name in engines]
+        if 'jinja2' not in available:
+            self.stdout.write(self.style.WARNING('Jinja2 is not installed; only the Django engine is measured.'))
+        rng = random.Random(options['seed'])
+
+        for rows in options['rows'] or [25, 500, 5000]:
+            if rows < 0:
+                raise CommandError('--rows must not be negative.')
+            context = {'leads': self.make_leads(rng, rows), 'task_activities': self.make_tasks(rng, rows)}
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{rows} rows'))
+            for partial in PARTIALS:
+                outputs, medians = {}, {}
+                for engine in available:
+                    template = engines[engine].get_template(partial)
+                    outputs[engine] = template.render(context)  # warm-up, and the output compared below
+                    timings = []
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        template.render(context)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    summary = latency_summary(timings)
+                    medians[engine] = summary['p50_ms']
+                    self.stdout.write(
+                        f'  {partial:26} {engine:7} p50 {summary["p50_ms"]:9.2f} ms   '
+                        f'max {summary["max_ms"]:9.2f} ms   {len(outputs[engine]) / 1024:8.1f} KB'
+                    )
+                if len(outputs) == 2:
+                    same = normalized(outputs['django']) == normalized(outputs['jinja2'])
+                    speedup = medians['django'] / medians['jinja2'] if medians['jinja2'] else 0.0
+                    line = f'  {"":26} jinja2 is {speedup:.1f}x faster; output {"identical" if same else "DIFFERS"}'
+                    self.stdout.write(self.style.SUCCESS(line) if same else self.style.ERROR(line))
+
+    def make_leads(self, rng, number):
+        return lead_rows(self.lead_values(rng, number))
+
+    def lead_values(self, rng, number):
+        """LEAD_ROW_FIELDS dicts, as the lead list reads them"""
+        now = timezone.now()
+        return [
+            {
+                'lead_id': uuid.UUID(int=rng.getrandbits(128)),
+                'name': rng.choice(['Asha Sharma', "Ravi D'Souza", 'Meera Iyer', None]),
+                'email': f'lead{i}@example.com' if rng.random() < 0.7 else None,
+                'number': f'98{rng.randrange(10**8):08d}' if rng.random() < 0.9 else None,
+                'whatsapp_url': None,
+                'pincode': f'{rng.randrange(110001, 855999)}' if rng.random() < 0.8 else None,
+                'lead_status': rng.choice(Lead.LEAD_STATUS_CHOICES)[0],
+                'lead_stage': rng.choice(Lead.LEAD_STAGE_CHOICES)[0],
+                'products_data': {'1': {'category_name': 'Curtains', 'products': [{'name': 'Blackout'}] * rng.randrange(3)}},
+                'created_date': now - timedelta(minutes=rng.randrange(60 * 24 * 365)),
+            }
+            for i in range(number)
+        ]
+
+    def make_tasks(self, rng, number):
+        """TaskRows, as tasks_view builds them from TASK_ROW_FIELDS and NOTE_ROW_FIELDS dicts"""
+        now = timezone.now()
+        users = [
+            {'created_by__first_name': rng.choice(['Anil', '']), 'created_by__last_name': 'Kumar', 'created_by__username': f'manager{i}'}
+            for i in range(5)
+        ]
+        leads = [
+            {f'lead__{name}': lead[name] for name in LEAD_FIELDS}
+            for lead in self.lead_values(rng, min(number, 500))
+        ]
+        url_template = detail_url_template()
+        tasks = []
+        for i in range(number):
+            is_completed = rng.random() < 0.2
+            due_date = now + timedelta(hours=rng.randrange(-72, 240)) if rng.random() < 0.9 else None
+            values = {
+                'id': i + 1,
+                'description': f'Call back about the quotation #{i}',
+                'due_date': due_date,
+                'priority': rng.choice(['high', 'medium', 'low', None]),
+                'is_completed': is_completed,
+                'overdue': not is_completed and due_date is not None and due_date < now,
+                'created_date': now - timedelta(days=rng.randrange(30)),
+                **rng.choice(users),
+                **rng.choice(leads),
+            }
+            notes = [
+                NoteRow({'note': 'Customer asked for samples', 'created_date': now, **rng.choice(users)})
+                for _ in range(rng.randrange(3))
+            ]
+            tasks.append(TaskRow(values, url_template, notes))
+        return tasks
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from theopendecor.bundles import build_bundles
+
+
+class Command(BaseCommand):
+    help = (
+        'Concatenate and minify the CSS and JS every page loads into content-hashed bundles under static/bundles/, '
+        'with the icon font cut down to the icons in use and critical CSS to inline. Run before collectstatic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-minify', action='store_true', help='Concatenate only, for debugging a bundle')
+        parser.add_argument('--no-critical', action='store_true', help='Skip the inlined critical CSS')
+
+    def handle(self, *args, **options):
+        manifest = build_bundles(
+            minify=not options['no_minify'],
+            critical=not options['no_critical'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Built {len(manifest["bundles"])} bundle(s); set ASSET_BUNDLES to use them'))
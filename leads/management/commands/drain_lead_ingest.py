@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from leads.ingest import drain_ingest_queue
+from leads.models import LeadIngestItem
+
+
+class Command(BaseCommand):
+    help = 'Create leads from rows staged by the ingestion webhook, in bulk batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Staged rows claimed per transaction')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting once the queue is empty')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds between polls with --loop')
+        parser.add_argument('--requeue-stuck', action='store_true',
+                            help='Return rows left in "processing" by a crashed drain to the queue first '
+                                 '(only while no other drain is running)')
+
+    def handle(self, *args, **options):
+        if options['requeue_stuck']:
+            requeued = LeadIngestItem.objects.filter(status='processing').update(status='pending', batch_id=None)
+            self.stdout.write(f'Requeued {requeued} stuck row(s)')
+
+        totals = [0, 0, 0]
+        while True:
+            imported, duplicates, failed = drain_ingest_queue(options['batch_size'])
+            totals = [totals[0] + imported, totals[1] + duplicates, totals[2] + failed]
+            if imported or duplicates or failed:
+                self.stdout.write(f'Batch: {imported} imported, {duplicates} duplicate(s), {failed} failed')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {totals[0]} imported, {totals[1]} duplicate(s), {totals[2]} failed'
+        ))
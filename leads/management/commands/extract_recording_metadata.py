@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from jobs.queue import enqueue_once
+from leads.audio import recording_fields
+from leads.models import Activity
+
+
+class Command(BaseCommand):
+    help = 'Backfill duration, bitrate, size, codec and checksum for call recordings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-read recordings that already have metadata')
+        parser.add_argument('--enqueue', action='store_true', help='Queue one background job per recording instead of reading inline')
+
+    def handle(self, *args, **options):
+        recordings = Activity.objects.exclude(recording='').exclude(recording__isnull=True)
+        if not options['all']:
+            recordings = recordings.filter(recording_size__isnull=True)
+
+        done = failed = 0
+        for activity in recordings.only('id', 'recording').iterator(chunk_size=500):
+            if options['enqueue']:
+                enqueue_once('leads.extract_recording_metadata', activity_id=activity.pk)
+                done += 1
+                continue
+            try:
+                fields = recording_fields(activity.recording)
+            except OSError as e:
+                failed += 1
+                self.stderr.write(f'{activity.recording.name}: {e}')
+                continue
+            Activity.objects.filter(pk=activity.pk).update(**fields)
+            done += 1
+
+        action = 'Queued' if options['enqueue'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'{action} {done} recording(s), {failed} unreadable'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from leads.dedup import find_clusters, record_clusters
+from leads.models import Lead
+
+
+class Command(BaseCommand):
+    help = 'Scan all leads for duplicate clusters by phone, email and name + pincode, and flag them for review'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill-keys', action='store_true',
+                            help='Recompute the email and name + pincode keys of every lead first')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Leads per key backfill update')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the clusters found')
+
+    def handle(self, *args, **options):
+        if options['backfill_keys']:
+            self.backfill_keys(options['batch_size'])
+
+        clusters = find_clusters()
+        duplicates = sum(len(members) for members in clusters.values())
+        self.stdout.write(f'{len(clusters)} cluster(s) holding {duplicates} likely duplicate lead(s)')
+        if options['dry_run']:
+            return
+        record_clusters(clusters)
+        self.stdout.write(self.style.SUCCESS(f'Flagged {duplicates} lead(s); review them under Duplicate leads in the admin'))
+
+    def backfill_keys(self, batch_size):
+        leads = Lead.objects.order_by('pk').only('lead_id', 'name', 'email', 'pincode')
+        updated = 0
+        last_pk = None
+        while True:
+            page = leads.filter(pk__gt=last_pk) if last_pk else leads
+            batch = list(page[:batch_size])
+            if not batch:
+                break
+            for lead in batch:
+                lead.set_dedup_keys()
+            Lead.objects.bulk_update(batch, ['email_normalized', 'name_pincode_key'])
+            last_pk = batch[-1].pk
+            updated += len(batch)
+            self.stdout.write(f'Backfilled keys for {updated} lead(s)')
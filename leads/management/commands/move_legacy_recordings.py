@@ -0,0 +1,63 @@
+import filecmp
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+RECORDINGS_DIR = 'Call Recordings'
+
+
+class Command(BaseCommand):
+    help = (
+        'Move call recordings uploaded while MEDIA_ROOT was static/ into the current MEDIA_ROOT. '
+        'Recording names stay the same, so Activity.recording needs no update. Safe to re-run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(Path(settings.BASE_DIR) / 'static' / RECORDINGS_DIR),
+                            help='Old recordings directory (default: static/Call Recordings)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be moved')
+
+    def handle(self, *args, **options):
+        source = Path(options['source'])
+        target = Path(settings.MEDIA_ROOT) / RECORDINGS_DIR
+        if not source.is_dir():
+            self.stdout.write(f'Nothing to move: {source} does not exist')
+            return
+        if source.resolve() == target.resolve():
+            raise CommandError(f'{source} already is the recordings directory under MEDIA_ROOT.')
+
+        files = sorted(path for path in source.rglob('*') if path.is_file())
+        if options['dry_run']:
+            self.stdout.write(f'{len(files)} file(s) would be moved from {source} to {target}')
+            return
+
+        moved = duplicates = 0
+        conflicts = []
+        for path in files:
+            destination = target / path.relative_to(source)
+            if destination.exists():
+                if filecmp.cmp(path, destination, shallow=False):
+                    # Already copied by hand; the old copy is redundant
+                    path.unlink()
+                    duplicates += 1
+                else:
+                    conflicts.append(path)
+                continue
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(path, destination)
+            moved += 1
+
+        # Drop the emptied directories, deepest first
+        for directory in sorted((path for path in source.rglob('*') if path.is_dir()), reverse=True):
+            if not any(directory.iterdir()):
+                directory.rmdir()
+        if not any(source.iterdir()):
+            source.rmdir()
+
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} recording(s) to {target}; removed {duplicates} duplicate(s)'))
+        if conflicts:
+            for path in conflicts:
+                self.stderr.write(f'{path}: a different file with this name is already in {target}')
+            raise CommandError(f'{len(conflicts)} recording(s) left in place; resolve them by hand and re-run')
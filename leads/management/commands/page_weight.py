@@ -0,0 +1,141 @@
+import gzip
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from leads.templatetags.bundles import CACHED_COOKIE, load_manifest
+
+
+class AssetParser(HTMLParser):
+    """Stylesheets and scripts a page references, and whether they block the first paint"""
+
+    def __init__(self):
+        super().__init__()
+        self.assets = []  # (url, kind, blocking)
+        self.inline_css = 0
+        self.in_head = self.in_noscript = self.in_style = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'head':
+            self.in_head = True
+        elif tag == 'noscript':
+            self.in_noscript = True
+        elif tag == 'style':
+            self.in_style = True
+        elif tag == 'link' and not self.in_noscript and attrs.get('href'):
+            if attrs.get('rel') == 'stylesheet':
+                self.assets.append((attrs['href'], 'css', True))
+            elif attrs.get('rel') == 'preload':
+                self.assets.append((attrs['href'], 'css', False))
+        elif tag == 'script' and attrs.get('src'):
+            sync = 'async' not in attrs and 'defer' not in attrs
+            self.assets.append((attrs['src'], 'js', sync and self.in_head))
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.in_head = False
+        elif tag == 'noscript':
+            self.in_noscript = False
+        elif tag == 'style':
+            self.in_style = False
+
+    def handle_data(self, data):
+        if self.in_style:
+            self.inline_css += len(data.encode())
+
+
+class Command(BaseCommand):
+    help = (
+        'Page weight and estimated first paint of a page with the individual asset files versus the '
+        'build_bundles bundles: requests, render-blocking requests and compressed bytes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Page to measure (default: the lead list)')
+        parser.add_argument('--username', help='User to render the page as (default: first superuser)')
+        parser.add_argument('--rtt', type=float, default=150, help='Round-trip time in ms for the estimate')
+        parser.add_argument('--bandwidth', type=float, default=1.6, help='Download bandwidth in Mbit/s for the estimate')
+        parser.add_argument('--connections', type=int, default=6, help='Parallel connections per origin (HTTP/1.1)')
+
+    def handle(self, *args, **options):
+        if load_manifest() is None:
+            raise CommandError('No bundles built yet; run `manage.py build_bundles` first.')
+        users = User.objects.all()
+        user = users.filter(username=options['username']).first() if options['username'] else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No user to render the page as; pass --username or create a superuser.')
+        url = options['url'] or reverse('leads:lead_list')
+
+        rows = []
+        # The test client sends Host: testserver, which the test runner normally allows
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for label, bundles, cached in (('individual files', False, False), ('bundles, first visit', True, False), ('bundles, repeat visit', True, True)):
+                with override_settings(ASSET_BUNDLES=bundles):
+                    client = Client()
+                    client.force_login(user)
+                    if cached:
+                        client.cookies[CACHED_COOKIE] = load_manifest()['bundles']['base.css'].rsplit('/', 1)[-1]
+                    response = client.get(url)
+                    if response.status_code != 200:
+                        raise CommandError(f'{url} returned {response.status_code}')
+                rows.append((label, self.measure(response.content, cached, options)))
+
+        self.stdout.write(f'{url} (RTT {options["rtt"]:.0f} ms, {options["bandwidth"]} Mbit/s, {options["connections"]} connections)\n')
+        self.stdout.write(f'{"":24}{"requests":>10}{"blocking":>10}{"static KB":>11}{"blocking KB":>13}{"HTML KB":>9}{"first paint":>13}')
+        for label, result in rows:
+            self.stdout.write(
+                f'{label:24}{result["requests"]:>10}{result["blocking"]:>10}{result["static_kb"]:>11.1f}'
+                f'{result["blocking_kb"]:>13.1f}{result["html_kb"]:>9.1f}{result["first_paint_ms"]:>10.0f} ms'
+            )
+        self.stdout.write(
+            '\nFirst paint is estimated as: one round trip plus transfer for the HTML, then the render-blocking '
+            'same-origin assets in waves of --connections, each a round trip plus transfer (gzip sizes). '
+            'Third-party stylesheets (Google Fonts) are listed but not modelled.'
+        )
+
+    def measure(self, html, cached, options):
+        parser = AssetParser()
+        parser.feed(html.decode())
+        bytes_per_ms = options['bandwidth'] * 1_000_000 / 8 / 1000
+        html_size = len(gzip.compress(html))
+
+        static_size = blocking_size = 0
+        requests = blocking = 0
+        blocking_sizes = []
+        external = 0
+        for url, kind, is_blocking in parser.assets:
+            if not url.startswith(settings.STATIC_URL):
+                external += 1
+                continue
+            path = finders.find(url[len(settings.STATIC_URL):].split('?')[0])
+            size = len(gzip.compress(open(path, 'rb').read())) if path else 0
+            if cached:
+                # Everything static is in the browser cache (immutable): no request at all
+                continue
+            requests += 1
+            static_size += size
+            if is_blocking:
+                blocking += 1
+                blocking_size += size
+                blocking_sizes.append(size)
+
+        first_paint = options['rtt'] + html_size / bytes_per_ms
+        for start in range(0, len(blocking_sizes), options['connections']):
+            wave = blocking_sizes[start:start + options['connections']]
+            first_paint += options['rtt'] + sum(wave) / bytes_per_ms
+        return {
+            'requests': requests,
+            'blocking': blocking,
+            'external': external,
+            'static_kb': static_size / 1024,
+            'blocking_kb': blocking_size / 1024,
+            'html_kb': html_size / 1024,
+            'inline_css_kb': parser.inline_css / 1024,
+            'first_paint_ms': first_paint,
+        }
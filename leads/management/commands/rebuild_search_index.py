@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from leads.search import has_fts5, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the full-text search entries from every lead, activity and task note, hot and archived. '
+        'Run after loading data with raw SQL or fixtures, or after a migration that alters leads_searchentry.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Entries written per insert')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        started = time.perf_counter()
+        written = rebuild_index(
+            batch_size=options['batch_size'],
+            progress=lambda count: self.stdout.write(f'{count} entries written'),
+        )
+        index = 'FTS5' if has_fts5() else {'postgresql': 'tsvector'}.get(connection.vendor, 'LIKE')
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {time.perf_counter() - started:.1f}s: {written} entries ({index} index)'
+        ))
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Serve theopendecor.asgi:application with uvicorn (needs `pip install uvicorn`)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('addrport', nargs='?', default='127.0.0.1:8000', help='host:port to bind (default 127.0.0.1:8000)')
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--log-level', default='info')
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError('uvicorn is not installed. Run `pip install uvicorn` to serve the ASGI app.')
+
+        host, _, port = options['addrport'].rpartition(':')
+        try:
+            port = int(port)
+        except ValueError:
+            raise CommandError(f'"{options["addrport"]}" is not a valid host:port.')
+
+        if options['workers'] > 1:
+            # Each worker process imports the application itself
+            app = 'theopendecor.asgi:application'
+        else:
+            from theopendecor.asgi import application as app
+            if settings.DEBUG:
+                # Mirror runserver, which serves static files in development
+                from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+                app = ASGIStaticFilesHandler(app)
+
+        self.stdout.write(f'Serving ASGI on http://{host or "127.0.0.1"}:{port}/ with {options["workers"]} worker(s)')
+        uvicorn.run(
+            app,
+            host=host or '127.0.0.1',
+            port=port,
+            workers=options['workers'],
+            lifespan='off',
+            log_level=options['log_level'],
+        )
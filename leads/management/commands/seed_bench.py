@@ -0,0 +1,264 @@
+import io
+import random
+import time
+import wave
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from leads.assignment import recount_open_leads
+from leads.audio import recording_fields
+from leads.catalog import rebuild_history
+from leads.models import Activity, Category, Lead, Product, TaskNote, name_pincode_key
+from leads.saved_views import invalidate_saved_views
+from leads.search import forget_leads, index_activities, index_leads, index_notes
+from leads.territories import territory_for
+
+SEED_MARK = 'seed_bench'
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Ishaan', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Rohan', 'Kabir',
+    'Ananya', 'Diya', 'Priya', 'Saanvi', 'Aadhya', 'Kavya', 'Meera', 'Nisha', 'Pooja', 'Sneha',
+    'Mohammed', 'Fatima', 'Imran', 'Ayesha', 'Rahul', 'Deepa', 'Suresh', 'Lakshmi', 'Vikram', 'Asha',
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Iyer', 'Nair', 'Reddy', 'Patel', 'Shah', 'Khan', 'Gupta', 'Menon',
+    'Rao', 'Das', 'Kumar', 'Singh', 'Pillai', 'Joshi', 'Mehta', 'Chopra', 'Bose', 'Aslam',
+]
+# City pincode prefixes, so territory and name + pincode keys see realistic clustering
+PINCODE_PREFIXES = ['560', '400', '110', '600', '500', '700', '411', '380', '682', '641']
+SOURCE_WEIGHTS = [('whatsapp', 45), ('instagram', 30), ('facebook', 15), ('website', 10)]
+STAGE_WEIGHTS = [
+    ('cold_follow_up', 35), ('warm_follow_up', 20), ('factory_visit', 10),
+    ('production', 5), ('delivered', 15), ('not_fit', 15),
+]
+STATUS_WEIGHTS = [('active', 70), ('inactive', 20), ('customer', 10)]
+ACTIVITY_WEIGHTS = [('note', 35), ('call', 30), ('task', 30), ('purchase', 5)]
+NOTE_TEXTS = [
+    'Customer asked for fabric samples', 'Shared catalogue on WhatsApp', 'Called back, no answer',
+    'Wants delivery before the festival', 'Asked for a discount on the 3+2 set', 'Visited the showroom',
+    'Measurements taken', 'Follow up next week', 'Price quoted', 'Not interested right now',
+]
+# Appended to some note texts ("... about the teak recliner"), so search sees varied vocabulary
+MATERIALS = ['teak', 'sheesham', 'oak', 'walnut', 'velvet', 'linen', 'leather', 'rattan', 'marble', 'cane']
+ITEMS = ['recliner', 'sofa', 'dining table', 'wardrobe', 'bed', 'bookshelf', 'armchair', 'curtains', 'rug', 'console']
+
+
+def weighted(choices):
+    values, weights = zip(*choices)
+    return lambda rng: rng.choices(values, weights)[0]
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic leads, activities, task notes and recording stubs in bulk for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leads', type=int, default=1_000_000, help='Leads to create')
+        parser.add_argument('--activities-per-lead', type=float, default=10.0, help='Average activities per lead')
+        parser.add_argument('--notes-per-task', type=float, default=0.5, help='Average notes per task')
+        parser.add_argument('--products-ratio', type=float, default=0.4, help='Share of leads with products_data')
+        parser.add_argument('--recording-ratio', type=float, default=0.8, help='Share of calls with a recording stub')
+        parser.add_argument('--managers', type=int, default=20, help='Staff users to spread leads and activities over')
+        parser.add_argument('--days', type=int, default=730, help='Spread creation dates over this many past days')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Leads per transaction')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for repeatable data sets')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded data and exit')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            return self.clear(options['batch_size'])
+
+        rng = random.Random(options['seed'])
+        managers = self.managers(options['managers'])
+        categories = self.categories()
+        stub = self.recording_stub()
+        self.pick_source = weighted(SOURCE_WEIGHTS)
+        self.pick_stage = weighted(STAGE_WEIGHTS)
+        self.pick_status = weighted(STATUS_WEIGHTS)
+        self.pick_activity = weighted(ACTIVITY_WEIGHTS)
+
+        now = timezone.now()
+        started = time.perf_counter()
+        totals = {'leads': 0, 'activities': 0, 'notes': 0}
+        while totals['leads'] < options['leads']:
+            size = min(options['batch_size'], options['leads'] - totals['leads'])
+            with transaction.atomic():
+                leads = self.build_leads(rng, size, managers, categories, now, options)
+                Lead.objects.bulk_create(leads, batch_size=1000)
+                # auto_now stamped every row with now; age them like real data
+                Lead.objects.filter(pk__in=[lead.pk for lead in leads]).update(updated_date=F('created_date'))
+                activities = self.build_activities(rng, leads, managers, stub, now, options)
+                Activity.objects.bulk_create(activities, batch_size=1000)
+                notes = self.build_notes(rng, activities, managers, now, options)
+                TaskNote.objects.bulk_create(notes, batch_size=1000)
+                # bulk_create skips save(), which keeps the search index current
+                index_leads(leads)
+                index_activities(activities)
+                index_notes(notes)
+            totals['leads'] += len(leads)
+            totals['activities'] += len(activities)
+            totals['notes'] += len(notes)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{totals["leads"]} leads, {totals["activities"]} activities, {totals["notes"]} notes '
+                f'({totals["leads"] / elapsed:.0f} leads/s)'
+            )
+
+        recount_open_leads()
+        # Seeded leads are back-dated, so saved views would not pick them up as changes
+        invalidate_saved_views()
+        # bulk_create skips Lead.save(), which would queue this
+        rebuild_history()
+        self.stdout.write(self.style.SUCCESS(
+            f'Done in {time.perf_counter() - started:.1f}s: {totals["leads"]} leads, '
+            f'{totals["activities"]} activities, {totals["notes"]} task notes'
+        ))
+
+    def managers(self, count):
+        """Existing or new bench staff users"""
+        usernames = [f'bench_manager_{i:03d}' for i in range(1, count + 1)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        new_users = []
+        for username in usernames:
+            if username not in existing:
+                user = User(username=username, first_name=username.rsplit('_', 1)[-1], is_staff=True)
+                user.set_unusable_password()
+                new_users.append(user)
+        User.objects.bulk_create(new_users)
+        return list(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+
+    def categories(self):
+        """{category: [(product name, price)]}, creating the standard categories and a few products"""
+        result = {}
+        for value, label in Category.CATEGORY_CHOICES:
+            category, _ = Category.objects.get_or_create(name=value)
+            for i in range(1, 6):
+                Product.objects.get_or_create(category=category, name=f'{label} Model {i}', defaults={'price': 15000 + 5000 * i})
+            result[category] = list(category.products.values_list('name', 'price'))
+        return result
+
+    def recording_stub(self):
+        """Storage name and metadata of one short WAV file that every seeded call points at"""
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as stub:
+            stub.setnchannels(1)
+            stub.setsampwidth(2)
+            stub.setframerate(8000)
+            stub.writeframes(b'\0\0' * 8000)
+        storage = Activity._meta.get_field('recording').storage
+        name = f'Call Recordings/{SEED_MARK}_stub.wav'
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(buffer.getvalue()))
+        activity = Activity(recording=name)
+        return name, recording_fields(activity.recording)
+
+    def build_leads(self, rng, size, managers, categories, now, options):
+        leads = []
+        for _ in range(size):
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+            pincode = f'{rng.choice(PINCODE_PREFIXES)}{rng.randrange(1000):03d}'
+            number = f'{rng.choice("6789")}{rng.randrange(10**9):09d}'
+            email = f'{name.lower().replace(" ", ".")}{rng.randrange(10000)}@example.com' if rng.random() < 0.5 else None
+            created = now - timedelta(seconds=rng.randrange(options['days'] * 86400))
+            lead = Lead(
+                name=name,
+                number=number,
+                phone_normalized=f'91{number}',
+                whatsapp_url=f'https://wa.me/+91{number}',
+                email=email,
+                email_normalized=email,
+                pincode=pincode,
+                name_pincode_key=name_pincode_key(name, pincode),
+                territory=territory_for(pincode) or None,
+                address=f'{rng.randrange(1, 300)}, {rng.choice(LAST_NAMES)} Nagar',
+                leadsource=self.pick_source(rng),
+                lead_stage=self.pick_stage(rng),
+                lead_status=self.pick_status(rng),
+                lead_manager_id=rng.choice(managers) if rng.random() < 0.9 else None,
+                created_date=created,
+                remarks=SEED_MARK,
+            )
+            if rng.random() < options['products_ratio']:
+                lead.products_data = self.products_data(rng, categories)
+            leads.append(lead)
+        return leads
+
+    def products_data(self, rng, categories):
+        data = {}
+        for category in rng.sample(list(categories), rng.randint(1, 2)):
+            products = rng.sample(categories[category], rng.randint(1, 3))
+            data[str(category.id)] = {
+                'category_name': category.get_name_display(),
+                'products': [{'name': name, 'url': '', 'price': str(price)} for name, price in products],
+            }
+        return data
+
+    def build_activities(self, rng, leads, managers, stub, now, options):
+        stub_name, stub_fields = stub
+        mean = options['activities_per_lead']
+        activities = []
+        for lead in leads:
+            age = (now - lead.created_date).total_seconds()
+            for _ in range(int(rng.expovariate(1 / mean)) if mean else 0):
+                activity_type = self.pick_activity(rng)
+                activity = Activity(
+                    lead_id=lead.lead_id,
+                    activity_type=activity_type,
+                    description=self.note_text(rng),
+                    created_by_id=rng.choice(managers),
+                    created_date=lead.created_date + timedelta(seconds=rng.random() * age),
+                )
+                if activity_type == 'task':
+                    activity.due_date = activity.created_date + timedelta(days=rng.uniform(0, 14))
+                    activity.priority = rng.choice(['low', 'medium', 'high'])
+                    # Most past tasks get done; a tail stays overdue
+                    activity.is_completed = activity.due_date < now and rng.random() < 0.9
+                elif activity_type == 'call' and rng.random() < options['recording_ratio']:
+                    activity.recording = stub_name
+                    for field, value in stub_fields.items():
+                        setattr(activity, field, value)
+                    activity.recording_duration = rng.uniform(20, 900)
+                activities.append(activity)
+        return activities
+
+    def note_text(self, rng):
+        text = rng.choice(NOTE_TEXTS)
+        if rng.random() < 0.5:
+            text = f'{text} about the {rng.choice(MATERIALS)} {rng.choice(ITEMS)}'
+        return text
+
+    def build_notes(self, rng, activities, managers, now, options):
+        mean = options['notes_per_task']
+        notes = []
+        for activity in activities:
+            if activity.activity_type != 'task' or not mean:
+                continue
+            for _ in range(int(rng.expovariate(1 / mean))):
+                notes.append(TaskNote(
+                    activity_id=activity.id,
+                    note=self.note_text(rng),
+                    created_by_id=rng.choice(managers),
+                    created_date=min(now, activity.created_date + timedelta(hours=rng.uniform(1, 72))),
+                ))
+        return notes
+
+    def clear(self, batch_size):
+        deleted = 0
+        while True:
+            ids = list(Lead.objects.filter(remarks=SEED_MARK).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                forget_leads(ids)
+                Lead.objects.filter(pk__in=ids).delete()
+            deleted += len(ids)
+            self.stdout.write(f'Deleted {deleted} seeded lead(s)')
+        User.objects.filter(username__startswith='bench_manager_').delete()
+        recount_open_leads()
+        invalidate_saved_views()
+        rebuild_history()
+        self.stdout.write(self.style.SUCCESS(f'Done: {deleted} seeded lead(s) and their activities removed'))
@@ -0,0 +1,70 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from leads.digests import build_digests, digest_messages, recipients
+
+
+class Command(BaseCommand):
+    help = (
+        'Email every user a digest of their overdue, due-today and upcoming tasks. '
+        'Run once a day, e.g. from cron in the morning IST.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--upcoming-days',
+            type=int,
+            default=settings.TASK_DIGEST_UPCOMING_DAYS,
+            help='Days after today whose tasks are listed as upcoming',
+        )
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME', help='Only send to this user (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Messages handed to the email backend at a time')
+        parser.add_argument('--dry-run', action='store_true', help='Render the digests without sending them')
+
+    def handle(self, *args, **options):
+        if options['upcoming_days'] < 0:
+            raise CommandError('--upcoming-days cannot be negative.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        user_ids = None
+        if options['usernames']:
+            found = dict(User.objects.filter(username__in=options['usernames']).values_list('username', 'id'))
+            missing = sorted(set(options['usernames']) - set(found))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(missing)}")
+            user_ids = set(found.values())
+
+        started = time.perf_counter()
+        now = timezone.now()
+        digests = build_digests(now, options['upcoming_days'], user_ids)
+        users = list(recipients(digests.keys()))
+        self.stdout.write(f'{len(digests)} users with tasks, {len(users)} with an email address')
+
+        sent = 0
+        connection = None if options['dry_run'] else get_connection()
+        try:
+            if connection is not None:
+                # One connection (one SMTP login) for every batch
+                connection.open()
+            messages = digest_messages(digests, users, now, connection=connection)
+            while batch := list(islice(messages, options['batch_size'])):
+                if connection is not None:
+                    sent += connection.send_messages(batch) or 0
+                else:
+                    sent += len(batch)
+        finally:
+            if connection is not None:
+                connection.close()
+
+        verb = 'Rendered' if options['dry_run'] else 'Sent'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {sent} digests in {time.perf_counter() - started:.1f}s '
+            f'({len(digests) - len(users)} users skipped without an email address)'
+        ))
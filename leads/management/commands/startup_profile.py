@@ -0,0 +1,180 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from leads.benchmarks import git_commit
+
+# Run in a fresh interpreter: load the WSGI application, then send it two GET
+# requests directly (no server), and print the timings as JSON on stdout.
+# Django imports app, model and admin modules with importlib.import_module,
+# which -X importtime does not see; routing it through __import__ puts them
+# in the import time report with the rest.
+DRIVER = '''
+import importlib, json, os, sys, time
+loaded = time.time()
+_import_module = importlib.import_module
+def import_module(name, package=None):
+    __import__(importlib.util.resolve_name(name, package) if name.startswith('.') else name)
+    return _import_module(name, package)
+importlib.import_module = import_module
+
+module, _, attribute = os.environ['STARTUP_WSGI_APPLICATION'].rpartition('.')
+application = getattr(__import__(module, fromlist=[attribute]), attribute)
+ready = time.time()
+
+from wsgiref.util import setup_testing_defaults
+def get(path):
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    status = []
+    started = time.perf_counter()
+    response = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    b''.join(response)
+    getattr(response, 'close', lambda: None)()
+    return (time.perf_counter() - started) * 1000, status[0]
+
+first_ms, status = get(os.environ['STARTUP_PATH'])
+second_ms, _ = get(os.environ['STARTUP_PATH'])
+started = float(os.environ['STARTUP_T0'])
+print(json.dumps({
+    'interpreter_ms': (loaded - started) * 1000,
+    'ready_ms': (ready - started) * 1000,
+    'first_request_ms': first_ms,
+    'second_request_ms': second_ms,
+    'status': status,
+}))
+'''
+# Warm-up off/on, as the WARMUP_ON_START environment variable
+MODES = {'cold': '0', 'warm': '1'}
+METRICS = ['ready_ms', 'first_request_ms', 'second_request_ms']
+
+
+def parse_importtime(stderr):
+    """[(module, self us, cumulative us, depth)] from -X importtime output"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        imports.append((name.strip(), int(own), int(cumulative), depth))
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure cold start: time until the WSGI application is loaded and the latency of its first '
+        'and second request, with and without WARMUP_ON_START, over several fresh interpreters; '
+        'plus the slowest imports from -X importtime. Results are saved as JSON for comparison across commits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters started per mode')
+        parser.add_argument('--path', default=settings.LOGIN_URL, help='Path requested (anonymously) once loaded')
+        parser.add_argument('--top', type=int, default=15, help='Slowest imports and packages listed')
+        parser.add_argument('--output', help='JSON results file (default: bench-results/startup-<commit>-<time>.json)')
+        parser.add_argument('--compare', help='Earlier JSON results to print changes against')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+
+        modes = {}
+        for mode, warmup in MODES.items():
+            runs = [self.start(warmup, options['path']) for _ in range(options['runs'])]
+            modes[mode] = {metric: round(statistics.median(run[metric] for run in runs), 2) for metric in METRICS}
+            modes[mode]['status'] = runs[-1]['status']
+            self.report(mode, modes[mode])
+
+        imports = self.profile_imports(options['path'], options['top'])
+        results = {
+            'commit': git_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'python': sys.version.split()[0],
+            'path': options['path'],
+            'runs': options['runs'],
+            'modes': modes,
+            'imports': imports,
+        }
+
+        output = Path(options['output'] or f'bench-results/startup-{results["commit"][:12]}-{time.strftime("%Y%m%d-%H%M%S")}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'\nResults written to {output}'))
+
+        if options['compare']:
+            self.compare(json.loads(Path(options['compare']).read_text()), results)
+
+    def start(self, warmup, path, importtime=False):
+        """Start one fresh interpreter running DRIVER; returns its timings (and -X importtime output)"""
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'theopendecor.settings'),
+            'STARTUP_WSGI_APPLICATION': settings.WSGI_APPLICATION,
+            'STARTUP_PATH': path,
+            'WARMUP_ON_START': warmup,
+            'STARTUP_T0': repr(time.time()),
+        }
+        command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', DRIVER]
+        process = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f'Startup run failed:\n{process.stderr[-2000:]}')
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        if importtime:
+            result['imports'] = parse_importtime(process.stderr)
+        return result
+
+    def profile_imports(self, path, top):
+        """Slowest modules and top-level packages of one cold start under -X importtime"""
+        imports = self.start(MODES['cold'], path, importtime=True)['imports']
+        packages = Counter()
+        for name, own, _, _ in imports:
+            packages[name.partition('.')[0]] += own
+        total = sum(own for _, own, _, _ in imports)
+        # Self time is where an import actually spends its time; cumulative double-counts nested imports
+        slowest = sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nImports: {len(imports)} modules, {total / 1000:.1f} ms'))
+        for package, own in packages.most_common(top):
+            self.stdout.write(f'  {package:40} {own / 1000:8.1f} ms  {100 * own / (total or 1):5.1f}%')
+        self.stdout.write(self.style.MIGRATE_HEADING('\nSlowest modules (self / cumulative)'))
+        for name, own, cumulative, _ in slowest:
+            self.stdout.write(f'  {name:60} {own / 1000:8.1f} ms {cumulative / 1000:8.1f} ms')
+
+        return {
+            'modules': len(imports),
+            'total_ms': round(total / 1000, 2),
+            'packages': {package: round(own / 1000, 2) for package, own in packages.most_common(top)},
+            'slowest': [
+                {'module': name, 'self_ms': round(own / 1000, 2), 'cumulative_ms': round(cumulative / 1000, 2)}
+                for name, own, cumulative, _ in slowest
+            ],
+        }
+
+    def report(self, mode, result):
+        self.stdout.write(
+            f'{mode:5} ready {result["ready_ms"]:8.1f} ms   first request {result["first_request_ms"]:8.1f} ms   '
+            f'second request {result["second_request_ms"]:7.1f} ms   ({result["status"]})'
+        )
+
+    def compare(self, before, after):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nCompared with {before["commit"][:12]} ({before["timestamp"]})'))
+        for mode, result in after['modes'].items():
+            old = before['modes'].get(mode)
+            if old is None:
+                continue
+            changes = []
+            for metric in METRICS:
+                change = (result[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+                changes.append(f'{metric[:-3]} {old[metric]:.1f} -> {result[metric]:.1f} ms ({change:+.0f}%)')
+            self.stdout.write(f'{mode:5} ' + '   '.join(changes))
+        self.stdout.write(f'{"imports":5} {before["imports"]["total_ms"]} -> {after["imports"]["total_ms"]} ms')
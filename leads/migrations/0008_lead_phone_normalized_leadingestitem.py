@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_phone_normalized(apps, schema_editor):
+    from leads.models import normalize_phone
+
+    Lead = apps.get_model('leads', 'Lead')
+    batch = []
+    for lead in Lead.objects.exclude(number__isnull=True).exclude(number='').only('lead_id', 'number').iterator(chunk_size=2000):
+        lead.phone_normalized = normalize_phone(lead.number) or None
+        batch.append(lead)
+        if len(batch) >= 2000:
+            Lead.objects.bulk_update(batch, ['phone_normalized'])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ['phone_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0007_lead_updated_date_activity_updated_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Digits-only number with country code, used for deduplication', max_length=20, null=True),
+        ),
+        migrations.CreateModel(
+            name='LeadIngestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(help_text='Caller-supplied or payload-derived key; repeats are ignored', max_length=128, unique=True)),
+                ('source', models.CharField(help_text='Integration that pushed the lead', max_length=50)),
+                ('payload', models.JSONField(help_text='Lead fields as received')),
+                ('phone_normalized', models.CharField(blank=True, max_length=20, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('imported', 'Imported'), ('duplicate', 'Duplicate'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('batch_id', models.UUIDField(blank=True, help_text='Drain run that claimed this row', null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('received_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_date', models.DateTimeField(blank=True, null=True)),
+                ('lead', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingest_items', to='leads.lead')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='ingest_status_idx'), models.Index(fields=['batch_id'], name='ingest_batch_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_phone_normalized, migrations.RunPython.noop),
+    ]
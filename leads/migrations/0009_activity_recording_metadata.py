@@ -0,0 +1,44 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0008_lead_phone_normalized_leadingestitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activity',
+            name='recording_bitrate',
+            field=models.PositiveIntegerField(blank=True, help_text='Bits per second', null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='recording_checksum',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the file', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='recording_codec',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='recording_duration',
+            field=models.FloatField(blank=True, db_index=True, help_text='Recording length in seconds', null=True),
+        ),
+        migrations.AddField(
+            model_name='activity',
+            name='recording_size',
+            field=models.PositiveBigIntegerField(blank=True, db_index=True, help_text='File size in bytes', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['activity_type', 'created_by', 'created_date'], name='activity_type_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:40
+
+import django.utils.timezone
+import leads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0009_activity_recording_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackedRecording',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Storage name of the recording, as kept on Activity.recording', max_length=255, unique=True)),
+                ('pack', models.CharField(help_text='Pack file name inside RECORDING_ARCHIVE_ROOT', max_length=100)),
+                ('offset', models.PositiveBigIntegerField(help_text='Byte offset of the entry data in the pack')),
+                ('length', models.PositiveBigIntegerField(help_text='Bytes stored in the pack')),
+                ('size', models.PositiveBigIntegerField(help_text='Original file size')),
+                ('codec', models.CharField(choices=[('store', 'Stored'), ('zlib', 'zlib')], default='store', max_length=10)),
+                ('checksum', models.CharField(help_text='SHA-256 of the original file', max_length=64)),
+                ('archived_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('verified_date', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['pack', 'offset'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='activity',
+            name='recording',
+            field=models.FileField(blank=True, help_text='Call recording file (for call activities only)', null=True, storage=leads.storage.get_recording_storage, upload_to='Call Recordings/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0010_packedrecording'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['activity_type', 'is_completed', 'due_date'], name='task_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['created_by', 'activity_type', 'is_completed', 'due_date'], name='task_creator_schedule_idx'),
+        ),
+    ]
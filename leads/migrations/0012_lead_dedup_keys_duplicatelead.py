@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_dedup_keys(apps, schema_editor):
+    from leads.models import name_pincode_key, normalize_email
+
+    Lead = apps.get_model('leads', 'Lead')
+    batch = []
+    for lead in Lead.objects.only('lead_id', 'name', 'email', 'pincode').iterator(chunk_size=2000):
+        lead.email_normalized = normalize_email(lead.email) or None
+        lead.name_pincode_key = name_pincode_key(lead.name, lead.pincode) or None
+        batch.append(lead)
+        if len(batch) >= 2000:
+            Lead.objects.bulk_update(batch, ['email_normalized', 'name_pincode_key'])
+            batch = []
+    if batch:
+        Lead.objects.bulk_update(batch, ['email_normalized', 'name_pincode_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0011_activity_task_schedule_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='email_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Lowercased email, used for deduplication', max_length=254, null=True),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='name_pincode_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Pincode plus sorted name words, used for deduplication', max_length=220, null=True),
+        ),
+        migrations.CreateModel(
+            name='DuplicateLead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('phone', 'Same phone number'), ('email', 'Same email'), ('name_pincode', 'Same name and pincode')], max_length=20)),
+                ('dismissed', models.BooleanField(default=False, help_text='Reviewed and not a duplicate; never flagged again')),
+                ('detected_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duplicate_of', models.ForeignKey(help_text='Oldest lead in the same cluster; kept on merge', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='leads.lead')),
+                ('lead', models.ForeignKey(help_text='The newer lead', on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_flags', to='leads.lead')),
+            ],
+            options={
+                'ordering': ['-detected_date'],
+                'indexes': [models.Index(fields=['dismissed', 'detected_date'], name='duplicate_open_idx')],
+                'unique_together': {('lead', 'duplicate_of')},
+            },
+        ),
+        migrations.RunPython(backfill_dedup_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0012_lead_dedup_keys_duplicatelead'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ManagerCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_accepting', models.BooleanField(default=True, help_text='Receives automatically assigned leads')),
+                ('weight', models.PositiveSmallIntegerField(default=1, help_text='Relative share of new leads under weighted assignment')),
+                ('max_open_leads', models.PositiveIntegerField(blank=True, help_text='Stop assigning once this many leads are open (blank = no limit)', null=True)),
+                ('open_leads', models.PositiveIntegerField(default=0, editable=False, help_text='Open leads managed; maintained incrementally')),
+                ('last_assigned_date', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lead_capacity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Manager capacities',
+                'ordering': ['user__username'],
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:15
+
+import django.db.models.deletion
+import django.utils.timezone
+import leads.storage
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0013_managercapacity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLead',
+            fields=[
+                ('lead_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('leadsource', models.CharField(blank=True, choices=[('whatsapp', 'WhatsApp'), ('instagram', 'Instagram'), ('facebook', 'Facebook'), ('website', 'Website')], max_length=20, null=True)),
+                ('name', models.CharField(blank=True, max_length=200, null=True)),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('address', models.TextField(blank=True, null=True)),
+                ('pincode', models.CharField(blank=True, max_length=10, null=True)),
+                ('number', models.CharField(blank=True, help_text='Phone number', max_length=15, null=True)),
+                ('phone_normalized', models.CharField(blank=True, db_index=True, editable=False, help_text='Digits-only number with country code, used for deduplication', max_length=20, null=True)),
+                ('email_normalized', models.CharField(blank=True, db_index=True, editable=False, help_text='Lowercased email, used for deduplication', max_length=254, null=True)),
+                ('name_pincode_key', models.CharField(blank=True, db_index=True, editable=False, help_text='Pincode plus sorted name words, used for deduplication', max_length=220, null=True)),
+                ('whatsapp_url', models.URLField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('remarks', models.TextField(blank=True, null=True)),
+                ('lead_status', models.CharField(choices=[('active', 'Active'), ('inactive', 'Inactive'), ('customer', 'Customer')], default='active', max_length=20)),
+                ('lead_stage', models.CharField(choices=[('cold_follow_up', 'Cold Follow Up'), ('warm_follow_up', 'Warm Follow Up'), ('factory_visit', 'Factory Visit'), ('production', 'Production'), ('delivered', 'Delivered'), ('not_fit', 'Not Fit')], default='cold_follow_up', max_length=20)),
+                ('activity', models.CharField(blank=True, max_length=500, null=True)),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('interested_categories', models.CharField(blank=True, max_length=500, null=True)),
+                ('task', models.CharField(blank=True, max_length=500, null=True)),
+                ('products_data', models.JSONField(blank=True, default=dict, help_text='Products data stored as JSON')),
+                ('updated_date', models.DateTimeField(db_index=True)),
+                ('lead_products', models.JSONField(blank=True, default=list, help_text='LeadProduct rows at archive time')),
+                ('archived_date', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('categories', models.ManyToManyField(blank=True, related_name='+', to='leads.category')),
+                ('lead_manager', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedActivity',
+            fields=[
+                ('activity_type', models.CharField(choices=[('call', 'Call'), ('note', 'Note'), ('task', 'Task'), ('purchase', 'Purchase')], max_length=20)),
+                ('description', models.TextField(help_text='Description of the activity')),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('recording', models.FileField(blank=True, help_text='Call recording file (for call activities only)', null=True, storage=leads.storage.get_recording_storage, upload_to='Call Recordings/')),
+                ('recording_duration', models.FloatField(blank=True, db_index=True, help_text='Recording length in seconds', null=True)),
+                ('recording_bitrate', models.PositiveIntegerField(blank=True, help_text='Bits per second', null=True)),
+                ('recording_size', models.PositiveBigIntegerField(blank=True, db_index=True, help_text='File size in bytes', null=True)),
+                ('recording_codec', models.CharField(blank=True, max_length=20, null=True)),
+                ('recording_checksum', models.CharField(blank=True, db_index=True, help_text='SHA-256 of the file', max_length=64, null=True)),
+                ('due_date', models.DateTimeField(blank=True, help_text='Due date for tasks (IST)', null=True)),
+                ('priority', models.CharField(blank=True, choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], help_text='Priority for tasks', max_length=10, null=True)),
+                ('is_completed', models.BooleanField(default=False, help_text='Whether the task is completed')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('updated_date', models.DateTimeField(db_index=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='leads.archivedlead')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived activities',
+                'ordering': ['-created_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTaskNote',
+            fields=[
+                ('note', models.TextField(help_text='Note content')),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notes', to='leads.archivedactivity')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedlead',
+            index=models.Index(fields=['created_date', 'lead_id'], name='archived_lead_created_idx'),
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:05
+
+from django.db import migrations, models
+
+# SQLite: an FTS5 index over leads_searchentry.body ("external content", so the
+# text is stored once), kept in step by triggers. Porter stemming lets
+# "recliners" match "recliner".
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE leads_searchentry_fts USING fts5(
+        body, content='leads_searchentry', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER leads_searchentry_fts_insert AFTER INSERT ON leads_searchentry BEGIN
+        INSERT INTO leads_searchentry_fts(rowid, body) VALUES (new.id, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER leads_searchentry_fts_delete AFTER DELETE ON leads_searchentry BEGIN
+        INSERT INTO leads_searchentry_fts(leads_searchentry_fts, rowid, body) VALUES ('delete', old.id, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER leads_searchentry_fts_update AFTER UPDATE OF body ON leads_searchentry BEGIN
+        INSERT INTO leads_searchentry_fts(leads_searchentry_fts, rowid, body) VALUES ('delete', old.id, old.body);
+        INSERT INTO leads_searchentry_fts(rowid, body) VALUES (new.id, new.body);
+    END
+    """,
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS leads_searchentry_fts_update',
+    'DROP TRIGGER IF EXISTS leads_searchentry_fts_delete',
+    'DROP TRIGGER IF EXISTS leads_searchentry_fts_insert',
+    'DROP TABLE IF EXISTS leads_searchentry_fts',
+]
+# PostgreSQL: a GIN index on the tsvector expression the search query uses
+POSTGRES_CREATE = [
+    "CREATE INDEX leads_searchentry_body_fts ON leads_searchentry USING GIN (to_tsvector('english', body))",
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS leads_searchentry_body_fts',
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall())
+
+
+def run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite' and sqlite_has_fts5(schema_editor.connection):
+        run(schema_editor, SQLITE_CREATE)
+    elif vendor == 'postgresql':
+        run(schema_editor, POSTGRES_CREATE)
+    # Other databases search with LIKE (see leads/search.py)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        run(schema_editor, SQLITE_DROP)
+    elif vendor == 'postgresql':
+        run(schema_editor, POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0014_lead_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('lead', 'Lead'), ('activity', 'Activity'), ('note', 'Task note')], max_length=10)),
+                ('object_id', models.CharField(max_length=36)),
+                ('lead_id', models.UUIDField(db_index=True)),
+                ('body', models.TextField()),
+                ('created_date', models.DateTimeField(help_text='When the source row was created')),
+            ],
+            options={
+                'verbose_name_plural': 'Search entries',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_entry_source_unique')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0015_searchentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedLeadView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('query', models.CharField(blank=True, help_text='Lead list filters and sort, as a URL query string', max_length=1000)),
+                ('is_shared', models.BooleanField(default=False, help_text='Listed for every staff user, not only the owner')),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lead_ids', models.BinaryField(default=bytes)),
+                ('result_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('built_date', models.DateTimeField(blank=True, editable=False, help_text='Last full rebuild of the cached results', null=True)),
+                ('refreshed_date', models.DateTimeField(blank=True, editable=False, help_text='Changes up to here are in the cached results', null=True)),
+                ('is_stale', models.BooleanField(default=True, editable=False, help_text='Rebuilt from scratch when next opened')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_lead_views', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+                'constraints': [models.UniqueConstraint(fields=('owner', 'name'), name='saved_lead_view_owner_name_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0016_savedleadview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='url',
+            field=models.URLField(blank=True, help_text='Product page, filled into lead product entries'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:10
+
+from django.db import migrations, models
+
+
+def backfill_territory(apps, schema_editor):
+    from leads.territories import backfill_territories
+
+    for name in ('Lead', 'ArchivedLead'):
+        backfill_territories(apps.get_model('leads', name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0017_product_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedlead',
+            name='territory',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='City or region of the pincode, from the pincode territory table', max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='lead',
+            name='territory',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='City or region of the pincode, from the pincode territory table', max_length=50, null=True),
+        ),
+        migrations.RunPython(backfill_territory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0018_lead_territory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedlead',
+            name='ingest_item_ids',
+            field=models.JSONField(blank=True, default=list, help_text='LeadIngestItem rows to re-link on restore'),
+        ),
+    ]
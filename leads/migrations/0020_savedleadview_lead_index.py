@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0019_archivedlead_ingest_item_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedleadview',
+            name='lead_index',
+            field=models.BinaryField(default=bytes),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:52
+
+from django.db import migrations, models
+
+
+def collect_product_history(apps, schema_editor):
+    from leads.catalog import collect_history, store_history
+
+    models = [apps.get_model('leads', name) for name in ('Lead', 'ArchivedLead')]
+    store_history(collect_history(models), apps.get_model('leads', 'ProductNameUse'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0020_savedleadview_lead_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductNameUse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_id', models.IntegerField(help_text='Category id the name was entered under')),
+                ('name', models.TextField()),
+                ('uses', models.PositiveIntegerField(default=0)),
+                ('price', models.TextField(blank=True, help_text='Most recently entered price')),
+                ('url', models.TextField(blank=True, help_text='Most recently entered product URL')),
+            ],
+        ),
+        migrations.RunPython(collect_product_history, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,80 @@
 import uuid
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-import pytz
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+from .audio import format_duration
+from .storage import get_recording_storage
+from .territories import territory_for
+
+# Business timezone for due dates and day boundaries; looked up once
+IST = ZoneInfo('Asia/Kolkata')
+
+
+def normalize_phone(number):
+    """Digits-only phone number with the 91 country code, or '' if there are no digits"""
+    if not number:
+        return ''
+    # Remove any non-digit characters
+    clean_number = ''.join(filter(str.isdigit, number))
+    if clean_number:
+        # Add 91 if it doesn't start with country code
+        if not clean_number.startswith('91') and len(clean_number) == 10:
+            clean_number = '91' + clean_number
+        elif clean_number.startswith('0'):
+            clean_number = '91' + clean_number[1:]
+    return clean_number
+
+
+def whatsapp_link(number, whatsapp_url):
+    """wa.me link for a lead's number, else its stored WhatsApp URL, else '#'"""
+    clean_number = normalize_phone(number)
+    if clean_number:
+        return f"https://wa.me/+{clean_number}"
+    return whatsapp_url or "#"
+
+
+def products_summary(products_data):
+    """'3 products: Sofa (2), Bed (1)' from a lead's products_data"""
+    if not products_data:
+        return "No products"
+    
+    total_products = 0
+    categories = []
+    
+    for category_id, category_data in products_data.items():
+        category_name = category_data.get('category_name', 'Unknown')
+        products_count = len(category_data.get('products', []))
+        if products_count > 0:
+            categories.append(f"{category_name} ({products_count})")
+            total_products += products_count
+    
+    if total_products == 0:
+        return "No products"
+    
+    return f"{total_products} products: {', '.join(categories)}"
+
+
+def normalize_email(email):
+    """Trimmed, lowercased email, or '' if blank"""
+    return (email or '').strip().lower()
+
+
+def name_pincode_key(name, pincode):
+    """
+    Blocking key for leads that give the same name in the same pincode.
+
+    Names are reduced to their lowercase alphanumeric words in sorted order, so
+    "Ravi Kumar", "kumar, ravi" and "RAVI  KUMAR." share a key. Returns '' if
+    either part is missing.
+    """
+    words = ''.join(c if c.isalnum() else ' ' for c in (name or '').lower()).split()
+    pincode = ''.join(filter(str.isdigit, pincode or ''))
+    if not words or not pincode:
+        return ''
+    return f"{pincode}:{' '.join(sorted(words))}"[:220]
 
 
 class Category(models.Model):
@@ -31,6 +103,7 @@ class Product(models.Model):
     name = models.CharField(max_length=200, help_text="Product name")
     description = models.TextField(blank=True, null=True, help_text="Product description")
     price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, help_text="Product price")
+    url = models.URLField(blank=True, help_text="Product page, filled into lead product entries")
     is_active = models.BooleanField(default=True, help_text="Whether the product is currently available")
     created_date = models.DateTimeField(default=timezone.now)
     
@@ -40,8 +113,20 @@ class Product(models.Model):
     
     def __str__(self):
         return f"{self.category.get_name_display()} - {self.name}"
+    
+    def save(self, *args, **kwargs):
+        from .catalog import catalog_changed
+        super().save(*args, **kwargs)
+        catalog_changed()
+    
+    def delete(self, *args, **kwargs):
+        from .catalog import catalog_changed
+        result = super().delete(*args, **kwargs)
+        catalog_changed()
+        return result
 
-class Lead(models.Model):
+class LeadFields(models.Model):
+    """Lead columns and display helpers, shared by Lead and ArchivedLead"""
     LEAD_SOURCE_CHOICES = [
         ('whatsapp', 'WhatsApp'),
         ('instagram', 'Instagram'),
@@ -71,6 +156,10 @@ class Lead(models.Model):
     address = models.TextField(blank=True, null=True)
     pincode = models.CharField(max_length=10, blank=True, null=True)
     number = models.CharField(max_length=15, blank=True, null=True, help_text="Phone number")
+    phone_normalized = models.CharField(max_length=20, blank=True, null=True, db_index=True, editable=False, help_text="Digits-only number with country code, used for deduplication")
+    email_normalized = models.CharField(max_length=254, blank=True, null=True, db_index=True, editable=False, help_text="Lowercased email, used for deduplication")
+    name_pincode_key = models.CharField(max_length=220, blank=True, null=True, db_index=True, editable=False, help_text="Pincode plus sorted name words, used for deduplication")
+    territory = models.CharField(max_length=50, blank=True, null=True, db_index=True, editable=False, help_text="City or region of the pincode, from the pincode territory table")
     whatsapp_url = models.URLField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     remarks = models.TextField(blank=True, null=True)
@@ -78,73 +167,51 @@ class Lead(models.Model):
     lead_stage = models.CharField(max_length=20, choices=LEAD_STAGE_CHOICES, default='cold_follow_up')
     activity = models.CharField(max_length=500, blank=True, null=True)
     created_date = models.DateTimeField(default=timezone.now)
-    lead_manager = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='managed_leads')
     interested_categories = models.CharField(max_length=500, blank=True, null=True)
     task = models.CharField(max_length=500, blank=True, null=True)
-    categories = models.ManyToManyField(Category, blank=True, related_name='leads', help_text="Product categories this lead is interested in")
     products_data = models.JSONField(default=dict, blank=True, help_text="Products data stored as JSON")
+    updated_date = models.DateTimeField(auto_now=True, db_index=True)
+
+    is_archived = False
 
     class Meta:
-        ordering = ['-created_date']
-        
+        abstract = True
+
     def __str__(self):
         return f"{self.name or 'Unknown'} - {self.get_lead_status_display()}"
     
     def get_whatsapp_link(self):
         """Generate WhatsApp link from phone number"""
-        if self.number:
-            # Remove any non-digit characters and format for WhatsApp
-            clean_number = ''.join(filter(str.isdigit, self.number))
-            if clean_number:
-                # Add +91 if it doesn't start with country code
-                if not clean_number.startswith('91') and len(clean_number) == 10:
-                    clean_number = '91' + clean_number
-                elif clean_number.startswith('0'):
-                    clean_number = '91' + clean_number[1:]
-                return f"https://wa.me/+{clean_number}"
-        return self.whatsapp_url or "#"
+        return whatsapp_link(self.number, self.whatsapp_url)
     
-    def save(self, *args, **kwargs):
-        """Override save to auto-generate WhatsApp URL"""
-        if self.number and not self.whatsapp_url:
-            # Auto-generate WhatsApp URL from phone number
-            clean_number = ''.join(filter(str.isdigit, self.number))
-            if clean_number:
-                if not clean_number.startswith('91') and len(clean_number) == 10:
-                    clean_number = '91' + clean_number
-                elif clean_number.startswith('0'):
-                    clean_number = '91' + clean_number[1:]
-                self.whatsapp_url = f"https://wa.me/+{clean_number}"
-        super().save(*args, **kwargs)
+    def is_open(self):
+        """Whether the lead still counts towards its manager's workload"""
+        return self.lead_stage not in settings.LEAD_CLOSED_STAGES
+
+    def load(self):
+        """(manager id, open) pair the open-lead counters track"""
+        return self.lead_manager_id, self.is_open()
+
+    def set_dedup_keys(self):
+        """Derive email_normalized and name_pincode_key (phone_normalized is set with the WhatsApp URL)"""
+        self.email_normalized = normalize_email(self.email) or None
+        self.name_pincode_key = name_pincode_key(self.name, self.pincode) or None
+
+    def set_territory(self):
+        """Derive territory from the pincode (see leads/territories.py)"""
+        self.territory = territory_for(self.pincode) or None
     
     def get_ist_created_date(self):
         """Convert created_date to IST"""
-        ist = pytz.timezone('Asia/Kolkata')
         if timezone.is_naive(self.created_date):
-            utc_date = timezone.make_aware(self.created_date, timezone.utc)
+            utc_date = timezone.make_aware(self.created_date, dt_timezone.utc)
         else:
             utc_date = self.created_date
-        return utc_date.astimezone(ist)
+        return utc_date.astimezone(IST)
     
     def get_products_summary(self):
         """Get a summary of products from JSON data"""
-        if not self.products_data:
-            return "No products"
-        
-        total_products = 0
-        categories = []
-        
-        for category_id, category_data in self.products_data.items():
-            category_name = category_data.get('category_name', 'Unknown')
-            products_count = len(category_data.get('products', []))
-            if products_count > 0:
-                categories.append(f"{category_name} ({products_count})")
-                total_products += products_count
-        
-        if total_products == 0:
-            return "No products"
-        
-        return f"{total_products} products: {', '.join(categories)}"
+        return products_summary(self.products_data)
     
     def get_products_by_category(self):
         """Get products organized by category from JSON data"""
@@ -158,7 +225,147 @@ class Lead(models.Model):
         return result
 
 
-class Activity(models.Model):
+class Lead(LeadFields):
+    lead_manager = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='managed_leads')
+    categories = models.ManyToManyField(Category, blank=True, related_name='leads', help_text="Product categories this lead is interested in")
+
+    class Meta:
+        ordering = ['-created_date']
+        indexes = [
+            # Keyset pagination for the JSON API
+            models.Index(fields=['created_date', 'lead_id'], name='lead_created_keyset_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Override save to auto-generate WhatsApp URL, the deduplication keys and the territory"""
+        clean_number = normalize_phone(self.number)
+        self.phone_normalized = clean_number or None
+        if clean_number and not self.whatsapp_url:
+            # Auto-generate WhatsApp URL from phone number
+            self.whatsapp_url = f"https://wa.me/+{clean_number}"
+        self.set_dedup_keys()
+        self.set_territory()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'number' in update_fields:
+                update_fields |= {'phone_normalized', 'whatsapp_url'}
+            if 'email' in update_fields:
+                update_fields.add('email_normalized')
+            if update_fields & {'name', 'pincode'}:
+                update_fields.add('name_pincode_key')
+            if 'pincode' in update_fields:
+                update_fields.add('territory')
+            # auto_now is only written when listed; saved views find changed leads by it
+            update_fields.add('updated_date')
+            kwargs['update_fields'] = update_fields
+        is_new = self._state.adding
+        super().save(*args, **kwargs)
+        if update_fields is None or update_fields & {'lead_manager', 'lead_stage'}:
+            # Keep the managers' open-lead counters in step (see leads/assignment.py)
+            from .assignment import move_load
+            self._counted_load = move_load(getattr(self, '_counted_load', (None, False)), self.load())
+        if is_new:
+            # Flag likely duplicates of existing leads as they come in
+            from .dedup import flag_duplicates
+            flag_duplicates([self])
+        if update_fields is None or update_fields & {'notes', 'remarks', 'products_data'}:
+            from .search import index_leads
+            index_leads([self])
+        if self.products_data and (update_fields is None or 'products_data' in update_fields):
+            from .catalog import history_changed
+            history_changed()
+
+    def delete(self, *args, **kwargs):
+        from .assignment import move_load
+        from .saved_views import invalidate_saved_views
+        from .search import forget_leads
+        lead_id = self.pk
+        result = super().delete(*args, **kwargs)
+        move_load(getattr(self, '_counted_load', (None, False)), (None, False))
+        forget_leads([lead_id])
+        invalidate_saved_views([lead_id])
+        return result
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        lead = super().from_db(db, field_names, values)
+        if not lead.get_deferred_fields() & {'lead_manager_id', 'lead_stage'}:
+            # What ManagerCapacity.open_leads currently counts this lead as
+            lead._counted_load = lead.load()
+        return lead
+
+
+def ist_day_start(moment, days=0):
+    """Start of the IST calendar day containing moment, shifted by days, as an aware datetime"""
+    day = moment.astimezone(IST).date() + timedelta(days=days)
+    return datetime.combine(day, time.min, tzinfo=IST)
+
+
+# Value(False) compiles to "is_completed = %s"; a plain False becomes
+# "NOT is_completed", which SQLite cannot match against task_schedule_idx.
+# Every open-task condition goes through this Q so they all stay indexable.
+OPEN_TASKS = models.Q(activity_type='task', is_completed=models.Value(False))
+
+
+class ActivityQuerySet(models.QuerySet):
+    """Task scheduling filters evaluated in SQL; day boundaries are IST"""
+
+    def tasks(self):
+        return self.filter(activity_type='task')
+
+    def open(self):
+        return self.filter(OPEN_TASKS)
+
+    def overdue(self, now=None):
+        return self.open().filter(due_date__lt=now or timezone.now())
+
+    def due_today(self, now=None):
+        now = now or timezone.now()
+        return self.open().filter(due_date__gte=ist_day_start(now), due_date__lt=ist_day_start(now, 1))
+
+    def due_this_week(self, now=None):
+        """Open tasks due from the start of today until the end of Sunday (IST)"""
+        now = now or timezone.now()
+        days_left = 7 - now.astimezone(IST).weekday()
+        return self.open().filter(due_date__gte=ist_day_start(now), due_date__lt=ist_day_start(now, days_left))
+
+    def upcoming(self, now=None):
+        return self.open().filter(due_date__gte=now or timezone.now())
+
+    def for_manager(self, user):
+        """Activities on leads managed by user"""
+        return self.filter(lead__lead_manager=user)
+
+    def for_user(self, user):
+        """Activities on the user's leads or created by them"""
+        return self.filter(models.Q(lead__lead_manager=user) | models.Q(created_by=user))
+
+    def with_schedule(self, now=None):
+        """Annotate `overdue` so templates need not compare dates per row in Python"""
+        now = now or timezone.now()
+        return self.annotate(overdue=models.Case(
+            models.When(OPEN_TASKS & models.Q(due_date__lt=now), then=models.Value(True)),
+            default=models.Value(False),
+            output_field=models.BooleanField(),
+        ))
+
+    def schedule_counts(self, now=None):
+        """Open, overdue, due today, due this week and upcoming task counts in one query"""
+        now = now or timezone.now()
+        today, tomorrow = ist_day_start(now), ist_day_start(now, 1)
+        week_end = ist_day_start(now, 7 - now.astimezone(IST).weekday())
+        return self.aggregate(
+            open=models.Count('id', filter=OPEN_TASKS),
+            overdue=models.Count('id', filter=OPEN_TASKS & models.Q(due_date__lt=now)),
+            today=models.Count('id', filter=OPEN_TASKS & models.Q(due_date__gte=today, due_date__lt=tomorrow)),
+            week=models.Count('id', filter=OPEN_TASKS & models.Q(due_date__gte=today, due_date__lt=week_end)),
+            upcoming=models.Count('id', filter=OPEN_TASKS & models.Q(due_date__gte=now)),
+        )
+
+
+class ActivityFields(models.Model):
+    """Activity columns and display helpers, shared by Activity and ArchivedActivity"""
     ACTIVITY_TYPE_CHOICES = [
         ('call', 'Call'),
         ('note', 'Note'),
@@ -172,49 +379,53 @@ class Activity(models.Model):
         ('high', 'High'),
     ]
 
-    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='activities')
     activity_type = models.CharField(max_length=20, choices=ACTIVITY_TYPE_CHOICES)
     description = models.TextField(help_text="Description of the activity")
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_activities')
     created_date = models.DateTimeField(default=timezone.now)
     
     # Call recording field
     recording = models.FileField(
         upload_to='Call Recordings/', 
+        storage=get_recording_storage,
         blank=True, 
         null=True, 
         help_text="Call recording file (for call activities only)"
     )
+    # Recording metadata, extracted once in the background after upload (see leads/audio.py)
+    recording_duration = models.FloatField(blank=True, null=True, db_index=True, help_text="Recording length in seconds")
+    recording_bitrate = models.PositiveIntegerField(blank=True, null=True, help_text="Bits per second")
+    recording_size = models.PositiveBigIntegerField(blank=True, null=True, db_index=True, help_text="File size in bytes")
+    recording_codec = models.CharField(max_length=20, blank=True, null=True)
+    recording_checksum = models.CharField(max_length=64, blank=True, null=True, db_index=True, help_text="SHA-256 of the file")
     
     # Task-specific fields
     due_date = models.DateTimeField(blank=True, null=True, help_text="Due date for tasks (IST)")
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, blank=True, null=True, help_text="Priority for tasks")
     is_completed = models.BooleanField(default=False, help_text="Whether the task is completed")
+    updated_date = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
-        ordering = ['-created_date']
-        
+        abstract = True
+
     def __str__(self):
         return f"{self.get_activity_type_display()} - {self.lead.name or 'Unknown'} - {self.created_date.strftime('%Y-%m-%d')}"
     
     def get_ist_created_date(self):
         """Convert created_date to IST"""
-        ist = pytz.timezone('Asia/Kolkata')
         if timezone.is_naive(self.created_date):
-            utc_date = timezone.make_aware(self.created_date, timezone.utc)
+            utc_date = timezone.make_aware(self.created_date, dt_timezone.utc)
         else:
             utc_date = self.created_date
-        return utc_date.astimezone(ist)
+        return utc_date.astimezone(IST)
     
     def get_ist_due_date(self):
         """Convert due_date to IST"""
         if self.due_date:
-            ist = pytz.timezone('Asia/Kolkata')
             if timezone.is_naive(self.due_date):
-                utc_date = timezone.make_aware(self.due_date, timezone.utc)
+                utc_date = timezone.make_aware(self.due_date, dt_timezone.utc)
             else:
                 utc_date = self.due_date
-            return utc_date.astimezone(ist)
+            return utc_date.astimezone(IST)
         return None
     
     def is_overdue(self):
@@ -223,50 +434,124 @@ class Activity(models.Model):
             return timezone.now() > self.due_date
         return False
     
+    def clear_recording_metadata(self):
+        """Reset the extracted recording metadata"""
+        self.recording_duration = None
+        self.recording_bitrate = None
+        self.recording_size = None
+        self.recording_codec = None
+        self.recording_checksum = None
+    
+    def get_recording_duration_display(self):
+        """Recording length as m:ss (or h:mm:ss)"""
+        return format_duration(self.recording_duration)
+
+
+class Activity(ActivityFields):
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='activities')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_activities')
+
+    objects = ActivityQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_date']
+        indexes = [
+            # Keyset pagination for the JSON API
+            models.Index(fields=['created_date', 'id'], name='activity_created_keyset_idx'),
+            # Open-task queues (overdue / due today / upcoming), overall and per creator.
+            # Plain composites rather than partial indexes: SQLite cannot match a
+            # partial index condition against bound parameters.
+            models.Index(fields=['activity_type', 'is_completed', 'due_date'], name='task_schedule_idx'),
+            models.Index(fields=['created_by', 'activity_type', 'is_completed', 'due_date'], name='task_creator_schedule_idx'),
+            # Call analytics: talk time per staff member over a date range
+            models.Index(fields=['activity_type', 'created_by', 'created_date'], name='activity_type_user_date_idx'),
+        ]
+
+    def get_recording_filename(self):
+        """Build the customername__currenttime filename for a new call recording"""
+        customer_name = self.lead.name or 'Unknown'
+        # Replace spaces and special characters with underscores
+        customer_name = ''.join(c if c.isalnum() else '_' for c in customer_name)
+        
+        # Get current timestamp
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        
+        # Get file extension
+        file_ext = self.recording.name.split('.')[-1] if '.' in self.recording.name else 'mp3'
+        
+        return f"{customer_name}__{timestamp}.{file_ext}"
+    
     def save(self, *args, **kwargs):
         """Override save to handle call recording naming"""
-        if self.recording and self.activity_type == 'call':
-            # Generate custom filename: customername__currenttime
-            customer_name = self.lead.name or 'Unknown'
-            # Replace spaces and special characters with underscores
-            customer_name = ''.join(c if c.isalnum() else '_' for c in customer_name)
-            
-            # Get current timestamp
-            timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-            
-            # Get file extension
-            file_ext = self.recording.name.split('.')[-1] if '.' in self.recording.name else 'mp3'
-            
-            # Create new filename
-            new_filename = f"{customer_name}__{timestamp}.{file_ext}"
-            
-            # Update the file field with new name
-            self.recording.name = f"Call Recordings/{new_filename}"
+        # Only rename freshly uploaded files; re-saving must not point the
+        # field at a name that was never written to storage
+        if self.recording and self.activity_type == 'call' and not self.recording._committed:
+            # upload_to adds the "Call Recordings/" directory when the file is stored
+            self.recording.name = self.get_recording_filename()
+        if self.recording and not self.recording._committed:
+            # A replaced recording needs its metadata read again
+            self.clear_recording_metadata()
         
         super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if self.recording and self.recording_size is None and (update_fields is None or 'recording' in update_fields):
+            from jobs.queue import enqueue_once
+            enqueue_once('leads.extract_recording_metadata', activity_id=self.pk)
+        if update_fields is None or 'description' in update_fields:
+            from .search import index_activities
+            index_activities([self])
 
+    def delete(self, *args, **kwargs):
+        from .search import unindex
+        activity_id = self.pk
+        result = super().delete(*args, **kwargs)
+        # Entries of this activity's notes are dropped when a search next finds them
+        unindex('activity', [activity_id])
+        return result
 
-class TaskNote(models.Model):
-    """Notes added to tasks"""
-    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name='notes', limit_choices_to={'activity_type': 'task'})
+
+class TaskNoteFields(models.Model):
+    """Task note columns, shared by TaskNote and ArchivedTaskNote"""
     note = models.TextField(help_text="Note content")
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_notes')
     created_date = models.DateTimeField(default=timezone.now)
-    
+
     class Meta:
-        ordering = ['-created_date']
-    
+        abstract = True
+
     def __str__(self):
         return f"Note for {self.activity} - {self.created_date.strftime('%Y-%m-%d')}"
     
     def get_ist_created_date(self):
         """Convert created_date to IST"""
-        ist = pytz.timezone('Asia/Kolkata')
         if timezone.is_naive(self.created_date):
-            utc_date = timezone.make_aware(self.created_date, timezone.utc)
+            utc_date = timezone.make_aware(self.created_date, dt_timezone.utc)
         else:
             utc_date = self.created_date
-        return utc_date.astimezone(ist)
+        return utc_date.astimezone(IST)
+
+
+class TaskNote(TaskNoteFields):
+    """Notes added to tasks"""
+    activity = models.ForeignKey(Activity, on_delete=models.CASCADE, related_name='notes', limit_choices_to={'activity_type': 'task'})
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_notes')
+    
+    class Meta:
+        ordering = ['-created_date']
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'note' in update_fields:
+            from .search import index_notes
+            index_notes([self])
+
+    def delete(self, *args, **kwargs):
+        from .search import unindex
+        note_id = self.pk
+        result = super().delete(*args, **kwargs)
+        unindex('note', [note_id])
+        return result
 
 
 class LeadProduct(models.Model):
@@ -284,3 +569,224 @@ class LeadProduct(models.Model):
     
     def __str__(self):
         return f"{self.lead.name} - {self.product.name} (x{self.quantity})"
+
+
+class LeadIngestItem(models.Model):
+    """Staging row for a lead pushed through the ingestion webhook, drained into Lead in batches"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('imported', 'Imported'),
+        ('duplicate', 'Duplicate'),
+        ('failed', 'Failed'),
+    ]
+
+    idempotency_key = models.CharField(max_length=128, unique=True, help_text="Caller-supplied or payload-derived key; repeats are ignored")
+    source = models.CharField(max_length=50, help_text="Integration that pushed the lead")
+    payload = models.JSONField(help_text="Lead fields as received")
+    phone_normalized = models.CharField(max_length=20, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    batch_id = models.UUIDField(blank=True, null=True, help_text="Drain run that claimed this row")
+    lead = models.ForeignKey(Lead, on_delete=models.SET_NULL, blank=True, null=True, related_name='ingest_items')
+    error = models.TextField(blank=True, null=True)
+    received_date = models.DateTimeField(default=timezone.now)
+    processed_date = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='ingest_status_idx'),
+            models.Index(fields=['batch_id'], name='ingest_batch_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} - {self.idempotency_key} ({self.get_status_display()})"
+
+
+class PackedRecording(models.Model):
+    """Index entry for a call recording moved into an archive pack file (see leads/recording_archive.py)"""
+    CODEC_CHOICES = [
+        ('store', 'Stored'),
+        ('zlib', 'zlib'),
+    ]
+
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name of the recording, as kept on Activity.recording")
+    pack = models.CharField(max_length=100, help_text="Pack file name inside RECORDING_ARCHIVE_ROOT")
+    offset = models.PositiveBigIntegerField(help_text="Byte offset of the entry data in the pack")
+    length = models.PositiveBigIntegerField(help_text="Bytes stored in the pack")
+    size = models.PositiveBigIntegerField(help_text="Original file size")
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES, default='store')
+    checksum = models.CharField(max_length=64, help_text="SHA-256 of the original file")
+    archived_date = models.DateTimeField(default=timezone.now)
+    verified_date = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['pack', 'offset']
+
+    def __str__(self):
+        return f"{self.name} ({self.pack}@{self.offset})"
+
+
+class DuplicateLead(models.Model):
+    """A lead flagged as a likely duplicate of an older one (see leads/dedup.py)"""
+    REASON_CHOICES = [
+        ('phone', 'Same phone number'),
+        ('email', 'Same email'),
+        ('name_pincode', 'Same name and pincode'),
+    ]
+
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='duplicate_flags', help_text="The newer lead")
+    duplicate_of = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='+', help_text="Oldest lead in the same cluster; kept on merge")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    dismissed = models.BooleanField(default=False, help_text="Reviewed and not a duplicate; never flagged again")
+    detected_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-detected_date']
+        unique_together = ['lead', 'duplicate_of']
+        indexes = [
+            models.Index(fields=['dismissed', 'detected_date'], name='duplicate_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.lead} may duplicate {self.duplicate_of} ({self.get_reason_display()})"
+
+
+class ManagerCapacity(models.Model):
+    """A lead manager taking part in automatic lead assignment (see leads/assignment.py)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='lead_capacity')
+    is_accepting = models.BooleanField(default=True, help_text="Receives automatically assigned leads")
+    weight = models.PositiveSmallIntegerField(default=1, help_text="Relative share of new leads under weighted assignment")
+    max_open_leads = models.PositiveIntegerField(blank=True, null=True, help_text="Stop assigning once this many leads are open (blank = no limit)")
+    open_leads = models.PositiveIntegerField(default=0, editable=False, help_text="Open leads managed; maintained incrementally")
+    last_assigned_date = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        verbose_name_plural = "Manager capacities"
+        ordering = ['user__username']
+
+    def __str__(self):
+        return f"{self.user.username} ({self.open_leads} open)"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # Start from the manager's actual workload
+            self.open_leads = Lead.objects.filter(lead_manager_id=self.user_id).exclude(
+                lead_stage__in=settings.LEAD_CLOSED_STAGES
+            ).count()
+        super().save(*args, **kwargs)
+
+
+class ArchivedLead(LeadFields):
+    """A cold lead moved out of the hot Lead table (see leads/archive.py); same lead_id"""
+    lead_manager = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    categories = models.ManyToManyField(Category, blank=True, related_name='+')
+    # Kept as the values they had, not touched by the move
+    updated_date = models.DateTimeField(db_index=True)
+    lead_products = models.JSONField(default=list, blank=True, help_text="LeadProduct rows at archive time")
+    ingest_item_ids = models.JSONField(default=list, blank=True, help_text="LeadIngestItem rows to re-link on restore")
+    archived_date = models.DateTimeField(default=timezone.now, db_index=True)
+
+    is_archived = True
+
+    class Meta:
+        ordering = ['-created_date']
+        indexes = [
+            models.Index(fields=['created_date', 'lead_id'], name='archived_lead_created_idx'),
+        ]
+
+
+class ArchivedActivity(ActivityFields):
+    """An activity of an archived lead; same id as it had in Activity"""
+    id = models.BigIntegerField(primary_key=True)
+    lead = models.ForeignKey(ArchivedLead, on_delete=models.CASCADE, related_name='activities')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    updated_date = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-created_date']
+        verbose_name_plural = "Archived activities"
+
+
+class ArchivedTaskNote(TaskNoteFields):
+    """A note on an archived task; same id as it had in TaskNote"""
+    id = models.BigIntegerField(primary_key=True)
+    activity = models.ForeignKey(ArchivedActivity, on_delete=models.CASCADE, related_name='notes')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        ordering = ['-created_date']
+
+
+class SearchEntry(models.Model):
+    """
+    Free text of one lead, activity or task note, for the global search page
+    (see leads/search.py). Kept current as the rows are saved; the full-text
+    index over ``body`` is created by the migration for the database in use.
+    """
+    KIND_CHOICES = [
+        ('lead', 'Lead'),
+        ('activity', 'Activity'),
+        ('note', 'Task note'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Primary key of the source row; archived rows keep theirs, so entries survive archiving
+    object_id = models.CharField(max_length=36)
+    lead_id = models.UUIDField(db_index=True)
+    body = models.TextField()
+    created_date = models.DateTimeField(help_text="When the source row was created")
+
+    class Meta:
+        verbose_name_plural = "Search entries"
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_entry_source_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.object_id}"
+
+
+class SavedLeadView(models.Model):
+    """
+    A named lead list filter and sort, with its matching lead ids cached
+    (see leads/saved_views.py)
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_lead_views')
+    name = models.CharField(max_length=100)
+    query = models.CharField(max_length=1000, blank=True, help_text="Lead list filters and sort, as a URL query string")
+    is_shared = models.BooleanField(default=False, help_text="Listed for every staff user, not only the owner")
+    created_date = models.DateTimeField(default=timezone.now)
+    # Cached result set: fixed-size (sort key, lead id) records in sort order
+    lead_ids = models.BinaryField(default=bytes, editable=False)
+    # The same records as (lead id, sort key), in lead id order, to find a lead's record
+    lead_index = models.BinaryField(default=bytes, editable=False)
+    result_count = models.PositiveIntegerField(default=0, editable=False)
+    built_date = models.DateTimeField(blank=True, null=True, editable=False, help_text="Last full rebuild of the cached results")
+    refreshed_date = models.DateTimeField(blank=True, null=True, editable=False, help_text="Changes up to here are in the cached results")
+    is_stale = models.BooleanField(default=True, editable=False, help_text="Rebuilt from scratch when next opened")
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'name'], name='saved_lead_view_owner_name_unique'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ProductNameUse(models.Model):
+    """
+    A product name typed into leads' ``products_data``, with how many leads
+    use it, for product autocomplete (see leads/catalog.py). Rebuilt by a
+    background job, never on a request.
+    """
+    category_id = models.IntegerField(help_text="Category id the name was entered under")
+    name = models.TextField()
+    uses = models.PositiveIntegerField(default=0)
+    price = models.TextField(blank=True, help_text="Most recently entered price")
+    url = models.TextField(blank=True, help_text="Most recently entered product URL")
+
+    def __str__(self):
+        return self.name
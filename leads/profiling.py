@@ -0,0 +1,264 @@
+"""
+Opt-in request profiling.
+
+``ProfilingMiddleware`` profiles a PROFILING_SAMPLE_RATE fraction of requests,
+plus any request from a superuser that sends ``X-Profile: 1``. While a request
+is profiled, a background thread samples the handling thread's stack every
+PROFILING_INTERVAL seconds. No tracing hooks are installed, so a profiled
+request runs at close to full speed. Requests that are not profiled cost one
+random number and a header lookup.
+
+Results are aggregated per URL name (``leads:lead_list``, ``leads:tasks``, ...)
+under PROFILING_ROOT:
+
+- ``<url name>.folded``: collapsed stacks (``frame;frame;frame count``), one
+  line per stack per request. flamegraph.pl, speedscope and inferno render
+  these files as flame graphs.
+- ``<url name>.jsonl``: one line per profiled request with its path, duration
+  and sample count.
+
+Both files are only ever appended to, so concurrent workers need no locking.
+The superuser "Profiles" page summarises them.
+"""
+import json
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .benchmarks import latency_summary
+
+UNRESOLVED = 'unresolved'
+
+
+def profile_root():
+    return Path(settings.PROFILING_ROOT)
+
+
+def file_stem(view_name):
+    """Filesystem-safe name for a URL name"""
+    return view_name.replace(':', '.').replace(os.sep, '_')
+
+
+_labels = {}
+
+
+def frame_label(code):
+    """'function (path:line)' for a code object, with paths relative to the project, site-packages or stdlib"""
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for prefix in (str(settings.BASE_DIR) + os.sep, 'site-packages' + os.sep, sysconfig.get_paths()['stdlib'] + os.sep):
+            index = filename.find(prefix)
+            if index != -1:
+                filename = filename[index + len(prefix):]
+                break
+        # ';' separates frames in the folded format (the count follows the last space)
+        label = f'{code.co_qualname} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+        _labels[code] = label
+    return label
+
+
+class StackSampler:
+    """Samples one thread's stack from a background thread until stopped"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+def record_profile(view_name, path, duration_ms, stacks):
+    """Append one profiled request to the files for its URL name"""
+    root = profile_root()
+    root.mkdir(parents=True, exist_ok=True)
+    stem = file_stem(view_name)
+    if stacks:
+        with open(root / f'{stem}.folded', 'a', encoding='utf-8') as folded:
+            folded.write(''.join(f'{stack} {count}\n' for stack, count in stacks.items()))
+    record = {
+        'view': view_name,
+        'path': path,
+        'time': time.time(),
+        'duration_ms': round(duration_ms, 2),
+        'samples': sum(stacks.values()),
+    }
+    with open(root / f'{stem}.jsonl', 'a', encoding='utf-8') as log:
+        log.write(json.dumps(record) + '\n')
+
+
+class ProfilingMiddleware:
+    """
+    Profile sampled requests, and superuser requests that ask for it with X-Profile: 1.
+
+    Works in both middleware modes. Under ASGI it stays async, so coroutine
+    views keep running on the event loop, and the sampler watches the loop
+    thread that runs them. A sync view runs in the request's thread-sensitive
+    worker thread instead, so process_view points the sampler there first.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def sampled(self):
+        return bool(settings.PROFILING_SAMPLE_RATE) and random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def should_profile(self, request):
+        if self.sampled():
+            return True
+        if request.headers.get('X-Profile') == '1':
+            user = getattr(request, 'user', None)
+            return user is not None and user.is_superuser
+        return False
+
+    async def ashould_profile(self, request):
+        if self.sampled():
+            return True
+        if request.headers.get('X-Profile') == '1' and hasattr(request, 'auser'):
+            return (await request.auser()).is_superuser
+        return False
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL).start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            stacks = sampler.stop()
+        record_profile(*self.record_args(request, duration_ms, stacks))
+        response['X-Profile-Duration'] = f'{duration_ms:.1f}ms'
+        return response
+
+    async def __acall__(self, request):
+        if not await self.ashould_profile(request):
+            return await self.get_response(request)
+
+        # The event loop thread, where coroutine views run
+        sampler = request.profiling_sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL).start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            stacks = sampler.stop()
+        # Appending to the profile files is blocking I/O; keep it off the loop
+        await sync_to_async(record_profile, thread_sensitive=False)(*self.record_args(request, duration_ms, stacks))
+        response['X-Profile-Duration'] = f'{duration_ms:.1f}ms'
+        return response
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        sampler = getattr(request, 'profiling_sampler', None)
+        if sampler is not None and not iscoroutinefunction(view_func):
+            # Sync views run in the request's thread-sensitive thread; sample that one
+            sampler.thread_id = await sync_to_async(threading.get_ident, thread_sensitive=True)()
+        return None
+
+    def record_args(self, request, duration_ms, stacks):
+        """record_profile() arguments for a finished request"""
+        match = request.resolver_match
+        return match.view_name if match else UNRESOLVED, request.path, duration_ms, stacks
+
+
+def merged_stacks(view_name):
+    """{collapsed stack: samples} over every profiled request of a URL name"""
+    stacks = Counter()
+    path = profile_root() / f'{file_stem(view_name)}.folded'
+    if path.exists():
+        with open(path, encoding='utf-8') as folded:
+            for line in folded:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    return stacks
+
+
+def top_functions(stacks, number=10):
+    """
+    Functions with the most samples: ``self`` counts samples where the function
+    was running, ``total`` where it was anywhere on the stack
+    """
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    samples = sum(stacks.values()) or 1
+    return [
+        {'function': frame, 'self': own[frame], 'self_pct': 100 * own[frame] / samples, 'total_pct': 100 * total[frame] / samples}
+        for frame, _ in own.most_common(number)
+    ]
+
+
+def endpoint_summaries(functions=5):
+    """Profiled URL names, slowest p95 first, each with its latency summary and top functions"""
+    root = profile_root()
+    summaries = []
+    for log_path in sorted(root.glob('*.jsonl')) if root.exists() else []:
+        with open(log_path, encoding='utf-8') as log:
+            records = [json.loads(line) for line in log if line.strip()][-settings.PROFILING_MAX_RECORDS:]
+        if not records:
+            continue
+        view_name = records[-1]['view']
+        summaries.append({
+            'view': view_name,
+            'stem': log_path.stem,
+            **latency_summary([record['duration_ms'] for record in records]),
+            'samples': sum(record['samples'] for record in records),
+            'last_path': records[-1]['path'],
+            'last_time': records[-1]['time'],
+            'functions': top_functions(merged_stacks(view_name), functions),
+        })
+    summaries.sort(key=lambda summary: summary['p95_ms'], reverse=True)
+    return summaries
+
+
+def clear_profiles():
+    """Delete every collected profile; returns files removed"""
+    root = profile_root()
+    removed = 0
+    for path in [*root.glob('*.folded'), *root.glob('*.jsonl')] if root.exists() else []:
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
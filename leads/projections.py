@@ -0,0 +1,182 @@
+"""
+Display rows for the list pages: the lead list, the task board and the call
+recordings.
+
+Rendering a list from model instances pays for every column of every row
+(``notes``, ``remarks``, ``address`` and the ``products_data`` JSON on leads),
+for building the instances, and then, per row and per use in the template, for
+the display helpers (``get_*_display``, ``get_whatsapp_link``,
+``get_ist_created_date`` and the ``|date`` filter over it). The list pages
+instead select just the columns they show with ``values()`` and turn each
+page into small ``__slots__`` rows. Every label, link and IST date string is
+computed once, when the row is built, and the templates only read attributes.
+
+Rows nest like the models they replace (``task.lead.name``,
+``call.lead.number``), so the templates keep their shape. The detail page URL
+comes from one ``reverse()`` per page, with the lead id swapped in for each
+row. ``manage.py bench_rows`` compares building rows both ways.
+"""
+import uuid
+from collections import defaultdict
+
+from django.urls import reverse
+
+from .audio import format_duration
+from .models import IST, Activity, Lead, TaskNote, products_summary, whatsapp_link
+
+STAGE_LABELS = dict(Lead.LEAD_STAGE_CHOICES)
+STATUS_LABELS = dict(Lead.LEAD_STATUS_CHOICES)
+PRIORITY_LABELS = dict(Activity.PRIORITY_CHOICES)
+PLACEHOLDER = str(uuid.UUID(int=0))
+
+# Lead columns shown wherever a lead appears in a list
+LEAD_FIELDS = ('lead_id', 'name', 'email', 'number', 'whatsapp_url', 'pincode', 'lead_status', 'lead_stage')
+LEAD_ROW_FIELDS = LEAD_FIELDS + ('products_data', 'created_date')
+OWNER_FIELDS = ('created_by__first_name', 'created_by__last_name', 'created_by__username')
+TASK_ROW_FIELDS = (
+    'id', 'description', 'due_date', 'priority', 'is_completed', 'overdue', 'created_date',
+    *OWNER_FIELDS, *(f'lead__{name}' for name in LEAD_FIELDS),
+)
+NOTE_ROW_FIELDS = ('activity_id', 'note', 'created_date', *OWNER_FIELDS)
+CALL_ROW_FIELDS = (
+    'description', 'created_date', 'recording', 'recording_duration', 'recording_size',
+    *OWNER_FIELDS, *(f'lead__{name}' for name in LEAD_FIELDS),
+)
+
+
+def ist_day(moment):
+    """'Oct 05, 2026' in IST, as |date:"M d, Y" shows it"""
+    return f'{moment.astimezone(IST):%b %d, %Y}'
+
+
+def ist_time(moment, padded=False):
+    """'9:05 AM' (|date:"g:i A"), or '09:05 AM' (|time:"h:i A") when padded, in IST"""
+    local = moment.astimezone(IST)
+    return f'{local:%I:%M %p}' if padded else f'{local.hour % 12 or 12}:{local:%M %p}'
+
+
+def ist_datetime(moment):
+    """'Oct 05, 2026 9:05 AM' in IST"""
+    return f'{ist_day(moment)} {ist_time(moment)}'
+
+
+def owner_name(values):
+    """Full name of the row's created_by user, or their username"""
+    full_name = f"{values['created_by__first_name']} {values['created_by__last_name']}".strip()
+    return full_name or values['created_by__username']
+
+
+def detail_url_template():
+    """The lead detail URL with a placeholder id, reversed once per page"""
+    return reverse('leads:lead_detail', kwargs={'lead_id': PLACEHOLDER})
+
+
+class LeadRow:
+    """A lead as the list pages show it"""
+
+    __slots__ = (
+        'lead_id', 'name', 'email', 'number', 'pincode', 'lead_status', 'status_label', 'stage_label',
+        'whatsapp_link', 'detail_url', 'products_summary', 'created_day', 'created_time', 'is_archived',
+    )
+
+    def __init__(self, values, url_template, prefix='', is_archived=False):
+        self.lead_id = values[f'{prefix}lead_id']
+        self.name = values[f'{prefix}name']
+        self.email = values[f'{prefix}email']
+        self.number = values[f'{prefix}number']
+        self.pincode = values[f'{prefix}pincode']
+        self.lead_status = values[f'{prefix}lead_status']
+        self.status_label = STATUS_LABELS.get(self.lead_status, self.lead_status)
+        stage = values[f'{prefix}lead_stage']
+        self.stage_label = STAGE_LABELS.get(stage, stage)
+        self.whatsapp_link = whatsapp_link(self.number, values[f'{prefix}whatsapp_url'])
+        self.detail_url = url_template.replace(PLACEHOLDER, str(self.lead_id))
+        self.is_archived = is_archived
+        # Only the lead list itself shows these (nested leads are not selected with them)
+        if 'products_data' in values:
+            self.products_summary = products_summary(values['products_data'])
+            self.created_day = ist_day(values['created_date'])
+            self.created_time = ist_time(values['created_date'], padded=True)
+        else:
+            self.products_summary = self.created_day = self.created_time = None
+
+
+class NoteRow:
+    """A task note on the task board"""
+
+    __slots__ = ('note', 'owner', 'created_label')
+
+    def __init__(self, values):
+        self.note = values['note']
+        self.owner = owner_name(values)
+        self.created_label = ist_datetime(values['created_date'])
+
+
+class TaskRow:
+    """A task on the task board, with its lead and notes"""
+
+    __slots__ = (
+        'id', 'description', 'due_date', 'due_day', 'due_time', 'due_label', 'priority', 'priority_label',
+        'is_completed', 'overdue', 'owner', 'created_label', 'lead', 'notes',
+    )
+
+    def __init__(self, values, url_template, notes):
+        self.id = values['id']
+        self.description = values['description']
+        self.due_date = due_date = values['due_date']
+        self.due_day = ist_day(due_date) if due_date else None
+        self.due_time = ist_time(due_date) if due_date else None
+        self.due_label = f'{self.due_day} {self.due_time}' if due_date else None
+        self.priority = values['priority']
+        self.priority_label = PRIORITY_LABELS.get(self.priority, self.priority)
+        self.is_completed = values['is_completed']
+        self.overdue = values['overdue']
+        self.owner = owner_name(values)
+        self.created_label = ist_datetime(values['created_date'])
+        self.lead = LeadRow(values, url_template, prefix='lead__')
+        self.notes = notes
+
+
+class CallRow:
+    """A recorded call on the call recordings page, with its lead"""
+
+    __slots__ = (
+        'description', 'owner', 'created_label', 'recording_name', 'recording_url',
+        'recording_duration', 'duration_label', 'recording_size', 'lead',
+    )
+
+    def __init__(self, values, url_template, storage):
+        self.description = values['description']
+        self.owner = owner_name(values)
+        self.created_label = ist_datetime(values['created_date'])
+        self.recording_name = values['recording']
+        self.recording_url = storage.url(self.recording_name)
+        self.recording_duration = values['recording_duration']
+        self.duration_label = format_duration(self.recording_duration)
+        self.recording_size = values['recording_size']
+        self.lead = LeadRow(values, url_template, prefix='lead__')
+
+
+def lead_rows(rows, is_archived=False):
+    """LeadRows for a page of LEAD_ROW_FIELDS dicts; a dict's own 'is_archived' wins over the default"""
+    url_template = detail_url_template()
+    return [LeadRow(values, url_template, is_archived=values.get('is_archived', is_archived)) for values in rows]
+
+
+def task_rows(tasks):
+    """TaskRows for a task queryset annotated with_schedule(), its notes fetched in one more query"""
+    rows = list(tasks.values(*TASK_ROW_FIELDS))
+    notes = defaultdict(list)
+    if rows:
+        note_values = TaskNote.objects.filter(activity_id__in=[values['id'] for values in rows]).values(*NOTE_ROW_FIELDS)
+        for values in note_values:
+            notes[values['activity_id']].append(NoteRow(values))
+    url_template = detail_url_template()
+    return [TaskRow(values, url_template, notes.get(values['id'], [])) for values in rows]
+
+
+def call_rows(rows):
+    """CallRows for a page of CALL_ROW_FIELDS dicts"""
+    url_template = detail_url_template()
+    storage = Activity._meta.get_field('recording').storage
+    return [CallRow(values, url_template, storage) for values in rows]
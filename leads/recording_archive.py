@@ -0,0 +1,239 @@
+"""
+Archive pack files for old call recordings.
+
+Recordings past ``RECORDING_ARCHIVE_AFTER_DAYS``, or on leads whose stage is
+in ``RECORDING_ARCHIVE_STAGES``, are appended to pack files under
+``RECORDING_ARCHIVE_ROOT`` and their raw files are removed. A ``PackedRecording``
+row records where each one lives, so ``Activity.recording`` keeps its name and
+the recording storage (leads/storage.py) reads it back out of the pack.
+
+Pack layout: a sequence of entries, each a fixed header (magic, name length,
+data length), the UTF-8 storage name and the data. Packs are only ever
+appended to, so a crash mid-write leaves at most an unindexed tail. Each entry
+is zlib-compressed when that saves space (WAV recordings) and stored as-is
+otherwise (MP3/M4A/OGG are already compressed).
+"""
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Activity, PackedRecording
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+ENTRY_MAGIC = b'RPK1'
+ENTRY_HEADER = struct.Struct('>4sHQ')
+# Only keep zlib output when it is at least this much smaller than the original
+MIN_COMPRESSION_RATIO = 0.95
+# Recordings are streamed through in pieces this size, never read whole
+CHUNK_SIZE = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """Raised when a pack or its index is unusable"""
+
+
+def pack_path(pack):
+    return os.path.join(settings.RECORDING_ARCHIVE_ROOT, pack)
+
+
+# Readers share one mapping per pack; packs only grow, so remap when an entry lies past the end
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+def pack_map(pack, needed):
+    """Read-only mmap of a pack covering at least ``needed`` bytes"""
+    path = pack_path(pack)
+    with _maps_lock:
+        mapped = _maps.get(path)
+        if mapped is None or len(mapped) < needed:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(mapped) < needed:
+                raise ArchiveError(f'{pack} is shorter than its index.')
+            _maps[path] = mapped
+        return mapped
+
+
+class PackedSlice(io.RawIOBase):
+    """Seekable read-only view of one stored entry, served straight from the mmap"""
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.view[self.position:self.position + len(buffer)]
+        buffer[:len(chunk)] = chunk
+        self.position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: len(self.view)}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        self.view.release()
+        super().close()
+
+
+def open_packed(packed):
+    """Binary file object with the original bytes of an archived recording"""
+    view = memoryview(pack_map(packed.pack, packed.offset + packed.length))[packed.offset:packed.offset + packed.length]
+    if packed.codec == 'zlib':
+        try:
+            return io.BytesIO(zlib.decompress(view))
+        finally:
+            view.release()
+    return io.BufferedReader(PackedSlice(view))
+
+
+def compress_into(source, spool):
+    """Stream ``source`` into ``spool`` zlib-compressed; returns the original (size, checksum)"""
+    digest = hashlib.sha256()
+    compressor = zlib.compressobj(6)
+    size = 0
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+        spool.write(compressor.compress(chunk))
+    spool.write(compressor.flush())
+    return size, digest.hexdigest()
+
+
+def lock_exclusive(lock_file):
+    """Take a non-blocking exclusive lock on an open file, or raise ArchiveError"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        raise ArchiveError('Another archiver is running.')
+
+
+@contextmanager
+def archive_lock():
+    """Only one archiver may append to the packs at a time"""
+    os.makedirs(settings.RECORDING_ARCHIVE_ROOT, exist_ok=True)
+    with open(pack_path('archive.lock'), 'w') as lock_file:
+        lock_exclusive(lock_file)
+        yield
+
+
+def current_pack():
+    """Name of the pack to append to, starting a new one past RECORDING_ARCHIVE_PACK_SIZE"""
+    packs = sorted(name for name in os.listdir(settings.RECORDING_ARCHIVE_ROOT) if name.endswith('.pack'))
+    if packs and os.path.getsize(pack_path(packs[-1])) < settings.RECORDING_ARCHIVE_PACK_SIZE:
+        return packs[-1]
+    number = int(packs[-1][5:11]) + 1 if packs else 1
+    return f'pack-{number:06d}.pack'
+
+
+def archivable_recordings(now=None):
+    """Call activities whose recordings are due for archival and still raw files"""
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=settings.RECORDING_ARCHIVE_AFTER_DAYS)
+    packed_names = PackedRecording.objects.values('name')
+    return (
+        Activity.objects.filter(activity_type='call')
+        .exclude(recording='').exclude(recording__isnull=True)
+        .filter(Q(created_date__lt=cutoff) | Q(lead__lead_stage__in=settings.RECORDING_ARCHIVE_STAGES))
+        .exclude(recording__in=packed_names)
+        .order_by('created_date', 'id')
+    )
+
+
+def archive_batch(activities, storage):
+    """
+    Append a batch of recordings to the current pack; returns (archived, bytes_in, bytes_out).
+
+    The pack is fsynced before the index rows are committed and the raw files
+    are removed only after that, so every step can be safely re-run.
+    """
+    pack = current_pack()
+    entries, raw_paths = [], []
+    bytes_in = bytes_out = 0
+    with open(pack_path(pack), 'ab') as f:
+        for activity in activities:
+            name = activity.recording.name
+            if not storage.raw_exists(name):
+                continue
+            with storage.open(name, 'rb') as source, tempfile.TemporaryFile() as spool:
+                size, checksum = compress_into(source, spool)
+                if activity.recording_checksum and activity.recording_checksum != checksum:
+                    raise ArchiveError(f'{name} does not match its recorded checksum.')
+                # Keep the zlib stream only when it pays off; compressed formats are stored as-is
+                if spool.tell() < size * MIN_COMPRESSION_RATIO:
+                    codec, stored, length = 'zlib', spool, spool.tell()
+                else:
+                    codec, stored, length = 'store', source, size
+                encoded_name = name.encode('utf-8')
+                f.write(ENTRY_HEADER.pack(ENTRY_MAGIC, len(encoded_name), length))
+                f.write(encoded_name)
+                offset = f.tell()
+                stored.seek(0)
+                shutil.copyfileobj(stored, f, CHUNK_SIZE)
+            entries.append(PackedRecording(
+                name=name, pack=pack, offset=offset, length=length,
+                size=size, codec=codec, checksum=checksum,
+            ))
+            raw_paths.append(storage.path(name))
+            bytes_in += size
+            bytes_out += length
+        f.flush()
+        os.fsync(f.fileno())
+
+    with transaction.atomic():
+        PackedRecording.objects.bulk_create(entries, ignore_conflicts=True)
+    for path in raw_paths:
+        os.remove(path)
+    return len(entries), bytes_in, bytes_out
+
+
+def verify_entry(packed):
+    """True if the archived bytes still hash to the recorded checksum"""
+    digest = hashlib.sha256()
+    with open_packed(packed) as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest() == packed.checksum
+
+
+def restore_recording(name, storage):
+    """Write an archived recording back to a raw file and drop its index entry"""
+    packed = PackedRecording.objects.get(name=name)
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open_packed(packed) as source, open(path, 'wb') as target:
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
+    # The pack bytes stay behind; packs are append-only
+    packed.delete()
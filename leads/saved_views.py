@@ -0,0 +1,262 @@
+"""
+Saved lead list views and their cached result sets.
+
+A saved view is a lead list query string (filters and sort, see
+``filters.filter_leads``) with a name, owned by one user and optionally
+shared with everyone. Opening one does not re-run its filters: the matching
+leads are kept on the view as a packed array of fixed-size (sort key,
+lead id) records in sort order, so a page is a slice of that array plus one
+lookup of the leads on it. A second array holds the same records as (lead id,
+sort key), ordered by lead id, so a lead's record is found by binary search
+whatever its current sort key.
+
+Each time a view is opened, the cached set is patched with just the leads
+that may have changed since it was last refreshed:
+
+- leads whose ``updated_date`` moved (every save and bulk update sets it);
+- for "no activity in N days", leads that got a new activity and leads whose
+  activity aged past the N-day cutoff.
+
+Those leads are re-checked against the filters in one query, dropped from the
+arrays and re-inserted if they still match, all in one pass over each array.
+Deleting or archiving leads marks stale only the views that contain them;
+changes that leave no trace in ``updated_date`` (restoring, merges) mark every
+view stale, and each view is rebuilt from scratch once
+SAVED_VIEW_REBUILD_AFTER has passed, which bounds drift from anything else.
+Saved views cover the hot lead table only.
+"""
+import struct
+import uuid
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+
+from .filters import filter_leads, idle_days_param
+from .models import Activity, Lead, SavedLeadView
+
+# Sort key (microseconds since the epoch, offset by 2**63 so that byte order is
+# numeric order) followed by the lead's UUID; records compare like the sort
+RECORD = struct.Struct('>Q16s')
+KEY_SIZE = 8
+ID_SIZE = 16
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# filters.LEAD_SORTS -> (field stored as the key, descending)
+SORT_KEYS = {
+    'newest': ('created_date', True),
+    'oldest': ('created_date', False),
+    'updated': ('updated_date', True),
+}
+# Above this many changed leads a rebuild is cheaper than patching the array
+MAX_INCREMENTAL = 500
+# Query string parameters that are not part of a saved view
+UNSAVED_PARAMS = ['page', 'view', 'archived']
+
+
+class Records:
+    """A packed result array as a sequence of records, for bisect"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data) // RECORD.size
+
+    def __getitem__(self, index):
+        return bytes(self.data[index * RECORD.size:(index + 1) * RECORD.size])
+
+
+def index_record(record):
+    """The by-lead-id index entry, (lead id, sort key), of a (sort key, lead id) record"""
+    return record[KEY_SIZE:] + record[:KEY_SIZE]
+
+
+def result_record(entry):
+    """The (sort key, lead id) record of a by-lead-id index entry"""
+    return entry[ID_SIZE:] + entry[:ID_SIZE]
+
+
+def saved_query(params):
+    """A lead list query string without the parameters that are not saved"""
+    params = params.copy()
+    for name in UNSAVED_PARAMS:
+        params.pop(name, None)
+    return params.urlencode()
+
+
+def view_params(view):
+    return QueryDict(view.query)
+
+
+def sort_of(params):
+    sort = params.get('sort', '')
+    return sort if sort in SORT_KEYS else 'newest'
+
+
+def pack(moment, lead_id):
+    return RECORD.pack((moment - EPOCH) // timedelta(microseconds=1) + 2**63, lead_id.bytes)
+
+
+def matching(params, lead_ids=None):
+    """(sort key, lead id) of the leads matching a view's filters, optionally only among lead_ids"""
+    field, _ = SORT_KEYS[sort_of(params)]
+    leads = Lead.objects.all() if lead_ids is None else Lead.objects.filter(pk__in=lead_ids)
+    return filter_leads(leads, params).order_by().values_list(field, 'lead_id')
+
+
+def find_record(records, record):
+    """Index of a record in a packed array (Records), or None"""
+    index = bisect_left(records, record)
+    return index if index < len(records) and records[index] == record else None
+
+
+def find_lead(index, lead_id):
+    """Position of the lead's entry in a by-lead-id index (Records), or None"""
+    position = bisect_left(index, lead_id.bytes, key=lambda entry: entry[:ID_SIZE])
+    return position if position < len(index) and index[position][:ID_SIZE] == lead_id.bytes else None
+
+
+def splice(data, drop, add):
+    """
+    A packed array with the records at the drop positions removed and the
+    sorted add records merged in, built in one pass
+    """
+    parts, start = [], 0
+    for position in sorted(drop):
+        parts.append(data[start * RECORD.size:position * RECORD.size])
+        start = position + 1
+    parts.append(data[start * RECORD.size:])
+    kept = b''.join(parts)
+    records = Records(kept)
+    parts, start = [], 0
+    for record in add:
+        position = bisect_left(records, record, lo=start)
+        parts += [kept[start * RECORD.size:position * RECORD.size], record]
+        start = position
+    parts.append(kept[start * RECORD.size:])
+    return b''.join(parts)
+
+
+def rebuild(view, params, now):
+    records = sorted(pack(moment, lead_id) for moment, lead_id in matching(params).iterator(chunk_size=5000))
+    view.lead_ids = b''.join(records)
+    view.lead_index = b''.join(sorted(map(index_record, records)))
+    view.result_count = len(records)
+    view.built_date = view.refreshed_date = now
+    view.is_stale = False
+
+
+def changed_leads(params, since, now):
+    """Ids of leads whose membership or position may have changed between since and now"""
+    changed = set(Lead.objects.filter(updated_date__gt=since).order_by().values_list('lead_id', flat=True))
+    idle_days = idle_days_param(params)
+    if idle_days:
+        window = timedelta(days=idle_days)
+        # New activity ends an idle spell; activity ageing past the cutoff may start one
+        changed.update(Activity.objects.filter(
+            Q(created_date__gt=since) | Q(created_date__gt=since - window, created_date__lte=now - window)
+        ).order_by().values_list('lead_id', flat=True))
+    return changed
+
+
+def apply_changes(view, params, lead_ids, now):
+    """Drop the given leads from the cached results and re-insert, in sort order, those that still match"""
+    records, index = Records(view.lead_ids), Records(view.lead_index)
+    dropped_records, dropped_entries = [], []
+    for lead_id in lead_ids:
+        position = find_lead(index, lead_id)
+        if position is not None:
+            dropped_entries.append(position)
+            dropped_records.append(find_record(records, result_record(index[position])))
+    dropped_records = [position for position in dropped_records if position is not None]
+    added = sorted(pack(moment, lead_id) for moment, lead_id in matching(params, lead_ids))
+    view.lead_ids = splice(view.lead_ids, dropped_records, added)
+    view.lead_index = splice(view.lead_index, dropped_entries, sorted(map(index_record, added)))
+    view.result_count = len(view.lead_ids) // RECORD.size
+    view.refreshed_date = now
+
+
+def refresh(view, now=None):
+    """Bring a view's cached results up to date, writing them back if anything changed"""
+    now = now or timezone.now()
+    params = view_params(view)
+    loaded = {'is_stale': view.is_stale, 'refreshed_date': view.refreshed_date}
+    if (view.is_stale or view.built_date is None or len(view.lead_index) != len(view.lead_ids)
+            or now - view.built_date > timedelta(seconds=settings.SAVED_VIEW_REBUILD_AFTER)):
+        rebuild(view, params, now)
+    else:
+        lead_ids = changed_leads(params, view.refreshed_date, now)
+        if not lead_ids:
+            return view
+        if len(lead_ids) > MAX_INCREMENTAL:
+            rebuild(view, params, now)
+        else:
+            apply_changes(view, params, lead_ids, now)
+    # Only if nobody refreshed or invalidated the view meanwhile; otherwise the
+    # next open picks up from their state
+    SavedLeadView.objects.filter(pk=view.pk, **loaded).update(
+        lead_ids=view.lead_ids,
+        lead_index=view.lead_index,
+        result_count=view.result_count,
+        built_date=view.built_date,
+        refreshed_date=view.refreshed_date,
+        is_stale=False,
+    )
+    return view
+
+
+def invalidate_saved_views(lead_ids=None):
+    """
+    Rebuild saved views when next opened, after changes refresh() cannot see:
+    every view, or only those whose cached results contain one of lead_ids
+    (for leads that left the hot table)
+    """
+    views = SavedLeadView.objects.filter(is_stale=False)
+    if lead_ids is not None:
+        lead_ids = list(lead_ids)
+        views = views.filter(pk__in=[
+            view.pk for view in views.only('pk', 'lead_index')
+            if any(find_lead(Records(view.lead_index), lead_id) is not None for lead_id in lead_ids)
+        ])
+    views.update(is_stale=True)
+
+
+def visible_views(user):
+    """Saved views a user can open: their own and shared ones"""
+    return SavedLeadView.objects.filter(Q(owner=user) | Q(is_shared=True)).select_related('owner')
+
+
+class SavedViewResults:
+    """A saved view's cached leads in sort order, for Paginator; one lookup per page (values() dicts with fields)"""
+
+    def __init__(self, view, fields=None):
+        self.view = view
+        self.fields = fields
+        self.descending = SORT_KEYS[sort_of(view_params(view))][1]
+
+    def count(self):
+        return self.view.result_count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(self.count())
+        if self.descending:
+            # Stored ascending; newest-first pages are read from the end
+            start, stop = self.count() - stop, self.count() - start
+        records = Records(self.view.lead_ids)
+        lead_ids = [uuid.UUID(bytes=records[i][KEY_SIZE:]) for i in range(start, stop)]
+        if self.descending:
+            lead_ids.reverse()
+        if self.fields is None:
+            leads = Lead.objects.select_related('lead_manager').in_bulk(lead_ids)
+        else:
+            leads = {row['lead_id']: row for row in Lead.objects.filter(pk__in=lead_ids).values(*self.fields)}
+        # Leads deleted since the last refresh are left out
+        return [leads[lead_id] for lead_id in lead_ids if lead_id in leads]
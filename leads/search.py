@@ -0,0 +1,290 @@
+"""
+Global full-text search over the free text staff type in.
+
+Every lead (notes, remarks and the product names in ``products_data``),
+activity (description) and task note has one ``SearchEntry`` holding its
+text. Entries are written as rows are saved: ``Lead.save()``,
+``Activity.save()`` and ``TaskNote.save()`` call in here, as do the bulk paths
+that skip ``save()`` (webhook ingestion, seed data); ``manage.py
+rebuild_search_index`` rebuilds them all. Archived rows keep their primary
+keys, so entries need no changes when leads are archived or restored.
+
+The full-text index depends on the database (see migration 0015):
+
+- SQLite: an FTS5 table, ranked with bm25 and highlighted with ``snippet()``;
+  very common words rank only the most recently indexed matches.
+- PostgreSQL: a GIN index on ``to_tsvector('english', body)``, ranked with
+  ``ts_rank`` and highlighted with ``ts_headline``.
+- Anything else: ``LIKE`` on every word, newest first.
+
+Each word of a query must match (as a prefix, so "recl" finds "recliner").
+Entries whose source rows were deleted in bulk (cascades, queryset deletes)
+are dropped when a search comes across them.
+
+Django rebuilds SQLite tables for some schema changes, which drops their
+triggers; run rebuild_search_index after a migration that alters
+leads_searchentry.
+"""
+import re
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Activity, ArchivedActivity, ArchivedLead, ArchivedTaskNote, Lead, SearchEntry, TaskNote
+
+FTS_TABLE = 'leads_searchentry_fts'
+# Highlight markers put around matches by the database, replaced by <mark> once
+# the snippet has been HTML-escaped (private use characters, removed from indexed text)
+MARK_START, MARK_END = '\ue000', '\ue001'
+MAX_TERMS = 10
+# Matches ranked per query on SQLite (see fetch_sqlite)
+RANK_WINDOW = 5000
+SNIPPET_WORDS = 24
+WORDS = re.compile(r'[^\W_]+')
+
+
+def terms(query):
+    """Words of a search query, lowercased; punctuation and operators are ignored"""
+    return WORDS.findall(query.lower())[:MAX_TERMS]
+
+
+def clean(text):
+    return (text or '').replace(MARK_START, '').replace(MARK_END, '').strip()
+
+
+def product_names(products_data):
+    """Names of the products in a lead's products_data"""
+    names = []
+    for category in (products_data or {}).values():
+        for product in category.get('products', []) if isinstance(category, dict) else []:
+            if isinstance(product, dict) and product.get('name'):
+                names.append(product['name'])
+    return names
+
+
+def lead_text(lead):
+    return '\n'.join(part for part in (clean(lead.notes), clean(lead.remarks), *map(clean, product_names(lead.products_data))) if part)
+
+
+def write_entries(kind, rows):
+    """Upsert entries for (object id, lead id, text, created date) rows; rows without text lose their entry. Returns entries written"""
+    entries, empty = [], []
+    for object_id, lead_id, text, created_date in rows:
+        text = clean(text)
+        if text:
+            entries.append(SearchEntry(kind=kind, object_id=str(object_id), lead_id=lead_id, body=text, created_date=created_date))
+        else:
+            empty.append(str(object_id))
+    with transaction.atomic():
+        if entries:
+            SearchEntry.objects.bulk_create(
+                entries,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['kind', 'object_id'],
+                update_fields=['lead_id', 'body', 'created_date'],
+            )
+        if empty:
+            SearchEntry.objects.filter(kind=kind, object_id__in=empty).delete()
+    return len(entries)
+
+
+def index_leads(leads):
+    write_entries('lead', [(lead.pk, lead.pk, lead_text(lead), lead.created_date) for lead in leads])
+
+
+def index_activities(activities):
+    write_entries('activity', [(activity.pk, activity.lead_id, activity.description, activity.created_date) for activity in activities])
+
+
+def index_notes(notes):
+    # The lead is one hop away; look up the ones not already loaded in one query
+    missing = [note.activity_id for note in notes if not TaskNote.activity.is_cached(note)]
+    lead_ids = dict(Activity.objects.filter(id__in=missing).values_list('id', 'lead_id')) if missing else {}
+    write_entries('note', [
+        (note.pk, note.activity.lead_id if TaskNote.activity.is_cached(note) else lead_ids.get(note.activity_id), note.note, note.created_date)
+        for note in notes
+        if TaskNote.activity.is_cached(note) or note.activity_id in lead_ids
+    ])
+
+
+def unindex(kind, object_ids):
+    SearchEntry.objects.filter(kind=kind, object_id__in=[str(object_id) for object_id in object_ids]).delete()
+
+
+def forget_leads(lead_ids):
+    """Drop every entry under the given leads"""
+    SearchEntry.objects.filter(lead_id__in=lead_ids).delete()
+
+
+def move_entries(lead_ids, survivor_id):
+    """Point the activity and note entries of merged leads at the surviving lead, and drop their lead entries"""
+    SearchEntry.objects.filter(lead_id__in=lead_ids).exclude(kind='lead').update(lead_id=survivor_id)
+    SearchEntry.objects.filter(lead_id__in=lead_ids, kind='lead').delete()
+
+
+def rebuild_index(batch_size=2000, progress=None):
+    """Rewrite every entry from the hot and archive tables in one transaction; returns entries written"""
+    sources = [
+        ('lead', Lead.objects.only('lead_id', 'notes', 'remarks', 'products_data', 'created_date'),
+         lambda lead: (lead.pk, lead.pk, lead_text(lead), lead.created_date)),
+        ('lead', ArchivedLead.objects.only('lead_id', 'notes', 'remarks', 'products_data', 'created_date'),
+         lambda lead: (lead.pk, lead.pk, lead_text(lead), lead.created_date)),
+        ('activity', Activity.objects.values_list('id', 'lead_id', 'description', 'created_date'), tuple),
+        ('activity', ArchivedActivity.objects.values_list('id', 'lead_id', 'description', 'created_date'), tuple),
+        ('note', TaskNote.objects.values_list('id', 'activity__lead_id', 'note', 'created_date'), tuple),
+        ('note', ArchivedTaskNote.objects.values_list('id', 'activity__lead_id', 'note', 'created_date'), tuple),
+    ]
+    written = 0
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+        for kind, queryset, row in sources:
+            batch = []
+            for source in queryset.order_by().iterator(chunk_size=batch_size):
+                batch.append(row(source))
+                if len(batch) >= batch_size:
+                    written += write_entries(kind, batch)
+                    batch = []
+                    if progress:
+                        progress(written)
+            written += write_entries(kind, batch)
+        if has_fts5():
+            with connection.cursor() as cursor:
+                # Merge the index b-trees built up by the inserts
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return written
+
+
+def has_fts5():
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def highlight(snippet):
+    """HTML for a snippet with database highlight markers"""
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def fetch_sqlite(words, limit, offset):
+    match = ' '.join(f'"{word}"*' for word in words)
+    with connection.cursor() as cursor:
+        # bm25 has to score every match before it can sort, which is slow for common
+        # words; rank only the RANK_WINDOW most recently indexed matches (a rowid
+        # range, which FTS5 scans cheaply from the end of the index)
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT 1 OFFSET %s',
+            [match, RANK_WINDOW - 1],
+        )
+        row = cursor.fetchone()
+        cursor.execute(
+            f"""
+            SELECT rowid, snippet({FTS_TABLE}, 0, %s, %s, '…', %s)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s AND rowid >= %s
+            ORDER BY rank
+            LIMIT %s OFFSET %s
+            """,
+            [MARK_START, MARK_END, SNIPPET_WORDS, match, row[0] if row else 0, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def fetch_postgresql(words, limit, offset):
+    options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 3}, MaxFragments=2'
+    # Rank and page first, so only the rows shown get a (comparatively slow) headline
+    sql = """
+        SELECT top.id, ts_headline('english', top.body, top.query, %s)
+        FROM (
+            SELECT entry.id, entry.body, query, ts_rank(to_tsvector('english', entry.body), query) AS rank
+            FROM leads_searchentry entry, to_tsquery('english', %s) query
+            WHERE to_tsvector('english', entry.body) @@ query
+            ORDER BY rank DESC
+            LIMIT %s OFFSET %s
+        ) top
+        ORDER BY top.rank DESC
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [options, ' & '.join(f'{word}:*' for word in words), limit, offset])
+        return cursor.fetchall()
+
+
+def fetch_like(words, limit, offset):
+    entries = SearchEntry.objects.order_by('-created_date')
+    for word in words:
+        entries = entries.filter(body__icontains=word)
+    return [(entry.id, like_snippet(entry.body, words)) for entry in entries.only('id', 'body')[offset:offset + limit]]
+
+
+def like_snippet(body, words):
+    """A window of the body around the first match, with every match marked"""
+    lowered = body.lower()
+    first = min((index for index in (lowered.find(word) for word in words) if index != -1), default=0)
+    start = max(0, first - 60)
+    window = body[start:start + 200]
+    pattern = re.compile('|'.join(re.escape(word) for word in words), re.I)
+    window = pattern.sub(lambda match: f'{MARK_START}{match.group(0)}{MARK_END}', window)
+    return ('…' if start else '') + window + ('…' if start + 200 < len(body) else '')
+
+
+def fetch(words, limit, offset):
+    """[(entry id, snippet with highlight markers)], best match first"""
+    if has_fts5():
+        return fetch_sqlite(words, limit, offset)
+    if connection.vendor == 'postgresql':
+        return fetch_postgresql(words, limit, offset)
+    return fetch_like(words, limit, offset)
+
+
+def existing(model, ids):
+    return set(model.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+
+
+def search(query, limit=20, offset=0):
+    """
+    Best matches for a query, as dicts with kind, object_id, lead_id,
+    lead_name, archived, created_date and snippet (HTML); one more than
+    limit is fetched so callers can tell whether there is a next page
+    """
+    words = terms(query)
+    if not words:
+        return []
+    rows = fetch(words, limit + 1, offset)
+    entries = SearchEntry.objects.in_bulk([entry_id for entry_id, _ in rows])
+
+    # Names for the leads on this page, from whichever table each is in
+    lead_ids = {entry.lead_id for entry in entries.values()}
+    names = dict(Lead.objects.filter(pk__in=lead_ids).values_list('pk', 'name'))
+    archived = dict(ArchivedLead.objects.filter(pk__in=lead_ids - names.keys()).values_list('pk', 'name'))
+    # Activities and notes on this page that still exist
+    wanted = defaultdict(set)
+    for entry in entries.values():
+        if entry.kind != 'lead':
+            wanted[entry.kind].add(int(entry.object_id))
+    alive = {
+        'activity': existing(Activity, wanted['activity']) | existing(ArchivedActivity, wanted['activity']),
+        'note': existing(TaskNote, wanted['note']) | existing(ArchivedTaskNote, wanted['note']),
+    }
+
+    results, stale = [], []
+    for entry_id, snippet in rows:
+        entry = entries.get(entry_id)
+        if entry is None:
+            continue
+        if (entry.lead_id not in names and entry.lead_id not in archived) or (entry.kind != 'lead' and int(entry.object_id) not in alive[entry.kind]):
+            stale.append(entry_id)
+            continue
+        results.append({
+            'kind': entry.kind,
+            'kind_display': entry.get_kind_display(),
+            'object_id': entry.object_id,
+            'lead_id': entry.lead_id,
+            'lead_name': names.get(entry.lead_id, archived.get(entry.lead_id)),
+            'archived': entry.lead_id not in names,
+            'created_date': entry.created_date,
+            'snippet': highlight(snippet),
+        })
+    if stale:
+        # Left behind by deletes that skip save()/delete(); a page may come up a little short once
+        SearchEntry.objects.filter(id__in=stale).delete()
+    return results
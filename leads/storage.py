@@ -0,0 +1,53 @@
+"""
+File storage for call recordings.
+
+Behaves like the default FileSystemStorage for recordings that are still raw
+files. Recordings that were moved into an archive pack (see
+leads/recording_archive.py) are read back out of the pack, so
+``Activity.recording`` keeps working after archival.
+"""
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+
+
+class RecordingStorage(FileSystemStorage):
+    """FileSystemStorage that falls back to the recording archive packs"""
+
+    def packed(self, name):
+        from .models import PackedRecording
+        return PackedRecording.objects.filter(name=name).first()
+
+    def raw_exists(self, name):
+        """Whether the recording is still a raw file under MEDIA_ROOT"""
+        return super().exists(name)
+
+    def _open(self, name, mode='rb'):
+        if not self.raw_exists(name):
+            packed = self.packed(name)
+            if packed is not None:
+                from .recording_archive import open_packed
+                return File(open_packed(packed), name=name)
+        return super()._open(name, mode)
+
+    def exists(self, name):
+        # Archived names stay taken so new uploads never collide with them
+        return self.raw_exists(name) or self.packed(name) is not None
+
+    def size(self, name):
+        if not self.raw_exists(name):
+            packed = self.packed(name)
+            if packed is not None:
+                return packed.size
+        return super().size(name)
+
+    def url(self, name):
+        if name and not self.raw_exists(name):
+            # Archived recordings are not under MEDIA_URL; serve them through the app
+            return reverse('leads:recording_file', kwargs={'name': name})
+        return super().url(name)
+
+
+def get_recording_storage():
+    """Storage callable for Activity.recording"""
+    return RecordingStorage()
@@ -0,0 +1,32 @@
+"""Background tasks for the leads app, run by `manage.py run_workers`"""
+from jobs.queue import register
+
+from .audio import recording_fields
+from .catalog import rebuild_history
+from .ingest import drain_ingest_queue
+from .models import Activity
+
+
+@register
+def drain_lead_ingest(batch_size=500):
+    """Import everything the ingestion webhook has staged so far"""
+    while any(drain_ingest_queue(batch_size)):
+        pass
+
+
+@register
+def extract_recording_metadata(activity_id):
+    """Read a call recording's duration, bitrate, size, codec and checksum"""
+    activity = Activity.objects.filter(pk=activity_id).only('id', 'recording').first()
+    if activity is None or not activity.recording:
+        return
+    # update() rather than save(): no updated_date bump and no re-enqueue
+    Activity.objects.filter(pk=activity_id, recording=activity.recording.name).update(
+        **recording_fields(activity.recording)
+    )
+
+
+@register
+def rebuild_product_history():
+    """Recollect the product names used on leads for autocomplete"""
+    rebuild_history()
@@ -0,0 +1,84 @@
+import json
+import posixpath
+from functools import lru_cache
+from pathlib import Path
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from theopendecor.bundles import BUNDLES, CSS_URL, MANIFEST_NAME
+
+register = template.Library()
+
+# Name of the cookie recording which CSS bundle the browser has cached
+CACHED_COOKIE = 'css_bundle'
+
+
+@lru_cache(maxsize=None)
+def load_manifest():
+    """bundles.json as written by build_bundles, or None if nothing was built"""
+    path = finders.find(MANIFEST_NAME)
+    return json.loads(Path(path).read_text(encoding='utf-8')) if path else None
+
+
+@lru_cache(maxsize=None)
+def inline_css(name):
+    """A built CSS file with its relative url()s made absolute, for a <style> element; None if unsafe to inline"""
+    path = finders.find(name)
+    if path is None:
+        return None
+    css = Path(path).read_text(encoding='utf-8')
+    if '</' in css:
+        return None
+
+    def absolute(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        return f'url({quote}{static(posixpath.normpath(posixpath.join(posixpath.dirname(name), url)))}{quote})'
+    return CSS_URL.sub(absolute, css)
+
+
+def bundle_manifest():
+    return load_manifest() if settings.ASSET_BUNDLES else None
+
+
+@register.simple_tag(takes_context=True)
+def bundle_css(context, name):
+    """
+    <link>s for a CSS bundle. Until the browser has the bundle cached (a
+    cookie set when it loads), the critical CSS is inlined and the bundle
+    loaded without blocking rendering; after that a plain <link> is cheaper.
+    """
+    manifest = bundle_manifest()
+    bundle = manifest and manifest['bundles'].get(f'{name}.css')
+    if not bundle:
+        return format_html_join('\n    ', '<link rel="stylesheet" href="{}" />', ((static(path),) for path in BUNDLES[f'{name}.css']))
+
+    href = static(bundle)
+    version = posixpath.basename(bundle)
+    critical = manifest['critical'].get(name)
+    critical_css = inline_css(critical) if critical else None
+    request = context.get('request')
+    if critical_css is None or (request is not None and request.COOKIES.get(CACHED_COOKIE) == version):
+        return format_html('<link rel="stylesheet" href="{}" />', href)
+    return format_html(
+        '<style>{}</style>\n'
+        '    <link rel="preload" href="{}" as="style" '
+        'onload="this.onload=null;this.rel=\'stylesheet\';document.cookie=\'{}={};path=/;max-age=31536000;samesite=lax\'" />\n'
+        '    <noscript><link rel="stylesheet" href="{}" /></noscript>',
+        mark_safe(critical_css), href, CACHED_COOKIE, version, href,
+    )
+
+
+@register.simple_tag
+def bundle_js(name):
+    """<script> for a JS bundle, or for each of its source files when bundles are off"""
+    manifest = bundle_manifest()
+    bundle = manifest and manifest['bundles'].get(f'{name}.js')
+    paths = [bundle] if bundle else BUNDLES[f'{name}.js']
+    return format_html_join('\n    ', '<script src="{}"></script>', ((static(path),) for path in paths))
@@ -0,0 +1,18 @@
+from django import template
+from django.conf import settings
+from django.template import engines
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def render_partial(context, name):
+    """
+    Render a partial with the current context, using the engine named by
+    LIST_TEMPLATE_ENGINE: the Django engine renders it like {% include %},
+    the Jinja2 engine renders the same file (see theopendecor/jinja_env.py)
+    """
+    if settings.LIST_TEMPLATE_ENGINE == 'jinja2':
+        return mark_safe(engines['jinja2'].get_template(name).render(context.flatten(), context.get('request')))
+    return context.template.engine.get_template(name).render(context)
@@ -0,0 +1,134 @@
+"""
+Pincode territories: which city or region a lead's pincode belongs to.
+
+Indian pincodes are hierarchical (the first two digits pick the postal
+circle, roughly a state, and the first three the sorting district), so a
+short table of prefixes covers the country. The table is a CSV file,
+PINCODE_TERRITORIES_FILE, with ``prefix,city,region`` rows. A pincode takes the
+row with the longest matching prefix: "2013" (Noida) wins over "201"
+(Ghaziabad), which wins over "20" (the rest of Uttar Pradesh). Rows without a
+city cover the rest of a region.
+
+Each lead stores the resulting territory code (the slug of the city, or of the
+region for the rest of it) in the indexed ``territory`` column. It is set on
+save, and ``manage.py backfill_territories`` recomputes it for existing
+leads after the table changes. Filtering by a city is then an indexed
+equality lookup, and filtering by a region is an ``IN`` over its few codes,
+instead of a text scan of ``pincode``.
+"""
+import csv
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.text import slugify
+
+PINCODE_LENGTH = 6
+
+
+@lru_cache(maxsize=None)
+def load_table(path):
+    """
+    {'prefixes': {prefix: code}, 'lengths': prefix lengths, longest first,
+    'territories': {code: (name, region code)}, 'regions': {region code: (name, [code])}}
+    """
+    prefixes, territories, regions = {}, {}, {}
+    with Path(path).open(newline='', encoding='utf-8') as file:
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            prefix, city, region = (row.get(column, '').strip() for column in ('prefix', 'city', 'region'))
+            if not prefix.isdigit() or len(prefix) > PINCODE_LENGTH or not region:
+                raise ImproperlyConfigured(f'{path}, line {line}: expected a pincode prefix and a region')
+            if prefix in prefixes:
+                raise ImproperlyConfigured(f'{path}, line {line}: prefix {prefix} is listed twice')
+            region_code = slugify(region)
+            code = slugify(city or region)
+            if territories.setdefault(code, (city or region, region_code)) != (city or region, region_code):
+                raise ImproperlyConfigured(f'{path}, line {line}: {city or region} clashes with another territory')
+            prefixes[prefix] = code
+            codes = regions.setdefault(region_code, (region, []))[1]
+            if code not in codes:
+                codes.append(code)
+    return {
+        'prefixes': prefixes,
+        'lengths': sorted({len(prefix) for prefix in prefixes}, reverse=True),
+        'territories': territories,
+        'regions': regions,
+    }
+
+
+def table():
+    return load_table(str(settings.PINCODE_TERRITORIES_FILE))
+
+
+def territory_for(pincode):
+    """Territory code of a pincode (spaces and punctuation ignored), or '' if it is not a full pincode or not covered"""
+    digits = ''.join(filter(str.isdigit, pincode or ''))
+    if len(digits) != PINCODE_LENGTH:
+        return ''
+    territories = table()
+    for length in territories['lengths']:
+        code = territories['prefixes'].get(digits[:length])
+        if code:
+            return code
+    return ''
+
+
+def territory_codes(key):
+    """Territory codes a filter value stands for: every one in a region, or just the one territory"""
+    territories = table()
+    if key in territories['regions']:
+        return territories['regions'][key][1]
+    if key in territories['territories']:
+        return [key]
+    return []
+
+
+def territory_label(code):
+    """'Bengaluru, Karnataka' for a city, 'Karnataka' for the rest of a region"""
+    territories = table()
+    if code not in territories['territories']:
+        return code or ''
+    name, region_code = territories['territories'][code]
+    region = territories['regions'][region_code][0]
+    return name if name == region else f'{name}, {region}'
+
+
+def territory_options():
+    """[(region code, region name, [(code, city name)])] by region name, for a grouped <select>"""
+    territories = table()
+    options = []
+    for region_code, (region, codes) in territories['regions'].items():
+        cities = [(code, territories['territories'][code][0]) for code in codes if code != region_code]
+        options.append((region_code, region, sorted(cities, key=lambda city: city[1])))
+    return sorted(options, key=lambda option: option[1])
+
+
+def backfill_territories(model, batch_size=5000, progress=None):
+    """
+    Recompute the territory of every row of a lead model; returns (rows seen, rows changed).
+
+    Rows are read in primary-key batches, and the changed ones are written with
+    one UPDATE per territory code in the batch. update() leaves updated_date
+    alone, so callers refresh what depends on it (saved views).
+    """
+    seen = changed = 0
+    rows = model.objects.order_by('pk').values_list('pk', 'pincode', 'territory')
+    last_pk = None
+    while True:
+        batch = list((rows.filter(pk__gt=last_pk) if last_pk is not None else rows)[:batch_size])
+        if not batch:
+            break
+        moves = defaultdict(list)
+        for pk, pincode, territory in batch:
+            code = territory_for(pincode) or None
+            if code != territory:
+                moves[code].append(pk)
+        for code, pks in moves.items():
+            changed += model.objects.filter(pk__in=pks).update(territory=code)
+        seen += len(batch)
+        last_pk = batch[-1][0]
+        if progress:
+            progress(seen, changed)
+    return seen, changed
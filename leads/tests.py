@@ -1,3 +1,1092 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import sys
+import threading
+import wave
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.paginator import Paginator
+from django.db import IntegrityError
+from django.http import HttpResponse, QueryDict
+from django.template import engines
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.queue import claim_jobs, run_job
+from theopendecor.warmup import STEPS as WARMUP_STEPS, warm_up
+
+from . import catalog
+from .archive import archive_leads, restore_leads
+from .assignment import assign_leads, recount_open_leads
+from .audio import format_duration, probe
+from .catalog import suggest
+from .counters import get_task_counts
+from .dedup import find_clusters, merge_leads, usable_keys
+from .filters import filter_call_recordings, filter_leads, filter_tasks
+from .ingest import drain_ingest_queue
+from .management.commands import bench_rows, bench_templates
+from .models import (
+    IST, Activity, ArchivedLead, Category, DuplicateLead, Lead, LeadProduct, LeadIngestItem, ManagerCapacity, PackedRecording,
+    Product, SavedLeadView, SearchEntry, TaskNote, ist_day_start, normalize_phone,
+)
+from .profiling import ProfilingMiddleware, StackSampler
+from .projections import CALL_ROW_FIELDS, LEAD_ROW_FIELDS, call_rows, lead_rows, task_rows
+from .saved_views import SavedViewResults, refresh
+from .search import has_fts5, search
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+def temporary_media(test):
+    """An empty MEDIA_ROOT for the length of a test"""
+    root = Path(tempfile.mkdtemp())
+    test.addCleanup(shutil.rmtree, root)
+    media = override_settings(MEDIA_ROOT=root)
+    media.enable()
+    test.addCleanup(media.disable)
+    return root
+
+
+def wav_bytes(seconds, rate=8000):
+    """A silent 16-bit mono WAV file"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(b'\0\0' * int(seconds * rate))
+    return buffer.getvalue()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', 'staff@example.com', 'password')
+        cls.leads = [Lead.objects.create(name=f'Lead {i}', number=f'98765432{i:02d}') for i in range(3)]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_malformed_cursors_are_rejected(self):
+        lead = self.leads[0]
+        cursors = [
+            'not base64 json',
+            raw_cursor([lead.created_date.isoformat(), 'not-a-uuid']),
+            raw_cursor([12345, str(lead.pk)]),
+            raw_cursor({'created_date': 1, 'pk': 2}),
+            raw_cursor([lead.created_date.replace(tzinfo=None).isoformat(), str(lead.pk)]),
+        ]
+        for cursor in cursors:
+            for url in ('/leads/api/v1/leads/', '/leads/api/v1/tasks/'):
+                with self.subTest(cursor=cursor, url=url):
+                    self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 400)
+
+    def test_cursor_pages_through_every_lead(self):
+        first = self.client.get('/leads/api/v1/leads/', {'limit': 2}).json()
+        rest = self.client.get('/leads/api/v1/leads/', {'limit': 2, 'cursor': first['next_cursor']}).json()
+        seen = [row['lead_id'] for row in first['results'] + rest['results']]
+        self.assertCountEqual(seen, [str(lead.pk) for lead in self.leads])
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_list_is_not_revalidated_by_date_alone(self):
+        response = self.client.get('/leads/api/v1/leads/')
+        self.assertNotIn('Last-Modified', response.headers)
+        self.leads[-1].delete()
+        # A client holding only a date must not be told the shrunken list is unchanged
+        again = self.client.get('/leads/api/v1/leads/', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['count'], 2)
+        self.assertEqual(self.client.get('/leads/api/v1/leads/', headers={'If-None-Match': response['ETag']}).status_code, 200)
+
+    def test_detail_still_sends_last_modified(self):
+        response = self.client.get(f'/leads/api/v1/leads/{self.leads[0].pk}/')
+        self.assertIn('Last-Modified', response.headers)
+        again = self.client.get(f'/leads/api/v1/leads/{self.leads[0].pk}/', headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(again.status_code, 304)
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', 'staff@example.com', 'password')
+        cls.lead = Lead.objects.create(name='Asha', number='9876500001', lead_manager=cls.user)
+        cls.task = Activity.objects.create(
+            lead=cls.lead, created_by=cls.user, activity_type='task', description='Send quote', due_date=timezone.now() + timedelta(days=1),
+        )
+        TaskNote.objects.create(activity=cls.task, created_by=cls.user, note='Sent by email')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def both(self, method, path, data=None):
+        """(sync response, async response) for the view at path and its /async/ twin"""
+        sync = getattr(self.client, method)(f'/leads/{path}', data)
+        asynchronous = async_to_sync(getattr(self.async_client, method))(f'/leads/async/{path}', data)
+        return sync, asynchronous
+
+    def test_read_endpoints_return_the_sync_payloads(self):
+        paths = [
+            'api/v1/leads/', f'api/v1/leads/{self.lead.pk}/', f'api/v1/leads/{self.lead.pk}/activities/',
+            'api/v1/tasks/', f'api/v1/tasks/{self.task.pk}/notes/', 'api/v1/leads/?fields=name,bogus',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                sync, asynchronous = self.both('get', path)
+                self.assertEqual(asynchronous.status_code, sync.status_code)
+                self.assertEqual(asynchronous.json(), sync.json())
+
+    def test_form_endpoints_make_the_same_changes(self):
+        form = {'activity_type': 'task', 'description': 'Measure the window', 'due_date': '2030-01-02T10:30', 'priority': 'high'}
+        sync, asynchronous = self.both('post', f'add-activity/{self.lead.pk}/', form)
+        self.assertEqual(asynchronous.json(), sync.json())
+        added = Activity.objects.filter(description='Measure the window').values_list('due_date', 'priority', 'created_by')
+        self.assertEqual(len(set(added)), 1)
+        self.assertEqual(len(added), 2)
+
+        for path, data in (
+            (f'add-activity/{self.lead.pk}/', {'activity_type': 'task', 'description': 'x', 'due_date': 'soon'}),
+            (f'postpone-task/{self.task.pk}/', {'new_due_date': 'soon'}),
+            (f'add-task-note/{self.task.pk}/', {}),
+        ):
+            with self.subTest(path=path):
+                sync, asynchronous = self.both('post', path, data)
+                self.assertFalse(sync.json()['success'])
+                self.assertEqual(asynchronous.json(), sync.json())
+
+    def test_runasgi_without_uvicorn_is_a_command_error(self):
+        with mock.patch.dict(sys.modules, {'uvicorn': None}):
+            with self.assertRaisesMessage(CommandError, 'uvicorn is not installed'):
+                call_command('runasgi')
+
+
+@override_settings(LEAD_INGEST_TOKENS={'secret': 'facebook'})
+class IngestTests(TestCase):
+    def post(self, data, **headers):
+        return self.client.post(
+            '/leads/ingest/', json.dumps(data), content_type='application/json', headers={'Authorization': 'Bearer secret', **headers},
+        )
+
+    def test_webhook_stages_leads_and_the_drain_drops_repeat_numbers(self):
+        Lead.objects.create(name='Asha', number='9876500001')
+        leads = [
+            {'name': 'Asha S', 'phone': '+91 98765 00001'},
+            {'name': 'Ravi', 'phone': '9876500002', 'idempotency_key': 'r1'},
+            {'name': 'Ravi again', 'phone': '98765-00002'},
+            {'email': 'no-name@example.com'},
+            {'pincode': '110001'},
+        ]
+        response = self.post({'leads': leads})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'accepted': 4, 'duplicates': 0, 'rejected': [{'index': 4, 'error': 'A name, number or email is required.'}]})
+        # A replayed delivery is recognised by its idempotency key
+        self.assertEqual(self.post(leads[1]).json()['duplicates'], 1)
+
+        self.assertEqual(drain_ingest_queue(), (2, 2, 0))
+        self.assertEqual(Lead.objects.filter(phone_normalized=normalize_phone('9876500001')).count(), 1)
+        self.assertEqual(Lead.objects.filter(phone_normalized=normalize_phone('9876500002')).get().name, 'Ravi')
+        self.assertEqual(Lead.objects.count(), 3)
+
+    def test_token_and_content_length_are_checked(self):
+        self.assertEqual(self.post({'name': 'Asha'}, Authorization='Bearer wrong').status_code, 401)
+        self.assertEqual(self.post({'name': 'Asha'}, **{'Content-Length': 'lots'}).status_code, 400)
+
+    def test_failed_batch_goes_back_to_pending(self):
+        self.post([{'name': 'Asha', 'phone': '9876500001'}, {'name': 'Ravi', 'phone': '9876500002'}])
+        with mock.patch.object(Lead.objects, 'bulk_create', side_effect=IntegrityError('locked')):
+            with self.assertRaises(IntegrityError):
+                drain_ingest_queue()
+        self.assertEqual(list(LeadIngestItem.objects.values_list('status', 'batch_id')), [('pending', None)] * 2)
+        self.assertFalse(Lead.objects.exists())
+        self.assertEqual(drain_ingest_queue(), (2, 0, 0))
+
+
+class TaskScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('caller')
+        lead = Lead.objects.create(name='Asha', number='9876500001', lead_manager=cls.user)
+        past = timezone.now() - timedelta(days=1)
+        cls.late, cls.done = (
+            Activity.objects.create(lead=lead, created_by=cls.user, activity_type='task', due_date=past, is_completed=completed)
+            for completed in (False, True)
+        )
+
+    def test_open_task_conditions_compare_is_completed_to_a_parameter(self):
+        for queryset in (Activity.objects.open(), Activity.objects.with_schedule()):
+            with self.subTest(sql=str(queryset.query)):
+                self.assertNotIn('NOT', str(queryset.query))
+        overdue = dict(Activity.objects.with_schedule().values_list('id', 'overdue'))
+        self.assertEqual(overdue, {self.late.pk: True, self.done.pk: False})
+
+
+class TaskCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.caller = (User.objects.create_user(name) for name in ('manager', 'caller'))
+        lead = Lead.objects.create(name='Asha', number='9876500001', lead_manager=cls.manager)
+        cls.task = Activity.objects.create(
+            lead=lead, created_by=cls.caller, activity_type='task', due_date=timezone.now() - timedelta(hours=1),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.caller)
+
+    def badges(self, user):
+        counts = get_task_counts(user)
+        return {name: counts[name] for name in ('open', 'overdue', 'today')}
+
+    def test_counts_are_computed_once_then_served_from_the_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.badges(self.caller)['overdue'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.badges(self.caller)['open'], 1)
+
+    def test_task_changes_update_both_owners_cached_counts(self):
+        for user in (self.manager, self.caller):
+            self.badges(user)
+        self.client.post(f'/leads/mark-task-complete/{self.task.pk}/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.badges(self.manager), {'open': 0, 'overdue': 0, 'today': 0})
+        self.client.post(f'/leads/mark-task-complete/{self.task.pk}/')
+
+        due = (timezone.now() + timedelta(days=2)).astimezone(IST).strftime('%Y-%m-%dT%H:%M')
+        self.client.post(f'/leads/postpone-task/{self.task.pk}/', {'new_due_date': due})
+        for user in (self.manager, self.caller):
+            with self.subTest(user=user.username):
+                cached = self.badges(user)
+                cache.clear()
+                self.assertEqual(cached, self.badges(user))
+                self.assertEqual(cached['overdue'], 0)
+
+    @override_settings(TASK_COUNTS_TTL=3600)
+    def test_entries_expire_when_the_next_task_turns_overdue(self):
+        due = timezone.now() + timedelta(minutes=5)
+        Activity.objects.filter(pk=self.task.pk).update(due_date=due)
+        expected = min(due + timedelta(microseconds=1), ist_day_start(timezone.now(), 1))
+        self.assertEqual(get_task_counts(self.caller)['expires'], expected)
+
+
+class TaskDigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 10 AM IST, so "later today" stays today
+        cls.now = ist_day_start(timezone.now()) + timedelta(hours=10)
+        cls.manager = User.objects.create_user('manager', 'manager@example.com', first_name='Meera')
+        cls.caller = User.objects.create_user('caller', 'caller@example.com')
+        cls.no_email = User.objects.create_user('no_email')
+        lead = Lead.objects.create(name='Asha', number='9876500001', lead_manager=cls.manager)
+        other = Lead.objects.create(name='Ravi', number='9876500002', lead_manager=cls.no_email)
+
+        def task(description, due, **fields):
+            return Activity.objects.create(
+                lead=fields.pop('lead', lead), created_by=cls.caller, activity_type='task', description=description, due_date=due, **fields,
+            )
+
+        overdue = task('Send the quote', cls.now - timedelta(days=1), priority='high')
+        TaskNote.objects.create(activity=overdue, created_by=cls.caller, note='Customer travelling', created_date=cls.now - timedelta(hours=5))
+        TaskNote.objects.create(activity=overdue, created_by=cls.caller, note='Call after 6 PM', created_date=cls.now - timedelta(hours=2))
+        task('Confirm the measurements', cls.now + timedelta(hours=3))
+        task('Visit the showroom', ist_day_start(cls.now, 2) + timedelta(hours=11), lead=other)
+        task('Past the window', ist_day_start(cls.now, 5))
+        task('Already done', cls.now - timedelta(days=2), is_completed=True)
+
+    def send(self, *args):
+        with mock.patch('leads.management.commands.send_task_digests.timezone.now', return_value=self.now):
+            call_command('send_task_digests', *args, stdout=io.StringIO())
+
+    def test_each_owner_gets_their_tasks_by_section(self):
+        self.send('--upcoming-days=3')
+        digests = {message.to[0]: message for message in mail.outbox}
+        # no_email manages Ravi's lead but has no address
+        self.assertEqual(sorted(digests), ['caller@example.com', 'manager@example.com'])
+        self.assertEqual(digests['caller@example.com'].subject, 'Tasks: 1 overdue, 1 due today, 1 upcoming')
+        self.assertEqual(digests['manager@example.com'].subject, 'Tasks: 1 overdue, 1 due today, 0 upcoming')
+
+        body = digests['manager@example.com'].body
+        self.assertIn('Hi Meera,', body)
+        self.assertLess(body.index('OVERDUE (1)'), body.index('Send the quote'))
+        self.assertLess(body.index('Send the quote'), body.index('DUE TODAY (1)'))
+        self.assertIn('[high]', body)
+        self.assertIn('Latest note: Call after 6 PM', body)
+        self.assertNotIn('Customer travelling', body)
+        self.assertIn('https://wa.me/+919876500001', body)
+        self.assertNotIn('Past the window', body)
+        self.assertNotIn('Already done', body)
+        html, mimetype = digests['manager@example.com'].alternatives[0]
+        self.assertEqual(mimetype, 'text/html')
+        self.assertIn('Confirm the measurements', html)
+
+    def test_both_template_engines_render_the_same_digest(self):
+        bodies = []
+        for engine in ('django', 'jinja2'):
+            mail.outbox.clear()
+            with self.subTest(engine=engine), override_settings(LIST_TEMPLATE_ENGINE=engine):
+                self.send('--user=caller')
+                [message] = mail.outbox
+                bodies.append((message.body, message.alternatives[0][0]))
+        self.assertEqual(bodies[0], bodies[1])
+
+    def test_dry_run_sends_nothing(self):
+        self.send('--dry-run')
+        self.assertEqual(mail.outbox, [])
+        with self.assertRaises(CommandError):
+            self.send('--user=nobody')
+
+class AssignmentTests(TestCase):
+    def setUp(self):
+        self.managers = [User.objects.create_user(name) for name in ('anil', 'bina', 'chitra')]
+        for manager in self.managers:
+            ManagerCapacity.objects.create(user=manager)
+
+    def assign(self, number, strategy='round_robin'):
+        leads = [Lead(name=f'Lead {i}') for i in range(number)]
+        assign_leads(leads, strategy)
+        for lead in leads:
+            lead.save()
+        return [lead.lead_manager for lead in leads]
+
+    def test_round_robin_rotation_continues_across_batches(self):
+        anil, bina, chitra = self.managers
+        self.assertEqual(self.assign(4), [anil, bina, chitra, anil])
+        # anil had the last lead of the batch, so bina is next, then chitra
+        self.assertEqual(self.assign(2), [bina, chitra])
+
+    def open_leads(self):
+        return dict(ManagerCapacity.objects.values_list('user__username', 'open_leads'))
+
+    def test_open_lead_counters_follow_assign_close_and_reassign(self):
+        anil, bina, chitra = self.managers
+        self.assign(3)
+        self.assertEqual(self.open_leads(), {'anil': 1, 'bina': 1, 'chitra': 1})
+
+        closed = Lead.objects.get(lead_manager=anil)
+        closed.lead_stage = 'delivered'
+        closed.save()
+        moved = Lead.objects.get(lead_manager=bina)
+        moved.lead_manager = chitra
+        moved.save()
+        self.assertEqual(self.open_leads(), {'anil': 0, 'bina': 0, 'chitra': 2})
+
+        closed.lead_stage = 'warm_follow_up'
+        closed.lead_manager = bina
+        closed.save()
+        moved.delete()
+        self.assertEqual(self.open_leads(), {'anil': 0, 'bina': 1, 'chitra': 1})
+        # Nothing drifted from the leads table
+        self.assertEqual(recount_open_leads(), 0)
+
+
+class BulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.anil, cls.bina = (User.objects.create_user(name) for name in ('anil', 'bina'))
+        for manager in (cls.anil, cls.bina):
+            ManagerCapacity.objects.create(user=manager)
+        cls.leads = [
+            Lead.objects.create(name=f'Lead {i}', number=f'98765000{i:02d}', lead_manager=cls.anil, pincode=pincode)
+            for i, pincode in enumerate(('560001', '560002', '110001'))
+        ]
+        cls.tasks = [
+            Activity.objects.create(lead=lead, created_by=cls.bina, activity_type='task', due_date=timezone.now())
+            for lead in cls.leads
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.anil)
+
+    def post(self, path, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(path, data)
+
+    def test_select_all_updates_only_leads_matching_the_filters(self):
+        before = timezone.now()
+        self.post('/leads/bulk/leads/', {'select_all': '1', 'filter_query': 'pincode=560', 'action': 'stage', 'lead_stage': 'delivered'})
+        stages = dict(Lead.objects.values_list('pincode', 'lead_stage'))
+        self.assertEqual(stages, {'560001': 'delivered', '560002': 'delivered', '110001': 'cold_follow_up'})
+        self.assertEqual(Lead.objects.filter(updated_date__gte=before).count(), 2)
+        self.assertEqual(ManagerCapacity.objects.get(user=self.anil).open_leads, 1)
+        self.assertEqual(recount_open_leads(), 0)
+
+    def test_reassigning_moves_counters_and_drops_cached_task_counts(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        get_task_counts(self.anil)
+        selected = [str(lead.pk) for lead in self.leads[:2]]
+        self.post('/leads/bulk/leads/', {'selected': selected, 'action': 'manager', 'lead_manager': str(self.bina.pk)})
+        self.assertEqual(dict(ManagerCapacity.objects.values_list('user__username', 'open_leads')), {'anil': 1, 'bina': 2})
+        self.assertEqual(recount_open_leads(), 0)
+        self.assertEqual(get_task_counts(self.anil)['open'], 1)
+
+    def test_adding_categories_skips_existing_links(self):
+        sofa, bed = Category.objects.create(name='Sofa'), Category.objects.create(name='Bed')
+        self.leads[0].categories.add(sofa)
+        self.post('/leads/bulk/leads/', {'select_all': '1', 'action': 'categories', 'categories': [sofa.pk, bed.pk]})
+        self.assertEqual(Lead.categories.through.objects.count(), 6)
+
+    def test_tasks_are_completed_and_postponed_together(self):
+        first, second, third = self.tasks
+        self.post('/leads/bulk/tasks/', {'selected': [first.pk, second.pk], 'action': 'complete'})
+        self.assertEqual(list(Activity.objects.filter(is_completed=True).order_by('pk')), [first, second])
+
+        self.post('/leads/bulk/tasks/', {'selected': [third.pk], 'action': 'postpone', 'new_due_date': '2030-01-02T10:30'})
+        third.refresh_from_db()
+        self.assertEqual(third.get_ist_due_date().strftime('%Y-%m-%d %H:%M'), '2030-01-02 10:30')
+        response = self.post('/leads/bulk/tasks/', {'selected': [third.pk], 'action': 'postpone', 'new_due_date': 'soon'})
+        self.assertEqual(response.status_code, 302)
+        third.refresh_from_db()
+        self.assertEqual(third.get_ist_due_date().year, 2030)
+
+@override_settings(DEDUP_MAX_BLOCK_SIZE=3)
+class FlagDuplicatesTests(TestCase):
+    def test_placeholder_keys_do_not_link_new_leads(self):
+        # Already more leads on the placeholder number than a block may hold
+        Lead.objects.bulk_create(
+            Lead(name=f'Walk-in {i}', number='0000000000', phone_normalized=normalize_phone('0000000000')) for i in range(4)
+        )
+        original = Lead.objects.create(name='Asha', number='9876500001', email='asha@example.com')
+        repeat = Lead.objects.create(name='Asha S', number='0000000000', email='ASHA@example.com ')
+        Lead.objects.create(name='Ravi', number='0000000000', email='ravi@example.com')
+
+        flags = DuplicateLead.objects.values_list('lead_id', 'duplicate_of_id', 'reason')
+        self.assertEqual(list(flags), [(repeat.pk, original.pk, 'email')])
+        # The placeholder block is dropped by the count, before any of its rows are read
+        self.assertEqual(usable_keys('phone_normalized', {repeat.phone_normalized, original.phone_normalized}), {original.phone_normalized})
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager')
+        ManagerCapacity.objects.create(user=self.manager)
+        category = Category.objects.create(name='sofa')
+        product = Product.objects.create(category=category, name='Chesterfield', price=Decimal('45000.00'))
+        lead = Lead.objects.create(
+            name='Asha', number='9876500001', email='asha@example.com', pincode='110001', lead_status='inactive',
+            lead_manager=self.manager, notes='Went with another shop', products_data={'1': {'category_name': 'Sofa'}},
+        )
+        lead.categories.add(category)
+        LeadProduct.objects.create(lead=lead, product=product, quantity=2, price_quoted=Decimal('42000.50'))
+        task = Activity.objects.create(lead=lead, created_by=self.manager, activity_type='task', description='Send quote', is_completed=True)
+        TaskNote.objects.create(activity=task, created_by=self.manager, note='Sent by email')
+        LeadIngestItem.objects.create(idempotency_key='fb-1', source='facebook', payload={}, status='imported', lead=lead)
+        # Cold: untouched for longer than LEAD_ARCHIVE_AFTER_DAYS
+        long_ago = timezone.now() - timedelta(days=400)
+        Activity.objects.update(created_date=long_ago)
+        Lead.objects.update(updated_date=long_ago)
+        self.lead_id = lead.pk
+
+    def snapshot(self):
+        lead = Lead.objects.get(pk=self.lead_id)
+        return (
+            Lead.objects.filter(pk=self.lead_id).values().get(),
+            list(lead.categories.values_list('name', flat=True)),
+            list(lead.lead_products.values('product_id', 'quantity', 'notes', 'price_quoted', 'created_date')),
+            list(lead.activities.values()),
+            list(TaskNote.objects.filter(activity__lead=lead).values()),
+            list(lead.ingest_items.values_list('idempotency_key', flat=True)),
+        )
+
+    def test_restored_lead_equals_the_original(self):
+        original = self.snapshot()
+        self.assertEqual(archive_leads([self.lead_id]), 1)
+        self.assertFalse(Lead.objects.filter(pk=self.lead_id).exists())
+        self.assertTrue(ArchivedLead.objects.filter(pk=self.lead_id).exists())
+        self.assertEqual(ManagerCapacity.objects.get().open_leads, 0)
+
+        self.assertEqual(restore_leads([self.lead_id]), 1)
+        self.assertEqual(self.snapshot(), original)
+        self.assertFalse(ArchivedLead.objects.exists())
+        self.assertEqual(ManagerCapacity.objects.get().open_leads, 1)
+
+    def test_archived_recordings_stay_playable_for_the_leads_owners(self):
+        root = temporary_media(self)
+        (root / 'Call Recordings').mkdir()
+        (root / 'Call Recordings' / 'asha.wav').write_bytes(b'RIFF')
+        Activity.objects.create(
+            lead_id=self.lead_id, created_by=self.manager, activity_type='call', recording='Call Recordings/asha.wav',
+            created_date=timezone.now() - timedelta(days=400),
+        )
+        archive_leads([self.lead_id])
+        url = '/leads/recordings/Call%20Recordings/asha.wav'
+        self.client.force_login(self.manager)
+        self.assertEqual(b''.join(self.client.get(url).streaming_content), b'RIFF')
+        self.client.force_login(User.objects.create_user('other'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class SavedViewTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.leads = [Lead.objects.create(name=f'Lead {i}', lead_status='active' if i % 3 else 'inactive') for i in range(9)]
+        start = timezone.now() - timedelta(days=30)
+        for i, lead in enumerate(self.leads):
+            Lead.objects.filter(pk=lead.pk).update(created_date=start + timedelta(days=i))
+
+    def pages(self, results, per_page=2):
+        paginator = Paginator(results, per_page)
+        return [[row['lead_id'] for row in paginator.page(number).object_list] for number in paginator.page_range]
+
+    def assert_pages_match_the_filters_after_updates(self, sort):
+        params = QueryDict(f'status=active&sort={sort}')
+        view = SavedLeadView.objects.create(owner=self.owner, name='Active', query=params.urlencode())
+        refresh(view)
+        built = view.built_date
+
+        # Leave, join, move within and newly enter the results
+        for lead, status in ((self.leads[1], 'customer'), (self.leads[3], 'active'), (self.leads[4], 'active')):
+            lead.lead_status = status
+            lead.save()
+        Lead.objects.filter(pk=self.leads[5].pk).update(created_date=timezone.now() - timedelta(days=60), updated_date=timezone.now())
+        Lead.objects.create(name='Lead 9', lead_status='active')
+
+        view = refresh(SavedLeadView.objects.get(pk=view.pk))
+        # Patched in place rather than rebuilt
+        self.assertEqual(view.built_date, built)
+        expected = filter_leads(Lead.objects.all(), params).values('lead_id')
+        results = SavedViewResults(view, fields=['lead_id'])
+        self.assertEqual(self.pages(results), self.pages(expected))
+        self.assertEqual(results[0], expected[0])
+
+    def test_newest_first(self):
+        self.assert_pages_match_the_filters_after_updates('newest')
+
+    def test_oldest_first(self):
+        self.assert_pages_match_the_filters_after_updates('oldest')
+
+    def test_recently_updated_first(self):
+        # Every save moves the lead's sort key
+        self.assert_pages_match_the_filters_after_updates('updated')
+
+    def test_deleting_a_lead_invalidates_only_the_views_containing_it(self):
+        active = SavedLeadView.objects.create(owner=self.owner, name='Active', query='status=active')
+        inactive = SavedLeadView.objects.create(owner=self.owner, name='Inactive', query='status=inactive')
+        refresh(active)
+        refresh(inactive)
+        self.leads[1].delete()
+        active.refresh_from_db()
+        inactive.refresh_from_db()
+        self.assertEqual((active.is_stale, inactive.is_stale), (True, False))
+
+
+class MergeLeadsTests(TestCase):
+    def test_transitive_duplicates_merge_into_the_oldest_lead(self):
+        user = User.objects.create_user('caller')
+        oldest = Lead.objects.create(name='Asha', number='9876500001')
+        by_phone = Lead.objects.create(name='Asha S', number='+91 98765 00001', email='asha@example.com')
+        by_email = Lead.objects.create(name='A. Sharma', email='ASHA@example.com', notes='Wants blackout curtains')
+        Lead.objects.create(name='Ravi', number='9876500002')
+        Activity.objects.create(lead=by_email, created_by=user, activity_type='note', description='Called back')
+
+        clusters = find_clusters()
+        self.assertEqual(list(clusters), [oldest.pk])
+        self.assertCountEqual(clusters[oldest.pk], [(by_phone.pk, 'phone'), (by_email.pk, 'email')])
+        self.assertEqual(merge_leads(oldest, Lead.objects.filter(pk__in=[by_phone.pk, by_email.pk])), 2)
+
+        self.assertEqual(Lead.objects.count(), 2)
+        oldest.refresh_from_db()
+        self.assertEqual((oldest.email, oldest.notes), ('asha@example.com', 'Wants blackout curtains'))
+        self.assertEqual(oldest.activities.get().description, 'Called back')
+        self.assertEqual(find_clusters(), {})
+
+
+# Pages render without collectstatic (the manifest storage needs it)
+PLAIN_STATIC = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class RecordingMetadataTests(TestCase):
+    def test_wav_duration_comes_from_the_byte_rate(self):
+        metadata = probe(io.BytesIO(wav_bytes(2)))
+        self.assertEqual((metadata['codec'], metadata['duration'], metadata['bitrate']), ('pcm', 2.0, 128000))
+        self.assertEqual(metadata['size'], 44 + 2 * 8000 * 2)
+
+    def test_constant_bitrate_mp3_duration_comes_from_the_length(self):
+        # MPEG-1 layer III, 128 kbps, 44.1 kHz: 417-byte frames
+        frame = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+        metadata = probe(io.BytesIO(frame * 100))
+        self.assertEqual((metadata['codec'], metadata['bitrate']), ('mp3', 128000))
+        self.assertAlmostEqual(metadata['duration'], 41700 * 8 / 128000)
+
+    def test_unknown_formats_keep_size_and_checksum(self):
+        metadata = probe(io.BytesIO(b'not audio at all'))
+        self.assertEqual(metadata['size'], 16)
+        self.assertEqual(len(metadata['checksum']), 64)
+        self.assertIsNone(metadata['duration'])
+
+    def test_format_duration(self):
+        self.assertEqual([format_duration(s) for s in (None, 5, 65.4, 3725)], ['', '0:05', '1:05', '1:02:05'])
+
+    def test_uploading_a_call_recording_queues_the_extraction(self):
+        temporary_media(self)
+        user = User.objects.create_user('caller')
+        lead = Lead.objects.create(name='Asha', number='9876500001')
+        activity = Activity.objects.create(
+            lead=lead, created_by=user, activity_type='call',
+            recording=SimpleUploadedFile('call.wav', wav_bytes(3)),
+        )
+        self.assertIsNone(activity.recording_duration)
+        self.assertEqual(run_job(claim_jobs('worker')[0]).status, 'succeeded')
+        activity.refresh_from_db()
+        self.assertEqual(activity.recording_duration, 3.0)
+        self.assertEqual((activity.recording_codec, activity.recording_size), ('pcm', 44 + 3 * 8000 * 2))
+        self.assertEqual(activity.get_recording_duration_display(), '0:03')
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class RecordingFileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager, cls.caller, cls.other = (User.objects.create_user(name) for name in ('manager', 'caller', 'other'))
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        lead = Lead.objects.create(name='Asha', number='9876500001', lead_manager=cls.manager)
+        Activity.objects.create(lead=lead, created_by=cls.caller, activity_type='call', recording='Call Recordings/asha.wav')
+
+    def setUp(self):
+        root = temporary_media(self)
+        (root / 'Call Recordings').mkdir()
+        (root / 'Call Recordings' / 'asha.wav').write_bytes(b'RIFF')
+
+    def test_only_superusers_and_the_leads_owners_can_fetch_a_recording(self):
+        url = '/leads/recordings/Call%20Recordings/asha.wav'
+        for user, status in ((self.admin, 200), (self.manager, 200), (self.caller, 200), (self.other, 403)):
+            with self.subTest(user=user.username):
+                self.client.force_login(user)
+                self.assertEqual(self.client.get(url).status_code, status)
+
+    def test_lead_page_hides_the_player_from_others(self):
+        lead = Lead.objects.get()
+        self.client.force_login(self.other)
+        self.assertNotContains(self.client.get(f'/leads/detail/{lead.pk}/'), '<audio')
+        self.client.force_login(self.caller)
+        self.assertContains(self.client.get(f'/leads/detail/{lead.pk}/'), '<audio')
+
+
+class RecordingArchiveTests(TestCase):
+    def setUp(self):
+        temporary_media(self)
+        archive_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, archive_root)
+        archive = override_settings(RECORDING_ARCHIVE_ROOT=archive_root, RECORDING_ARCHIVE_AFTER_DAYS=90)
+        archive.enable()
+        self.addCleanup(archive.disable)
+
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.wav, self.mp3 = wav_bytes(1), random.Random(7).randbytes(50_000)
+        for name, number, filename, data in (('Asha', '9876500001', 'call.wav', self.wav), ('Ravi', '9876500002', 'call.mp3', self.mp3)):
+            lead = Lead.objects.create(name=name, number=number)
+            Activity.objects.create(
+                lead=lead, created_by=self.user, activity_type='call',
+                recording=SimpleUploadedFile(filename, data),
+            )
+        Activity.objects.update(created_date=timezone.now() - timedelta(days=91))
+        self.storage = Activity._meta.get_field('recording').storage
+
+    def test_recordings_read_back_unchanged_from_the_pack(self):
+        call_command('archive_recordings', batch_size=1, stdout=io.StringIO())
+        codecs = dict(PackedRecording.objects.values_list('name', 'codec'))
+        self.assertEqual(sorted(Path(name).suffix + ':' + codec for name, codec in codecs.items()), ['.mp3:store', '.wav:zlib'])
+        for activity, data in zip(Activity.objects.order_by('lead__name'), (self.wav, self.mp3)):
+            self.assertFalse(self.storage.raw_exists(activity.recording.name))
+            with activity.recording.open('rb') as f:
+                self.assertEqual(f.read(), data)
+        call_command('archive_recordings', verify=True, stdout=io.StringIO())
+        self.assertEqual(PackedRecording.objects.filter(verified_date__isnull=False).count(), 2)
+
+    def test_archived_recordings_are_served_with_ranges(self):
+        call_command('archive_recordings', stdout=io.StringIO())
+        name = Activity.objects.get(lead__name='Ravi').recording.name
+        self.client.force_login(self.user)
+        url = f'/leads/recordings/{name}'
+        for header, status, body in (('bytes=100-199', 206, self.mp3[100:200]), ('bytes=-10', 206, self.mp3[-10:]), ('', 200, self.mp3)):
+            with self.subTest(range=header):
+                response = self.client.get(url, headers={'Range': header} if header else {})
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(b''.join(response.streaming_content), body)
+        self.assertEqual(self.client.get(url, headers={'Range': 'bytes=60000-'}).status_code, 416)
+
+    def test_download_streams_a_valid_zip_of_raw_and_archived_recordings(self):
+        call_command('archive_recordings', limit=1, stdout=io.StringIO())
+        self.assertEqual(PackedRecording.objects.count(), 1)
+        self.client.force_login(self.user)
+        response = self.client.get('/leads/call-recordings/download/')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        contents = sorted(archive.read(info) for info in archive.infolist())
+        self.assertEqual(contents, sorted([self.wav, self.mp3]))
+        self.assertTrue(all(name.startswith('admin/') for name in archive.namelist()))
+
+    def test_restore_unpacks_the_raw_file(self):
+        call_command('archive_recordings', stdout=io.StringIO())
+        activity = Activity.objects.get(lead__name='Asha')
+        call_command('archive_recordings', restore=[activity.pk], stdout=io.StringIO())
+        self.assertTrue(self.storage.raw_exists(activity.recording.name))
+        self.assertFalse(PackedRecording.objects.filter(name=activity.recording.name).exists())
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class BenchCommandTests(TestCase):
+    """Smoke tests: the benchmark commands run end to end on small or empty databases"""
+
+    def setUp(self):
+        temporary_media(self)
+        self.output = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.output)
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def bench(self, *scenarios):
+        path = self.output / 'results.json'
+        options = {'scenario': list(scenarios)} if scenarios else {}
+        call_command('bench', requests=2, warmup=0, output=str(path), stdout=io.StringIO(), **options)
+        return json.loads(path.read_text())
+
+    def test_bench_runs_on_an_empty_database(self):
+        results = self.bench('lead_list', 'tasks', 'search', 'call_recordings')
+        self.assertEqual(results['rows']['leads'], 0)
+        self.assertEqual({name: result['errors'] for name, result in results['scenarios'].items()},
+                         dict.fromkeys(('lead_list', 'tasks', 'search', 'call_recordings'), 0))
+        with self.assertRaisesMessage(CommandError, 'needs at least one lead'):
+            self.bench('lead_detail')
+
+    def test_seeded_data_benches_cleanly_and_clears(self):
+        call_command('seed_bench', leads=30, managers=2, batch_size=20, stdout=io.StringIO())
+        self.assertEqual(Lead.objects.count(), 30)
+        results = self.bench()
+        self.assertEqual(results['rows']['leads'], 30)
+        self.assertFalse([name for name, result in results['scenarios'].items() if result['errors']])
+        call_command('seed_bench', clear=True, stdout=io.StringIO())
+        self.assertFalse(Lead.objects.exists())
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('caller')
+        cls.lead = Lead.objects.create(name='Asha', number='9876500001', notes='Prefers <b>teak</b> over oak')
+        cls.call = Activity.objects.create(lead=cls.lead, created_by=cls.user, activity_type='call', description='Wants a teak recliner')
+        cls.task = Activity.objects.create(lead=cls.lead, created_by=cls.user, activity_type='task', description='Send the catalogue')
+        TaskNote.objects.create(activity=cls.task, created_by=cls.user, note='Shared fabric samples')
+
+    def kinds(self, query):
+        return sorted(result['kind'] for result in search(query))
+
+    def test_every_word_must_match_as_a_prefix(self):
+        self.assertEqual(self.kinds('recl TEAK'), ['activity'])
+        self.assertEqual(self.kinds('teak'), ['activity', 'lead'])
+        self.assertEqual(self.kinds('samp'), ['note'])
+        self.assertEqual(self.kinds('teak sofa'), [])
+        self.assertEqual(self.kinds('"" OR *'), [])
+
+    def test_like_fallback_finds_the_same_entries(self):
+        with mock.patch('leads.search.has_fts5', return_value=False):
+            self.assertEqual(self.kinds('recl TEAK'), ['activity'])
+            self.assertEqual(self.kinds('teak'), ['activity', 'lead'])
+
+    def test_snippets_are_escaped_before_highlighting(self):
+        for fts in (True, False):
+            with self.subTest(fts=fts), mock.patch('leads.search.has_fts5', return_value=fts and has_fts5()):
+                snippet = next(result['snippet'] for result in search('oak') if result['kind'] == 'lead')
+                self.assertIn('&lt;b&gt;teak&lt;/b&gt;', snippet)
+                self.assertIn('<mark>oak</mark>', snippet)
+
+    def test_entries_of_rows_deleted_in_bulk_are_dropped(self):
+        Activity.objects.filter(pk=self.call.pk).delete()
+        self.assertEqual(self.kinds('recliner'), [])
+        self.assertFalse(SearchEntry.objects.filter(kind='activity', object_id=str(self.call.pk)).exists())
+
+    def test_search_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/leads/search/', {'q': 'recliner'})
+        self.assertContains(response, '<mark>recliner</mark>', html=False)
+
+
+class StartupTests(TestCase):
+    def test_warm_up_runs_every_step_on_an_empty_database(self):
+        with self.assertNoLogs('theopendecor.warmup', 'WARNING'):
+            timings = warm_up()
+        self.assertEqual(list(timings), [name for name, _ in WARMUP_STEPS])
+
+    def test_startup_profile_runs_against_an_empty_database(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        # The profiled interpreters load settings themselves; point them at an empty SQLite file
+        (root / 'empty_db_settings.py').write_text(
+            'from theopendecor.settings import *\n'
+            f'DATABASES = {{"default": {{"ENGINE": "django.db.backends.sqlite3", "NAME": {str(root / "empty.sqlite3")!r}}}}}\n'
+        )
+        environ = {'DJANGO_SETTINGS_MODULE': 'empty_db_settings', 'PYTHONPATH': str(root)}
+        with mock.patch.dict(os.environ, environ):
+            call_command('startup_profile', runs=1, top=3, output=str(root / 'startup.json'), stdout=io.StringIO())
+        results = json.loads((root / 'startup.json').read_text())
+        self.assertEqual(set(results['modes']), {'cold', 'warm'})
+        self.assertEqual({mode['status'] for mode in results['modes'].values()}, {'200 OK'})
+        self.assertLessEqual(len(results['imports']['slowest']), 3)
+
+
+class MoveLegacyRecordingsTests(TestCase):
+    def setUp(self):
+        self.media = temporary_media(self)
+        self.legacy = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.legacy, ignore_errors=True)
+        for name, data in (('asha.wav', b'asha'), ('2024/ravi.mp3', b'ravi'), ('copied.wav', b'same'), ('clash.wav', b'old')):
+            (self.legacy / name).parent.mkdir(parents=True, exist_ok=True)
+            (self.legacy / name).write_bytes(data)
+        recordings = self.media / 'Call Recordings'
+        recordings.mkdir()
+        (recordings / 'copied.wav').write_bytes(b'same')
+        (recordings / 'clash.wav').write_bytes(b'new')
+
+    def test_recordings_move_under_media_root_keeping_their_names(self):
+        with self.assertRaisesMessage(CommandError, '1 recording(s) left in place'):
+            call_command('move_legacy_recordings', source=str(self.legacy), stdout=io.StringIO(), stderr=io.StringIO())
+        storage = Activity._meta.get_field('recording').storage
+        for name, data in (('asha.wav', b'asha'), ('2024/ravi.mp3', b'ravi'), ('copied.wav', b'same'), ('clash.wav', b'new')):
+            with storage.open(f'Call Recordings/{name}') as f:
+                self.assertEqual(f.read(), data)
+        # Only the conflicting file is left behind
+        self.assertEqual([path.name for path in self.legacy.rglob('*')], ['clash.wav'])
+
+
+class CallRecordingFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('caller')
+        lead = Lead.objects.create(name='Asha', number='9876500001')
+        cls.call = Activity.objects.create(lead=lead, created_by=user, activity_type='call', recording='Call Recordings/asha.wav')
+
+    def filtered(self, query):
+        return list(filter_call_recordings(Activity.objects.filter(activity_type='call'), QueryDict(query)))
+
+    def test_dates_at_the_ends_of_the_calendar_are_no_bound(self):
+        self.assertEqual(self.filtered('date_from=0001-01-01&date_to=9999-12-31'), [self.call])
+        self.assertEqual(self.filtered('date_to=2000-01-01'), [])
+
+
+@override_settings(STORAGES=PLAIN_STATIC)
+class TerritoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('caller')
+        cls.leads = {
+            pincode: Lead.objects.create(name=f'Lead {pincode}', pincode=pincode)
+            for pincode in ('201 301', '201001', '209801', '560001', '570001', '12345')
+        }
+        for lead in cls.leads.values():
+            Activity.objects.create(lead=lead, created_by=cls.user, activity_type='task', due_date=timezone.now() + timedelta(days=1))
+
+    def filtered(self, territory):
+        return {lead.pincode for lead in filter_leads(Lead.objects.all(), QueryDict(f'territory={territory}'))}
+
+    def test_the_longest_prefix_wins(self):
+        self.assertEqual(
+            {pincode: lead.territory for pincode, lead in self.leads.items()},
+            {'201 301': 'noida', '201001': 'ghaziabad', '209801': 'uttar-pradesh', '560001': 'bengaluru', '570001': 'mysuru', '12345': None},
+        )
+
+    def test_city_and_region_filters(self):
+        self.assertEqual(self.filtered('bengaluru'), {'560001'})
+        self.assertEqual(self.filtered('uttar-pradesh'), {'201 301', '201001', '209801'})
+        self.assertEqual(self.filtered('atlantis'), set())
+        tasks = filter_tasks(Activity.objects.all(), QueryDict('territory=karnataka'))
+        self.assertEqual({task.lead.pincode for task in tasks}, {'560001', '570001'})
+
+    def test_pincode_changes_move_the_lead(self):
+        lead = self.leads['560001']
+        lead.pincode = '570001'
+        lead.save(update_fields=['pincode'])
+        self.assertEqual(Lead.objects.get(pk=lead.pk).territory, 'mysuru')
+
+    def test_backfill_fixes_stale_territories(self):
+        Lead.objects.filter(pincode='201 301').update(territory='ghaziabad')
+        call_command('backfill_territories', stdout=io.StringIO())
+        self.assertEqual(self.filtered('noida'), {'201 301'})
+
+    def test_pages_filter_by_territory(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('leads:lead_list'), {'territory': 'noida'})
+        self.assertContains(response, 'Lead 201 301')
+        self.assertNotContains(response, 'Lead 201001')
+        response = self.client.get(reverse('leads:tasks'), {'territory': 'mysuru'})
+        self.assertContains(response, 'Lead 570001')
+        self.assertNotContains(response, 'Lead 560001')
+
+
+class ProjectionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        caller = User.objects.create_user('caller', first_name='Meera', last_name='Iyer')
+        helper = User.objects.create_user('helper')
+        lead = Lead.objects.create(
+            name='Asha', number='9876500001', lead_status='active', lead_stage='factory_visit',
+            products_data={'1': {'category_name': 'Sofa', 'products': [{'name': 'Recliner Royale'}, {'name': 'Chesterfield'}]}},
+        )
+        Lead.objects.create(name='Ravi', email='ravi@example.com')
+        task = Activity.objects.create(
+            lead=lead, created_by=caller, activity_type='task', priority='high', due_date=timezone.now() - timedelta(hours=3),
+        )
+        TaskNote.objects.create(activity=task, created_by=helper, note='Called, no answer')
+        TaskNote.objects.create(activity=task, created_by=caller, note='Quote sent')
+        Activity.objects.create(
+            lead=lead, created_by=caller, activity_type='call', recording='Call Recordings/asha.wav', recording_duration=75, recording_size=1200,
+        )
+
+    def test_rows_show_what_the_instances_showed(self):
+        leads = Lead.objects.order_by('-created_date')
+        rows = lead_rows(leads.values(*LEAD_ROW_FIELDS))
+        self.assertEqual(len(rows), 2)
+        for row, lead in zip(rows, leads):
+            self.assertEqual(
+                (row.detail_url, row.whatsapp_link, row.products_summary, row.stage_label, row.status_label, row.created_day, row.created_time),
+                bench_rows.lead_labels(lead),
+            )
+
+        tasks = Activity.objects.filter(activity_type='task').with_schedule(timezone.now())
+        with self.assertNumQueries(2):
+            [row] = task_rows(tasks)
+        task = tasks.get()
+        self.assertTrue(row.overdue)
+        self.assertEqual(len(row.notes), 2)
+        self.assertEqual(
+            (
+                row.lead.detail_url, row.lead.whatsapp_link, row.lead.stage_label, row.lead.status_label, row.priority_label,
+                (row.due_day, row.due_time, row.due_label), row.owner, row.created_label,
+                [(note.owner, note.created_label) for note in row.notes],
+            ),
+            bench_rows.task_labels(task),
+        )
+
+        calls = Activity.objects.filter(activity_type='call')
+        [row] = call_rows(calls.values(*CALL_ROW_FIELDS))
+        self.assertEqual(
+            (
+                row.lead.detail_url, row.lead.whatsapp_link, row.lead.stage_label, row.lead.status_label, row.recording_url,
+                row.recording_name, row.duration_label, row.owner, row.created_label,
+            ),
+            bench_rows.call_labels(calls.get()),
+        )
+
+    def test_bench_rows_runs(self):
+        out = io.StringIO()
+        call_command('bench_rows', rows=5, repeat=1, stdout=out)
+        self.assertIn('projection is', out.getvalue())
+
+
+class SharedPartialTests(SimpleTestCase):
+    def setUp(self):
+        if 'jinja2' not in engines:
+            self.skipTest('Jinja2 is not installed')
+
+    def test_both_engines_render_the_row_partials_from_one_file(self):
+        command = bench_templates.Command()
+        context = {
+            'leads': command.make_leads(random.Random(1), 20),
+            'task_activities': command.make_tasks(random.Random(1), 20),
+            'task': {'due_day': 'Oct 05, 2026', 'due_time': '9:05 AM', 'description': 'Call <back>', 'lead__name': None, 'lead_url': '/'},
+        }
+        for name in bench_templates.PARTIALS + ['leads/email/_task_digest_task.html']:
+            with self.subTest(name=name):
+                django, jinja = engines['django'].get_template(name), engines['jinja2'].get_template(name)
+                self.assertEqual(jinja.template.filename, django.origin.name)
+                self.assertEqual(bench_templates.normalized(jinja.render(context)), bench_templates.normalized(django.render(context)))
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_stays_async_in_an_async_chain(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(ProfilingMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(ProfilingMiddleware(lambda request: HttpResponse())))
+
+    def test_samples_the_thread_that_runs_the_view(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        async def async_view(request):
+            return HttpResponse()
+
+        def sync_view(request):
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(get_response)
+
+        async def sampled_thread(view):
+            async with ThreadSensitiveContext():
+                request = RequestFactory().get('/')
+                request.profiling_sampler = StackSampler(threading.get_ident(), 1)
+                await middleware.process_view(request, view, (), {})
+                return request.profiling_sampler.thread_id, threading.get_ident()
+
+        sampled, loop = async_to_sync(sampled_thread)(async_view)
+        self.assertEqual(sampled, loop)
+        sampled, loop = async_to_sync(sampled_thread)(sync_view)
+        self.assertNotEqual(sampled, loop)
+
+    async def test_profiles_async_views_under_asgi(self):
+        await self.async_client.aforce_login(self.admin)
+        with override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_ROOT=self.root):
+            response = await self.async_client.get('/leads/async/api/v1/leads/', headers={'X-Profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Profile-Duration', response.headers)
+        record = json.loads((self.root / 'leads.async_api_lead_list.jsonl').read_text())
+        self.assertEqual(record['path'], '/leads/async/api/v1/leads/')
+
+
+class ProductAutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog._index['loaded'] = None
+        self.sofa = Category.objects.create(name='sofa')
+        Product.objects.create(category=self.sofa, name='Recliner Royale', price=Decimal('45000'))
+
+    def products(self, *names):
+        return {str(self.sofa.pk): {'category_name': 'Sofa', 'products': [{'name': name} for name in names]}}
+
+    @override_settings(CATALOG_HISTORY_DELAY=0)
+    def test_catalog_first_then_most_used_names_from_leads(self):
+        Lead.objects.create(name='Asha', products_data=self.products('Royal Chesterfield', 'Rocking chair'))
+        Lead.objects.create(name='Ravi', products_data=self.products('rocking  Chair'))
+        # Requests only read the stored names; the leads count once the queued rebuild has run
+        self.assertEqual([entry['name'] for entry in suggest('ro')], ['Recliner Royale'])
+        jobs = claim_jobs('worker', limit=5)
+        self.assertEqual([job.name for job in jobs], ['leads.rebuild_product_history'])
+        run_job(jobs[0])
+
+        self.client.force_login(User.objects.create_user('staff'))
+        response = self.client.get(reverse('leads:product_autocomplete'), {'q': 'RO', 'category': self.sofa.pk})
+        self.assertEqual(
+            [(row['name'], row['source']) for row in response.json()['results']],
+            [('Recliner Royale', 'catalog'), ('Rocking chair', 'history'), ('Royal Chesterfield', 'history')],
+        )
+        self.assertEqual(response.json()['results'][0]['price'], '45000.00')
+        self.assertEqual(suggest('chair', category_id=self.sofa.pk + 1), [])
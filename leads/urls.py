@@ -1,16 +1,44 @@
 from django.urls import path
-from . import views
+from . import views, api, async_views, ingest
 
 app_name = 'leads'
 
 urlpatterns = [
     path('create/', views.lead_create_view, name='lead_create'),
     path('list/', views.lead_list_view, name='lead_list'),
+    path('saved-views/', views.saved_view_save, name='saved_view_save'),
+    path('saved-views/<int:view_id>/delete/', views.saved_view_delete, name='saved_view_delete'),
     path('detail/<uuid:lead_id>/', views.lead_detail_view, name='lead_detail'),
     path('tasks/', views.tasks_view, name='tasks'),
+    path('products/autocomplete/', views.product_autocomplete_view, name='product_autocomplete'),
     path('add-activity/<uuid:lead_id>/', views.add_activity_view, name='add_activity'),
     path('mark-task-complete/<int:activity_id>/', views.mark_task_complete, name='mark_task_complete'),
     path('add-task-note/<int:activity_id>/', views.add_task_note, name='add_task_note'),
     path('postpone-task/<int:activity_id>/', views.postpone_task, name='postpone_task'),
+    path('bulk/leads/', views.bulk_leads_view, name='bulk_leads'),
+    path('bulk/tasks/', views.bulk_tasks_view, name='bulk_tasks'),
     path('call-recordings/', views.call_recordings_view, name='call_recordings'),
+    path('call-recordings/download/', views.call_recordings_download_view, name='call_recordings_download'),
+    path('recordings/<path:name>', views.recording_file_view, name='recording_file'),
+    path('search/', views.search_view, name='search'),
+    path('profiles/', views.profiles_view, name='profiles'),
+    path('profiles/<str:stem>.folded', views.profile_folded_view, name='profile_folded'),
+    # Lead ingestion webhook (token authenticated)
+    path('ingest/', ingest.ingest_leads_view, name='ingest'),
+    # Read-only JSON API
+    path('api/v1/leads/', api.lead_list_api, name='api_lead_list'),
+    path('api/v1/leads/<uuid:lead_id>/', api.lead_detail_api, name='api_lead_detail'),
+    path('api/v1/leads/<uuid:lead_id>/activities/', api.lead_activities_api, name='api_lead_activities'),
+    path('api/v1/tasks/', api.task_list_api, name='api_tasks'),
+    path('api/v1/tasks/<int:activity_id>/notes/', api.task_notes_api, name='api_task_notes'),
+    # Async (ASGI) versions of the JSON endpoints
+    path('async/add-activity/<uuid:lead_id>/', async_views.add_activity_view, name='async_add_activity'),
+    path('async/mark-task-complete/<int:activity_id>/', async_views.mark_task_complete, name='async_mark_task_complete'),
+    path('async/add-task-note/<int:activity_id>/', async_views.add_task_note, name='async_add_task_note'),
+    path('async/postpone-task/<int:activity_id>/', async_views.postpone_task, name='async_postpone_task'),
+    path('async/api/v1/leads/', async_views.lead_list_api, name='async_api_lead_list'),
+    path('async/api/v1/leads/<uuid:lead_id>/', async_views.lead_detail_api, name='async_api_lead_detail'),
+    path('async/api/v1/leads/<uuid:lead_id>/activities/', async_views.lead_activities_api, name='async_api_lead_activities'),
+    path('async/api/v1/tasks/', async_views.task_list_api, name='async_api_tasks'),
+    path('async/api/v1/tasks/<int:activity_id>/notes/', async_views.task_notes_api, name='async_api_task_notes'),
 ]
\ No newline at end of file
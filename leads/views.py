@@ -1,15 +1,104 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
 from django.core.paginator import Paginator
+from django.urls import reverse
 from django.views.decorators.http import require_POST
 from django.utils import timezone
-import pytz
-from .models import Lead, Activity, TaskNote, Category, Product, LeadProduct
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.conf import settings
+from .models import IST, Lead, Activity, ArchivedActivity, ArchivedLead, TaskNote, Category, Product, LeadProduct, SavedLeadView
+from .archive import CombinedLeadList, get_hot_lead
+from .assignment import assign_leads, distribute_leads
+from .audio import format_duration
+from .bulk import add_categories, selected_leads, selected_tasks, update_leads, update_tasks
+from .catalog import suggest
+from .counters import invalidate_task_counts, record_task_change, task_state
+from .filters import filter_call_recordings, filter_leads, filter_tasks
+from .profiling import clear_profiles, endpoint_summaries, merged_stacks
+from .projections import CALL_ROW_FIELDS, LEAD_ROW_FIELDS, call_rows, lead_rows, task_rows
+from .saved_views import SavedViewResults, refresh, saved_query, view_params, visible_views
+from .search import search
+from .territories import territory_options
+from .zipstream import iter_zip
 from django.contrib.auth.models import User
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+import mimetypes
 import os
+import re
+import time
+
+def parse_ist_datetime(value):
+    """Parse a datetime-local string entered in IST and return it in UTC"""
+    naive = datetime.fromisoformat(value.replace('T', ' '))
+    return naive.replace(tzinfo=IST).astimezone(dt_timezone.utc)
+
+# Form handling shared with the async views (see async_views.py)
+
+def failure(error: str) -> JsonResponse:
+    return JsonResponse({'success': False, 'error': error})
+
+def build_activity(post, files, lead, user):
+    """(unsaved Activity, None) from the add-activity form, or (None, error)"""
+    activity_type = post.get('activity_type')
+    description = post.get('description')
+    if not activity_type or not description:
+        return None, 'Activity type and description are required.'
+
+    activity = Activity(lead=lead, activity_type=activity_type, description=description, created_by=user)
+
+    # Handle call-specific fields
+    if activity_type == 'call':
+        recording = files.get('recording')
+        if recording:
+            activity.recording = recording
+
+    # Handle task-specific fields
+    elif activity_type == 'task':
+        due_date_str = post.get('due_date')
+        priority = post.get('priority')
+        if due_date_str:
+            try:
+                # Parse the datetime string (assuming it's in IST) and convert to UTC for storage
+                activity.due_date = parse_ist_datetime(due_date_str)
+            except ValueError:
+                return None, 'Invalid due date format.'
+        if priority:
+            activity.priority = priority
+    return activity, None
+
+def activity_added(activity) -> JsonResponse:
+    return JsonResponse({'success': True, 'message': f'{activity.get_activity_type_display()} added successfully!'})
+
+def task_toggled(activity) -> JsonResponse:
+    status = 'completed' if activity.is_completed else 'pending'
+    return JsonResponse({'success': True, 'is_completed': activity.is_completed, 'message': f'Task marked as {status}!'})
+
+def note_added() -> JsonResponse:
+    return JsonResponse({'success': True, 'message': 'Note added successfully!'})
+
+def parse_new_due_date(post):
+    """(UTC due date, None) from the postpone form, or (None, error)"""
+    new_due_date_str = post.get('new_due_date')
+    if not new_due_date_str:
+        return None, 'New due date is required.'
+    try:
+        return parse_ist_datetime(new_due_date_str), None
+    except ValueError:
+        return None, 'Invalid date format.'
+
+def task_postponed(activity, old_due_date) -> JsonResponse:
+    return JsonResponse({
+        'success': True,
+        'message': 'Task due date updated successfully!',
+        'old_date': old_due_date.strftime('%b %d, %Y %I:%M %p') if old_due_date else 'Not set',
+        'new_date': activity.get_ist_due_date().strftime('%b %d, %Y %I:%M %p')
+    })
 
 def handle_product_entries(request, lead):
     """Handle product entries for a lead - store in products_data JSON field"""
@@ -73,11 +162,18 @@ def lead_create_view(request: HttpRequest) -> HttpResponse:
         lead.lead_status = request.POST.get('lead_status', 'active')
         lead.lead_stage = request.POST.get('lead_stage', 'cold_follow_up')
         
-        # Set lead manager to current user (auto-assigned)
-        lead.lead_manager = request.user
+        # Lead manager: the current user by default, someone else, or the assignment engine
+        manager_choice = request.POST.get('lead_manager', '')
+        if manager_choice.isdigit():
+            lead.lead_manager = User.objects.filter(id=manager_choice, is_active=True).first() or request.user
+        elif manager_choice != 'auto':
+            lead.lead_manager = request.user
         
         # Save the lead first
-        lead.save()
+        with transaction.atomic():
+            if manager_choice == 'auto':
+                assign_leads([lead])
+            lead.save()
         
         # Handle categories (multiselect)
         category_ids = request.POST.getlist('categories')
@@ -97,6 +193,7 @@ def lead_create_view(request: HttpRequest) -> HttpResponse:
     context = {
         'title': 'Create New Lead',
         'categories': categories,
+        'staff_users': User.objects.filter(is_active=True).order_by('username'),
         'lead_source_choices': Lead.LEAD_SOURCE_CHOICES,
         'lead_status_choices': Lead.LEAD_STATUS_CHOICES,
         'lead_stage_choices': Lead.LEAD_STAGE_CHOICES,
@@ -106,51 +203,180 @@ def lead_create_view(request: HttpRequest) -> HttpResponse:
 @login_required
 def lead_list_view(request: HttpRequest) -> HttpResponse:
     """List all leads with pagination and filtering"""
-    leads_queryset = Lead.objects.all()
-    
-    # Filter by search query
-    search_query = request.GET.get('search', '')
-    if search_query:
-        leads_queryset = leads_queryset.filter(
-            name__icontains=search_query
-        ) | leads_queryset.filter(
-            number__icontains=search_query
-        ) | leads_queryset.filter(
-            email__icontains=search_query
-        ) | leads_queryset.filter(
-            pincode__icontains=search_query
-        )
-    
-    # Filter by lead status
-    status_filter = request.GET.get('status', '')
-    if status_filter:
-        leads_queryset = leads_queryset.filter(lead_status=status_filter)
+    # A saved view reads its cached lead ids instead of running its filters
+    saved_view = None
+    params = request.GET
+    if request.GET.get('view', '').isdigit():
+        saved_view = get_object_or_404(visible_views(request.user), pk=request.GET['view'])
+        params = view_params(saved_view)
     
-    # Filter by lead stage
-    stage_filter = request.GET.get('stage', '')
-    if stage_filter:
-        leads_queryset = leads_queryset.filter(lead_stage=stage_filter)
+    # Archived leads live in their own table; only listed when asked for
+    archived_filter = '' if saved_view else request.GET.get('archived', '')
+    # Only the columns the rows show, as dicts (see projections.py)
+    if saved_view:
+        leads_queryset = SavedViewResults(refresh(saved_view), fields=LEAD_ROW_FIELDS)
+    elif archived_filter == 'only':
+        leads_queryset = filter_leads(ArchivedLead.objects.all(), request.GET).values(*LEAD_ROW_FIELDS)
+    elif archived_filter == 'include':
+        leads_queryset = CombinedLeadList(
+            filter_leads(Lead.objects.all(), request.GET),
+            filter_leads(ArchivedLead.objects.all(), request.GET),
+            fields=LEAD_ROW_FIELDS,
+        )
+    else:
+        leads_queryset = filter_leads(Lead.objects.all(), request.GET).values(*LEAD_ROW_FIELDS)
     
     # Pagination
     paginator = Paginator(leads_queryset, 25)  # Show 25 leads per page
     page_number = request.GET.get('page')
     leads = paginator.get_page(page_number)
+    leads.object_list = lead_rows(leads.object_list, is_archived=archived_filter == 'only')
+    
+    # Current filters, for pagination links and "select all matching" bulk actions
+    filter_params = params.copy()
+    filter_params.pop('page', None)
+    if saved_view:
+        filter_params['view'] = saved_view.pk
     
     context = {
-        'title': 'Lead List',
+        'title': saved_view.name if saved_view else 'Lead List',
         'leads': leads,
-        'search_query': search_query,
-        'status_filter': status_filter,
-        'stage_filter': stage_filter,
+        'filter_query': filter_params.urlencode(),
+        'saved_query': saved_query(filter_params),
+        'saved_view': saved_view,
+        'saved_views': visible_views(request.user).defer('lead_ids', 'lead_index'),
+        'staff_users': User.objects.filter(is_active=True).order_by('username'),
+        'categories': Category.objects.all().order_by('name'),
+        'search_query': params.get('search', ''),
+        'status_filter': params.get('status', ''),
+        'stage_filter': params.get('stage', ''),
+        'source_filter': params.get('source', ''),
+        'territory_filter': params.get('territory', ''),
+        'territory_options': territory_options(),
+        'pincode_filter': params.get('pincode', ''),
+        'idle_days': params.get('idle_days', ''),
+        'sort': params.get('sort', ''),
+        'archived_filter': archived_filter,
         'lead_status_choices': Lead.LEAD_STATUS_CHOICES,
         'lead_stage_choices': Lead.LEAD_STAGE_CHOICES,
+        'lead_source_choices': Lead.LEAD_SOURCE_CHOICES,
     }
     return render(request, 'leads/lead_list.html', context)
 
+def bulk_redirect(request: HttpRequest, default: str) -> HttpResponse:
+    """Back to the list the bulk form was posted from"""
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect(default)
+
+@login_required
+@require_POST
+def saved_view_save(request: HttpRequest) -> HttpResponse:
+    """Save the lead list's current filters and sort under a name (replacing the user's view of that name)"""
+    name = request.POST.get('name', '').strip()[:100]
+    if not name:
+        messages.error(request, 'Give the view a name.')
+        return bulk_redirect(request, 'leads:lead_list')
+    
+    saved_view, created = SavedLeadView.objects.update_or_create(
+        owner=request.user,
+        name=name,
+        defaults={
+            'query': saved_query(QueryDict(request.POST.get('query', ''))),
+            'is_shared': request.POST.get('is_shared') == '1',
+            'is_stale': True,
+        },
+    )
+    messages.success(request, f'Saved view "{name}" {"created" if created else "updated"}.')
+    return redirect(f"{reverse('leads:lead_list')}?view={saved_view.pk}")
+
+@login_required
+@require_POST
+def saved_view_delete(request: HttpRequest, view_id: int) -> HttpResponse:
+    """Delete a saved view (its owner or a super admin)"""
+    saved_view = get_object_or_404(SavedLeadView, pk=view_id)
+    if saved_view.owner_id != request.user.pk and not request.user.is_superuser:
+        messages.error(request, 'Only the owner can delete a saved view.')
+        return redirect(f"{reverse('leads:lead_list')}?view={saved_view.pk}")
+    saved_view.delete()
+    messages.success(request, f'Saved view "{saved_view.name}" deleted.')
+    return redirect('leads:lead_list')
+
+@login_required
+def product_autocomplete_view(request: HttpRequest) -> JsonResponse:
+    """Product name suggestions for the lead product entry forms, with catalog price and URL"""
+    category_id = request.GET.get('category', '')
+    results = suggest(
+        request.GET.get('q', '')[:100],
+        category_id=int(category_id) if category_id.isdigit() else None,
+        limit=10,
+    )
+    return JsonResponse({
+        'results': [
+            {'name': entry['name'], 'price': entry['price'], 'url': entry['url'], 'source': entry['source']}
+            for entry in results
+        ],
+    })
+
+@login_required
+@require_POST
+def bulk_leads_view(request: HttpRequest) -> HttpResponse:
+    """Apply one action to every selected lead with a single UPDATE"""
+    leads = selected_leads(request.POST)
+    action = request.POST.get('action')
+    
+    if action == 'stage' and request.POST.get('lead_stage') in dict(Lead.LEAD_STAGE_CHOICES):
+        count = update_leads(leads, lead_stage=request.POST['lead_stage'])
+    elif action == 'status' and request.POST.get('lead_status') in dict(Lead.LEAD_STATUS_CHOICES):
+        count = update_leads(leads, lead_status=request.POST['lead_status'])
+    elif action == 'manager' and request.POST.get('lead_manager') == 'auto':
+        count = sum(distribute_leads(leads).values())
+    elif action == 'manager' and request.POST.get('lead_manager', '').isdigit():
+        manager = get_object_or_404(User, id=request.POST['lead_manager'], is_active=True)
+        count = update_leads(leads, lead_manager=manager)
+    elif action == 'categories' and request.POST.getlist('categories'):
+        categories = list(Category.objects.filter(id__in=request.POST.getlist('categories')))
+        count = add_categories(leads, categories)
+    else:
+        messages.error(request, 'Choose an action and a value to apply.')
+        return bulk_redirect(request, 'leads:lead_list')
+    
+    messages.success(request, f'Updated {count} lead(s).')
+    return bulk_redirect(request, 'leads:lead_list')
+
+@login_required
+@require_POST
+def bulk_tasks_view(request: HttpRequest) -> HttpResponse:
+    """Complete or postpone every selected task with a single UPDATE"""
+    tasks = selected_tasks(request.POST, user=request.user)
+    action = request.POST.get('action')
+    
+    if action == 'complete':
+        count = update_tasks(tasks, is_completed=True)
+        messages.success(request, f'Marked {count} task(s) as completed.')
+    elif action == 'postpone':
+        try:
+            new_due_date = parse_ist_datetime(request.POST.get('new_due_date', ''))
+        except ValueError:
+            messages.error(request, 'Choose a valid new due date.')
+            return bulk_redirect(request, 'leads:tasks')
+        count = update_tasks(tasks, due_date=new_due_date)
+        messages.success(request, f'Postponed {count} task(s).')
+    else:
+        messages.error(request, 'Choose an action to apply.')
+    return bulk_redirect(request, 'leads:tasks')
+
 @login_required
 def lead_detail_view(request: HttpRequest, lead_id: str) -> HttpResponse:
     """View detailed information about a specific lead"""
-    lead = get_object_or_404(Lead, lead_id=lead_id)
+    if request.method == 'POST':
+        # Saving an archived lead brings it back to the hot table
+        lead = get_hot_lead(lead_id)
+        if lead is None:
+            raise Http404('No Lead matches the given query.')
+    else:
+        lead = Lead.objects.filter(lead_id=lead_id).first() or get_object_or_404(ArchivedLead, lead_id=lead_id)
     
     # Handle lead update
     if request.method == 'POST':
@@ -166,8 +392,14 @@ def lead_detail_view(request: HttpRequest, lead_id: str) -> HttpResponse:
         lead.notes = request.POST.get('notes')
         lead.remarks = request.POST.get('remarks')
         
-        # Set lead manager to current user (auto-assigned)
-        lead.lead_manager = request.user
+        # Reassign only when a different manager is chosen; editing a lead no longer takes it over
+        manager_choice = request.POST.get('lead_manager', str(lead.lead_manager_id or ''))
+        if manager_choice != str(lead.lead_manager_id or ''):
+            new_manager = User.objects.filter(id=manager_choice, is_active=True).first() if manager_choice.isdigit() else None
+            if (new_manager.id if new_manager else None) != lead.lead_manager_id:
+                # The lead's open tasks move to another user's counters
+                invalidate_task_counts([lead.lead_manager_id, new_manager.id if new_manager else None])
+                lead.lead_manager = new_manager
         
         # Handle categories (multiselect)
         category_ids = request.POST.getlist('categories')
@@ -191,12 +423,19 @@ def lead_detail_view(request: HttpRequest, lead_id: str) -> HttpResponse:
     categories = Category.objects.all().order_by('name')
     
     # Get existing products for this lead to pre-populate the form
-    existing_lead_products = lead.lead_products.select_related('product', 'product__category').all()
+    if lead.is_archived:
+        existing_lead_products = LeadProduct.objects.none()
+    else:
+        existing_lead_products = lead.lead_products.select_related('product', 'product__category').all()
     
     context = {
         'title': f'Lead Details - {lead.name or "Unknown"}',
         'lead': lead,
+        # Include a deactivated current manager so the form does not silently unassign
+        'staff_users': User.objects.filter(Q(is_active=True) | Q(id=lead.lead_manager_id)).order_by('username'),
         'activities': activities,
+        # Others only see that a call was recorded (see can_hear_recording)
+        'can_hear_recordings': request.user.is_superuser or request.user.pk == lead.lead_manager_id,
         'categories': categories,
         'existing_lead_products': existing_lead_products,
         'lead_source_choices': Lead.LEAD_SOURCE_CHOICES,
@@ -212,75 +451,41 @@ def lead_detail_view(request: HttpRequest, lead_id: str) -> HttpResponse:
 def add_activity_view(request: HttpRequest, lead_id: str) -> JsonResponse:
     """Add activity to a lead via AJAX"""
     try:
-        lead = get_object_or_404(Lead, lead_id=lead_id)
-        
-        activity_type = request.POST.get('activity_type')
-        description = request.POST.get('description')
+        # An archived lead is restored by getting a new activity
+        lead = get_hot_lead(lead_id)
+        if lead is None:
+            raise Http404('No Lead matches the given query.')
         
-        if not activity_type or not description:
-            return JsonResponse({'success': False, 'error': 'Activity type and description are required.'})
-        
-        # Create the activity
-        activity = Activity(
-            lead=lead,
-            activity_type=activity_type,
-            description=description,
-            created_by=request.user
-        )
-        
-        # Handle call-specific fields
-        if activity_type == 'call':
-            recording = request.FILES.get('recording')
-            if recording:
-                activity.recording = recording
-        
-        # Handle task-specific fields
-        elif activity_type == 'task':
-            due_date_str = request.POST.get('due_date')
-            priority = request.POST.get('priority')
-            
-            if due_date_str:
-                try:
-                    # Parse the datetime string (assuming it's in IST)
-                    due_date = datetime.fromisoformat(due_date_str.replace('T', ' '))
-                    # Convert to UTC for storage
-                    ist = pytz.timezone('Asia/Kolkata')
-                    due_date = ist.localize(due_date).astimezone(pytz.UTC)
-                    activity.due_date = due_date
-                except ValueError:
-                    return JsonResponse({'success': False, 'error': 'Invalid due date format.'})
-            
-            if priority:
-                activity.priority = priority
+        activity, error = build_activity(request.POST, request.FILES, lead, request.user)
+        if error:
+            return failure(error)
         
         activity.save()
-        
-        return JsonResponse({
-            'success': True,
-            'message': f'{activity.get_activity_type_display()} added successfully!'
-        })
+        if activity.activity_type == 'task':
+            record_task_change(activity)
+        return activity_added(activity)
         
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
+        return failure(str(e))
 
 @login_required
 def tasks_view(request: HttpRequest) -> HttpResponse:
     """View tasks related to leads"""
     # Get task-type activities ordered by due date (earliest first), then by creation date
-    task_activities = Activity.objects.filter(activity_type='task').select_related('lead', 'created_by').prefetch_related('notes').order_by('due_date', 'created_date')
+    task_activities = Activity.objects.filter(activity_type='task').order_by('due_date', 'created_date')
     
-    # Filter by completion status - default to showing all tasks
+    now = timezone.now()
+    task_activities = filter_tasks(task_activities, request.GET, user=request.user).with_schedule(now)
+    # The board's columns and notes as slotted rows (see projections.py)
+    task_activities = task_rows(task_activities)
     status_filter = request.GET.get('status', 'all')
-    if status_filter == 'completed':
-        task_activities = task_activities.filter(is_completed=True)
-    elif status_filter == 'pending':
-        task_activities = task_activities.filter(is_completed=False)
-    # 'all' shows everything
-    
-    # Filter by priority
     priority_filter = request.GET.get('priority', '')
-    if priority_filter:
-        task_activities = task_activities.filter(priority=priority_filter)
+    owner_filter = request.GET.get('owner', '')
+    
+    # Tab badges: one aggregate over the owner-scoped tasks
+    scoped_tasks = Activity.objects.all()
+    if owner_filter == 'me':
+        scoped_tasks = scoped_tasks.for_user(request.user)
     
     context = {
         'title': 'Tasks',
@@ -288,6 +493,12 @@ def tasks_view(request: HttpRequest) -> HttpResponse:
         'status_filter': status_filter,
         'priority_filter': priority_filter,
         'priority_choices': Activity.PRIORITY_CHOICES,
+        'tab': request.GET.get('tab', ''),
+        'owner_filter': owner_filter,
+        'territory_filter': request.GET.get('territory', ''),
+        'territory_options': territory_options(),
+        'tab_counts': scoped_tasks.schedule_counts(now),
+        'filter_query': request.GET.urlencode(),
     }
     return render(request, 'leads/tasks.html', context)
 
@@ -296,18 +507,14 @@ def tasks_view(request: HttpRequest) -> HttpResponse:
 def mark_task_complete(request: HttpRequest, activity_id: int) -> JsonResponse:
     """Mark a task as complete"""
     try:
-        activity = get_object_or_404(Activity, id=activity_id, activity_type='task')
+        activity = get_object_or_404(Activity.objects.select_related('lead'), id=activity_id, activity_type='task')
+        before = task_state(activity)
         activity.is_completed = not activity.is_completed  # Toggle completion
         activity.save()
-        
-        status = 'completed' if activity.is_completed else 'pending'
-        return JsonResponse({
-            'success': True,
-            'is_completed': activity.is_completed,
-            'message': f'Task marked as {status}!'
-        })
+        record_task_change(activity, before)
+        return task_toggled(activity)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
+        return failure(str(e))
 
 @login_required
 @require_POST
@@ -318,23 +525,13 @@ def add_task_note(request: HttpRequest, activity_id: int) -> JsonResponse:
         note_content = request.POST.get('note')
         
         if not note_content:
-            return JsonResponse({'success': False, 'error': 'Note content is required.'})
+            return failure('Note content is required.')
         
-        # Create the task note
-        task_note = TaskNote(
-            activity=activity,
-            note=note_content,
-            created_by=request.user
-        )
-        task_note.save()
-        
-        return JsonResponse({
-            'success': True,
-            'message': 'Note added successfully!'
-        })
+        TaskNote.objects.create(activity=activity, note=note_content, created_by=request.user)
+        return note_added()
         
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
+        return failure(str(e))
 
 @login_required
 def call_recordings_view(request: HttpRequest) -> HttpResponse:
@@ -347,62 +544,211 @@ def call_recordings_view(request: HttpRequest) -> HttpResponse:
     call_activities = Activity.objects.filter(
         activity_type='call',
         recording__isnull=False
-    ).exclude(recording='').select_related('lead', 'created_by').order_by('-created_date')
-    
-    # Search functionality
-    search_query = request.GET.get('search', '')
-    if search_query:
-        from django.db import models
-        call_activities = call_activities.filter(
-            models.Q(lead__name__icontains=search_query) |
-            models.Q(description__icontains=search_query) |
-            models.Q(created_by__username__icontains=search_query)
-        )
+    ).exclude(recording='')
+    call_activities = filter_call_recordings(call_activities, request.GET)
     
-    # Pagination
-    paginator = Paginator(call_activities, 20)  # Show 20 recordings per page
+    # Pagination, over just the columns the page shows (see projections.py)
+    paginator = Paginator(call_activities.values(*CALL_ROW_FIELDS), 20)  # Show 20 recordings per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = call_rows(page_obj.object_list)
+    
+    # Current filters, for pagination links and the ZIP download
+    filter_params = request.GET.copy()
+    filter_params.pop('page', None)
     
     context = {
         'title': 'Call Recordings',
         'call_activities': page_obj,
-        'search_query': search_query,
-        'total_recordings': call_activities.count(),
+        'search_query': request.GET.get('search', ''),
+        'staff_filter': request.GET.get('staff', ''),
+        'date_from': request.GET.get('date_from', ''),
+        'date_to': request.GET.get('date_to', ''),
+        'min_minutes': request.GET.get('min_minutes', ''),
+        'max_minutes': request.GET.get('max_minutes', ''),
+        'sort': request.GET.get('sort', 'newest'),
+        'staff_users': User.objects.filter(created_activities__activity_type='call').distinct().order_by('username'),
+        'filter_query': filter_params.urlencode(),
+        'total_recordings': paginator.count,
+        # Talk time is a single aggregate over the indexed duration column
+        'total_duration': format_duration(call_activities.aggregate(total=Sum('recording_duration'))['total']),
     }
     return render(request, 'leads/call_recordings.html', context)
 
+@login_required
+def call_recordings_download_view(request: HttpRequest) -> HttpResponse:
+    """Download the filtered call recordings as one ZIP, built while it streams (Super admin only)"""
+    if not request.user.is_superuser:
+        messages.error(request, 'Access denied. This feature is only available to super administrators.')
+        return redirect('dashboard')
+    
+    call_activities = Activity.objects.filter(
+        activity_type='call',
+        recording__isnull=False
+    ).exclude(recording='').select_related('created_by')
+    call_activities = filter_call_recordings(call_activities, request.GET)
+    
+    def members():
+        used_names = set()
+        for activity in call_activities.only('id', 'recording', 'created_date', 'created_by__username').iterator(chunk_size=200):
+            # One folder per staff member; recording names are unique within storage
+            arcname = f"{activity.created_by.username}/{os.path.basename(activity.recording.name)}"
+            if arcname in used_names:
+                arcname = f"{activity.created_by.username}/{activity.id}_{os.path.basename(activity.recording.name)}"
+            used_names.add(arcname)
+            created = activity.get_ist_created_date()
+            yield arcname, created.timetuple()[:6], partial(activity.recording.storage.open, activity.recording.name, 'rb')
+    
+    filename = f"call-recordings-{timezone.localtime().strftime('%Y%m%d-%H%M')}.zip"
+    response = StreamingHttpResponse(iter_zip(members()), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+def iter_file_range(fileobj, start, length, chunk_size=256 * 1024):
+    """Yield length bytes of fileobj from start, closing it afterwards"""
+    try:
+        fileobj.seek(start)
+        while length > 0:
+            chunk = fileobj.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fileobj.close()
+
+def can_hear_recording(user, manager_id, caller_id) -> bool:
+    """Superusers (as on the call recordings page), the lead's manager and whoever logged the call"""
+    return user.is_superuser or user.pk in (manager_id, caller_id)
+
+@login_required
+def recording_file_view(request: HttpRequest, name: str) -> HttpResponse:
+    """Serve a call recording (raw or archived) with Range support so players can seek"""
+    fields = ('id', 'recording', 'created_by_id', 'lead__lead_manager_id')
+    activity = (
+        Activity.objects.filter(recording=name).select_related('lead').only(*fields).first()
+        # Recordings of archived leads stay playable
+        or ArchivedActivity.objects.filter(recording=name).select_related('lead').only(*fields).first()
+    )
+    if activity is None:
+        raise Http404('Recording not found.')
+    if not can_hear_recording(request.user, activity.lead.lead_manager_id, activity.created_by_id):
+        raise PermissionDenied
+    try:
+        recording = activity.recording.storage.open(name, 'rb')
+    except FileNotFoundError:
+        raise Http404('Recording not found.')
+    
+    size = recording.size
+    start, end, status = 0, size - 1, 200
+    byte_range = re.fullmatch(r'bytes=(\d*)-(\d*)', request.headers.get('Range', ''))
+    if byte_range and any(byte_range.groups()):
+        first, last = byte_range.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(last))
+        if start > end:
+            recording.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        status = 206
+    
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    response = StreamingHttpResponse(
+        iter_file_range(recording, start, end - start + 1), status=status, content_type=content_type
+    )
+    response['Content-Length'] = str(max(0, end - start + 1))
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=86400'
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
 @login_required
 @require_POST
 def postpone_task(request: HttpRequest, activity_id: int) -> JsonResponse:
     """Postpone a task by updating its due date"""
     try:
-        activity = get_object_or_404(Activity, id=activity_id, activity_type='task')
+        activity = get_object_or_404(Activity.objects.select_related('lead'), id=activity_id, activity_type='task')
         
-        new_due_date_str = request.POST.get('new_due_date')
-        if not new_due_date_str:
-            return JsonResponse({'success': False, 'error': 'New due date is required.'})
+        new_due_date, error = parse_new_due_date(request.POST)
+        if error:
+            return failure(error)
         
-        try:
-            # Parse the datetime string (assuming it's in IST)
-            new_due_date = datetime.fromisoformat(new_due_date_str.replace('T', ' '))
-            # Convert to UTC for storage
-            ist = pytz.timezone('Asia/Kolkata')
-            new_due_date = ist.localize(new_due_date).astimezone(pytz.UTC)
-            
-            old_due_date = activity.get_ist_due_date()
-            activity.due_date = new_due_date
-            activity.save()
-            
-            return JsonResponse({
-                'success': True,
-                'message': f'Task due date updated successfully!',
-                'old_date': old_due_date.strftime('%b %d, %Y %I:%M %p') if old_due_date else 'Not set',
-                'new_date': activity.get_ist_due_date().strftime('%b %d, %Y %I:%M %p')
-            })
-            
-        except ValueError:
-            return JsonResponse({'success': False, 'error': 'Invalid date format.'})
+        old_due_date = activity.get_ist_due_date()
+        before = task_state(activity)
+        activity.due_date = new_due_date
+        activity.save()
+        record_task_change(activity, before)
+        return task_postponed(activity, old_due_date)
         
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
+        return failure(str(e))
+
+@login_required
+def profiles_view(request: HttpRequest) -> HttpResponse:
+    """Slowest profiled endpoints and their top functions (Super admin only)"""
+    if not request.user.is_superuser:
+        messages.error(request, 'Access denied. This feature is only available to super administrators.')
+        return redirect('dashboard')
+    
+    if request.method == 'POST':
+        removed = clear_profiles()
+        messages.success(request, f'Cleared {removed} profile file(s).')
+        return redirect('leads:profiles')
+    
+    endpoints = endpoint_summaries()
+    for endpoint in endpoints:
+        endpoint['last_time'] = datetime.fromtimestamp(endpoint['last_time'], tz=IST)
+    
+    context = {
+        'title': 'Profiles',
+        'endpoints': endpoints,
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'profiling_root': settings.PROFILING_ROOT,
+    }
+    return render(request, 'leads/profiles.html', context)
+
+@login_required
+def profile_folded_view(request: HttpRequest, stem: str) -> HttpResponse:
+    """Download one endpoint's merged collapsed stacks for a flame graph tool (Super admin only)"""
+    if not request.user.is_superuser:
+        raise Http404
+    
+    endpoint = next((endpoint for endpoint in endpoint_summaries(functions=0) if endpoint['stem'] == stem), None)
+    if endpoint is None:
+        raise Http404
+    stacks = merged_stacks(endpoint['view'])
+    response = HttpResponse(''.join(f'{stack} {count}\n' for stack, count in stacks.items()), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{stem}.folded"'
+    return response
+
+@login_required
+def search_view(request: HttpRequest) -> HttpResponse:
+    """Full-text search over lead notes, activity descriptions and task notes"""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    per_page = 20
+    
+    started = time.perf_counter()
+    results = search(query, limit=per_page, offset=(page - 1) * per_page) if query else []
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    
+    context = {
+        'title': 'Search',
+        'query': query,
+        'results': results[:per_page],
+        'page': page,
+        'has_previous': page > 1,
+        'has_next': len(results) > per_page,
+        'elapsed_ms': elapsed_ms,
+    }
+    return render(request, 'leads/search.html', context)
@@ -0,0 +1,68 @@
+"""
+ZIP archives generated on the fly for streaming responses.
+
+``zipfile`` can write to an unseekable stream: it then emits a data descriptor
+after each member instead of seeking back to patch the local header. The
+sink below only buffers what zipfile wrote since the last chunk was handed
+to the response, so memory stays at about one read chunk however large the
+archive gets. Members are stored, not deflated: recordings are already
+compressed audio, and CRC32 is the only per-byte work left.
+"""
+import zipfile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ZipStreamSink:
+    """Write-only, unseekable file object that zipfile writes into"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Everything written since the last drain"""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip(members):
+    """
+    Yield a ZIP archive chunk by chunk.
+
+    ``members`` yields (arcname, date_time tuple, opener) where opener returns
+    an open binary file object with a ``size``; members whose file cannot be
+    opened are left out.
+    """
+    sink = ZipStreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, date_time, opener in members:
+            try:
+                source = opener()
+            except FileNotFoundError:
+                continue
+            with source:
+                info = zipfile.ZipInfo(arcname, date_time=date_time)
+                info.compress_type = zipfile.ZIP_STORED
+                # A known size lets zipfile decide on ZIP64 headers up front
+                info.file_size = source.size
+                with archive.open(info, 'w') as target:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                        target.write(chunk)
+                        yield sink.drain()
+            # Data descriptor written when the member was closed
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
@@ -0,0 +1,130 @@
+/**
+ * Product name autocomplete for the lead product entry forms.
+ *
+ * Works on every input named product_name_<category>_<index>, including the
+ * ones added later by "Add Another Product". Picking a suggestion fills the
+ * name, and the price and URL inputs of the same row when they are empty or
+ * still hold an earlier suggestion's values.
+ */
+(function () {
+  'use strict';
+
+  const endpoint = document.currentScript.dataset.url;
+  const NAME = /^product_name_(\d+)_(\d+)$/;
+  const responses = new Map();
+  let menu = null;
+  let active = null; // { input, results, selected }
+  let timer = null;
+  let pending = null;
+
+  function fieldOf(input, kind) {
+    const [, category, index] = input.name.match(NAME);
+    return input.form.querySelector(`[name="product_${kind}_${category}_${index}"]`);
+  }
+
+  function close() {
+    if (menu) menu.remove();
+    menu = null;
+    active = null;
+  }
+
+  function fill(input, result) {
+    input.value = result.name;
+    for (const kind of ['price', 'url']) {
+      const field = fieldOf(input, kind);
+      if (field && result[kind] && (!field.value || field.dataset.autofilled === field.value)) {
+        field.value = result[kind];
+        field.dataset.autofilled = result[kind];
+      }
+    }
+    close();
+  }
+
+  function highlight(selected) {
+    active.selected = selected;
+    menu.querySelectorAll('.dropdown-item').forEach((item, i) => item.classList.toggle('active', i === selected));
+  }
+
+  function show(input, results) {
+    close();
+    if (!results.length || document.activeElement !== input) return;
+    menu = document.createElement('div');
+    menu.className = 'dropdown-menu show w-100';
+    menu.style.maxHeight = '16rem';
+    menu.style.overflowY = 'auto';
+    results.forEach((result, i) => {
+      const item = document.createElement('button');
+      item.type = 'button';
+      item.className = 'dropdown-item d-flex justify-content-between gap-3';
+      const name = document.createElement('span');
+      name.textContent = result.name;
+      const detail = document.createElement('small');
+      detail.className = 'text-muted';
+      detail.textContent = result.price ? `₹ ${result.price}` : (result.source === 'catalog' ? 'Catalog' : 'Used before');
+      item.append(name, detail);
+      // mousedown fires before the input's blur closes the menu
+      item.addEventListener('mousedown', (event) => {
+        event.preventDefault();
+        fill(input, result);
+      });
+      item.addEventListener('mouseenter', () => highlight(i));
+      menu.appendChild(item);
+    });
+    input.parentElement.classList.add('position-relative');
+    input.insertAdjacentElement('afterend', menu);
+    active = { input, results, selected: -1 };
+  }
+
+  function query(input) {
+    const category = input.name.match(NAME)[1];
+    const key = `${category}\u0000${input.value.trim().toLowerCase()}`;
+    if (responses.has(key)) {
+      show(input, responses.get(key));
+      return;
+    }
+    if (pending) pending.abort();
+    pending = new AbortController();
+    const params = new URLSearchParams({ category, q: input.value.trim() });
+    fetch(`${endpoint}?${params}`, { signal: pending.signal, headers: { Accept: 'application/json' } })
+      .then((response) => (response.ok ? response.json() : { results: [] }))
+      .then((data) => {
+        responses.set(key, data.results);
+        show(input, data.results);
+      })
+      .catch((error) => {
+        if (error.name !== 'AbortError') close();
+      });
+  }
+
+  document.addEventListener('input', (event) => {
+    const input = event.target;
+    if (!(input instanceof HTMLInputElement) || !NAME.test(input.name)) return;
+    clearTimeout(timer);
+    timer = setTimeout(() => query(input), 120);
+  });
+
+  document.addEventListener('focusin', (event) => {
+    const input = event.target;
+    if (input instanceof HTMLInputElement && NAME.test(input.name) && !input.value) query(input);
+  });
+
+  document.addEventListener('focusout', (event) => {
+    if (active && event.target === active.input) close();
+  });
+
+  document.addEventListener('keydown', (event) => {
+    if (!active || event.target !== active.input) return;
+    const count = active.results.length;
+    if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+      event.preventDefault();
+      const down = event.key === 'ArrowDown';
+      if (active.selected < 0) highlight(down ? 0 : count - 1);
+      else highlight((active.selected + (down ? 1 : -1) + count) % count);
+    } else if (event.key === 'Enter' && active.selected >= 0) {
+      event.preventDefault();
+      fill(active.input, active.results[active.selected]);
+    } else if (event.key === 'Escape') {
+      close();
+    }
+  });
+})();
@@ -0,0 +1,333 @@
+"""
+Static asset bundles.
+
+``manage.py build_bundles`` concatenates the stylesheets and scripts that
+base.html (and the login page) load on every page into a few bundles, minifies
+them and writes them under ``static/bundles/`` with content-hashed names:
+
+- ``base.css``: boxicons, core, theme, demo and perfect-scrollbar CSS. The
+  boxicons rules are cut down to the icons the templates and our own scripts
+  use, and the icon font to those glyphs when ``fontTools`` is installed.
+- ``head.js`` (helpers and config, which must run before the first paint) and
+  ``base.js`` (jQuery, Popper, Bootstrap, perfect-scrollbar, menu and main).
+  The vendor scripts are webpack development builds; their eval()-wrapped
+  modules and inline source maps are unwrapped before ``rjsmin`` (optional)
+  minifies them.
+- ``critical.css``: the ``base.css`` rules whose selectors only use names that
+  appear in the templates or our scripts. It is inlined into the page, so the
+  first paint waits for no stylesheet; the full bundle then loads without
+  blocking rendering.
+
+The build writes ``static/bundles/bundles.json``. The ``{% bundle_css %}`` and
+``{% bundle_js %}`` tags read it, and emit the individual source files instead
+when ASSET_BUNDLES is off (development) or nothing has been built.
+"""
+import hashlib
+import json
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # optional: without it the full icon font is used
+    font_subset = None
+
+try:
+    import rjsmin
+except ImportError:  # optional: without it scripts are only unwrapped (see unwrap_webpack_eval)
+    rjsmin = None
+
+BUNDLES = {
+    'base.css': [
+        'assets/vendor/fonts/boxicons.css',
+        'assets/vendor/css/core.css',
+        'assets/vendor/css/theme-default.css',
+        'assets/css/demo.css',
+        'assets/vendor/libs/perfect-scrollbar/perfect-scrollbar.css',
+    ],
+    'head.js': [
+        'assets/vendor/js/helpers.js',
+        'assets/js/config.js',
+    ],
+    'base.js': [
+        'assets/vendor/libs/jquery/jquery.js',
+        'assets/vendor/libs/popper/popper.js',
+        'assets/vendor/js/bootstrap.js',
+        'assets/vendor/libs/perfect-scrollbar/perfect-scrollbar.js',
+        'assets/vendor/js/menu.js',
+        'assets/js/main.js',
+    ],
+}
+BOXICONS_CSS = 'assets/vendor/fonts/boxicons.css'
+BOXICONS_FONT_DIR = 'assets/vendor/fonts/boxicons'
+BUNDLE_DIR = 'bundles'
+MANIFEST_NAME = f'{BUNDLE_DIR}/bundles.json'
+# Our own scripts, scanned with the templates for class names and icons
+PROJECT_SCRIPTS = ['assets/js/main.js', 'assets/js/config.js']
+
+
+def output_root():
+    """The static/ source directory the bundles are written to"""
+    return Path(settings.STATICFILES_DIRS[0])
+
+
+def read_static(path):
+    found = finders.find(path)
+    if found is None:
+        raise FileNotFoundError(f'Static file {path} not found')
+    return Path(found).read_text(encoding='utf-8')
+
+
+def content_name(name, content):
+    """'bundles/base.<hash>.css' for a bundle name and its content"""
+    stem, ext = posixpath.splitext(name)
+    digest = hashlib.sha256(content if isinstance(content, bytes) else content.encode()).hexdigest()[:12]
+    return f'{BUNDLE_DIR}/{stem}.{digest}{ext}'
+
+
+# CSS ------------------------------------------------------------------------
+
+CSS_TOKENS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)''', re.S)
+CSS_STRINGS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+CSS_URL = re.compile(r'''url\(\s*(["']?)([^"')]+)\1\s*\)''')
+
+
+def minify_css(css):
+    """Drop comments and redundant whitespace; strings are left untouched"""
+    css = CSS_TOKENS.sub(lambda m: m.group(1) or ('' if m.group(2) else ' '), css)
+    parts = CSS_STRINGS.split(css)
+    for i in range(0, len(parts), 2):
+        part = re.sub(r'\s*([{};,])\s*', r'\1', parts[i])
+        # Spaces before ':' matter in selectors (".a :hover"), after it they never do
+        parts[i] = re.sub(r':\s+', ':', part).replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def rebase_urls(css, source, target):
+    """Rewrite relative url()s in CSS moved from static path source to static path target"""
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        absolute = posixpath.normpath(posixpath.join(posixpath.dirname(source), url))
+        return f'url({quote}{posixpath.relpath(absolute, posixpath.dirname(target))}{quote})'
+    return CSS_URL.sub(rebase, css)
+
+
+def css_blocks(css):
+    """(prelude, body) for each top-level block of minified CSS; body is None for ';' statements"""
+    depth = start = body_start = 0
+    prelude = ''
+    i, n = 0, len(css)
+    while i < n:
+        c = css[i]
+        if c in '"\'':
+            i += 1
+            while i < n and css[i] != c:
+                i += 2 if css[i] == '\\' else 1
+        elif c == '{':
+            if depth == 0:
+                prelude, body_start = css[start:i], i + 1
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                yield prelude.strip(), css[body_start:i]
+                start = i + 1
+        elif c == ';' and depth == 0:
+            yield css[start:i].strip(), None
+            start = i + 1
+        i += 1
+
+
+SELECTOR_NOISE = re.compile(r'\[[^\]]*\]|::?[\w-]+(?:\([^)]*\))?|\\.')
+SELECTOR_NAMES = re.compile(r'([.#]?)(-?[_a-zA-Z][\w-]*)')
+
+
+def selector_used(selector, names):
+    """Whether every class, id and element in a selector is one of names (pseudo-classes and attributes ignored)"""
+    return all(name in names for _, name in SELECTOR_NAMES.findall(SELECTOR_NOISE.sub('', selector)))
+
+
+def purge_css(css, names, keep_at_rules=('@font-face',)):
+    """The rules of minified CSS with at least one selector made only of names; nested @media/@supports are filtered too"""
+    kept = []
+    for prelude, body in css_blocks(css):
+        if body is None:
+            continue
+        if prelude.startswith('@'):
+            if prelude.startswith(('@media', '@supports')):
+                inner = purge_css(body, names, keep_at_rules)
+                if inner:
+                    kept.append(f'{prelude}{{{inner}}}')
+            elif prelude.startswith(keep_at_rules):
+                kept.append(f'{prelude}{{{body}}}')
+            continue
+        selectors = [selector for selector in prelude.split(',') if selector_used(selector, names)]
+        if selectors:
+            kept.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(kept)
+
+
+# JS -------------------------------------------------------------------------
+
+# Inline source map and sourceURL comments webpack appends to each eval'd module
+WEBPACK_EVAL_TRAILER = re.compile(r'\n//# source(?:MappingURL=data:|URL=webpack-internal:)[^\n]*')
+
+
+def unwrap_webpack_eval(source):
+    """
+    Inline the module bodies of a webpack ``eval-source-map`` development build.
+
+    The theme's vendor scripts are such builds: every module is a JSON string
+    passed to eval() with a base64 source map attached, about 60% of the file,
+    and no minifier can look inside a string. Each module's code replaces its
+    eval() call, which runs it in the same function scope, without the map.
+    """
+    decoder = json.JSONDecoder()
+    out, i = [], 0
+    while (start := source.find('eval("', i)) != -1:
+        code, end = decoder.raw_decode(source, start + len('eval('))
+        if not source.startswith(')', end) or 'sourceURL=webpack-internal:' not in code:
+            out.append(source[i:end])
+            i = end
+            continue
+        out.append(source[i:start])
+        out.append(WEBPACK_EVAL_TRAILER.sub('', code))
+        i = end + 1
+    out.append(source[i:])
+    return ''.join(out)
+
+
+def minify_js(source):
+    """Unwrapped webpack modules, minified by rjsmin when it is installed; license comments are kept"""
+    source = unwrap_webpack_eval(source)
+    return rjsmin.jsmin(source, keep_bang_comments=True) if rjsmin is not None else source
+
+
+# Build ----------------------------------------------------------------------
+
+def template_files():
+    """Our own templates (not the admin's)"""
+    dirs = [Path(d) for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    dirs += [Path(settings.BASE_DIR) / app / 'templates' for app in ('leads', 'users')]
+    return sorted(path for d in dirs if d.exists() for path in d.rglob('*.html'))
+
+
+def used_names():
+    """Every word that appears in the templates or our scripts: a superset of the classes, ids and elements in use"""
+    names = set()
+    texts = [path.read_text(encoding='utf-8') for path in template_files()]
+    texts += [read_static(path) for path in PROJECT_SCRIPTS]
+    for text in texts:
+        names.update(re.findall(r'[A-Za-z_][\w-]*', text))
+    return names
+
+
+def subset_boxicons(css, names):
+    """(boxicons CSS without unused icon rules, code points of the icons kept)"""
+    kept, codepoints = [], set()
+    for prelude, body in css_blocks(css):
+        if body is None or prelude.startswith('@font-face'):
+            continue
+        block = f'{prelude}{{{body}}}'
+        icons = re.findall(r'\.(bx[sl]?-[\w-]+)::?before', prelude)
+        if icons:
+            selectors = [s for s, icon in zip(prelude.split(','), icons) if icon in names]
+            if not selectors:
+                continue
+            block = f'{",".join(selectors)}{{{body}}}'
+            codepoints.update(int(code, 16) for code in re.findall(r'content:"\\([0-9a-fA-F]+)"', body))
+        kept.append(block)
+    return ''.join(kept), codepoints
+
+
+def boxicons_font_face(codepoints, written):
+    """@font-face for the icon font: a subset of it written to the bundles when fontTools is available"""
+    sources = []
+    ttf = finders.find(f'{BOXICONS_FONT_DIR}/boxicons.ttf')
+    if font_subset is not None and ttf and codepoints:
+        flavors = [('woff', 'woff')]
+        try:
+            import brotli  # noqa: F401  (fontTools needs it for woff2)
+            flavors.insert(0, ('woff2', 'woff2'))
+        except ImportError:
+            pass
+        for flavor, fmt in flavors:
+            options = font_subset.Options()
+            options.flavor = flavor
+            options.layout_features = ['*']
+            font = font_subset.load_font(ttf, options)
+            subsetter = font_subset.Subsetter(options)
+            subsetter.populate(unicodes=sorted(codepoints))
+            subsetter.subset(font)
+            path = output_root() / BUNDLE_DIR / f'boxicons.subset.{flavor}'
+            font_subset.save_font(font, path, options)
+            data = path.read_bytes()
+            name = content_name(f'boxicons.{flavor}', data)
+            path.rename(output_root() / name)
+            written.append(name)
+            sources.append(f'url({posixpath.basename(name)}) format("{fmt}")')
+    else:
+        for flavor, fmt in (('woff2', 'woff2'), ('woff', 'woff'), ('ttf', 'truetype')):
+            font = f'{BOXICONS_FONT_DIR}/boxicons.{flavor}'
+            if finders.find(font):
+                sources.append(f'url({posixpath.relpath(font, BUNDLE_DIR)}) format("{fmt}")')
+    return f'@font-face{{font-family:"boxicons";font-weight:normal;font-style:normal;font-display:block;src:{",".join(sources)}}}'
+
+
+def build_bundles(minify=True, critical=True, log=print):
+    """Write every bundle and bundles.json; returns the manifest"""
+    root = output_root() / BUNDLE_DIR
+    root.mkdir(parents=True, exist_ok=True)
+    names = used_names()
+    written = []
+    manifest = {'bundles': {}, 'critical': {}, 'sources': BUNDLES}
+    if minify and rjsmin is None:
+        log('  scripts are unwrapped but not minified (install rjsmin to minify them too)')
+
+    for bundle, sources in BUNDLES.items():
+        target = f'{BUNDLE_DIR}/{bundle}'
+        parts = []
+        for source in sources:
+            text = read_static(source)
+            if bundle.endswith('.css'):
+                text = minify_css(text)
+                if source == BOXICONS_CSS:
+                    text, codepoints = subset_boxicons(text, names)
+                    text = boxicons_font_face(codepoints, written) + text
+                    log(f'  boxicons: {len(codepoints)} icon(s) kept{"" if font_subset else " (install fonttools to subset the font too)"}')
+                else:
+                    text = rebase_urls(text, source, target)
+                if not minify:
+                    text = text.replace('}', '}\n')
+            elif minify:
+                text = minify_js(text)
+            parts.append(f'/* {source} */\n{text}' if not minify else text)
+        # A newline (and ';' for scripts) keeps one file's last statement from running into the next
+        content = ('\n' if bundle.endswith('.css') else ';\n').join(parts) + '\n'
+        name = content_name(bundle, content)
+        (output_root() / name).write_text(content, encoding='utf-8')
+        written.append(name)
+        manifest['bundles'][bundle] = name
+        log(f'  {name}: {sum(len(read_static(s).encode()) for s in sources)} -> {len(content.encode())} bytes')
+
+        if critical and bundle.endswith('.css'):
+            critical_css = purge_css(content, names)
+            stem = posixpath.splitext(bundle)[0]
+            name = content_name(f'{stem}.critical.css', critical_css)
+            (output_root() / name).write_text(critical_css, encoding='utf-8')
+            written.append(name)
+            manifest['critical'][stem] = name
+            log(f'  {name}: {len(critical_css.encode())} bytes inlined')
+
+    (output_root() / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2) + '\n', encoding='utf-8')
+    # Bundles of earlier builds
+    for path in root.iterdir():
+        if path.is_file() and f'{BUNDLE_DIR}/{path.name}' not in written and path.name != posixpath.basename(MANIFEST_NAME):
+            path.unlink()
+    return manifest
@@ -0,0 +1,59 @@
+"""
+Jinja2 environment for the optional Jinja2 template backend.
+
+Only the row partials of the busiest list pages (``leads/_lead_rows.html``,
+``leads/_task_board.html``) and the task rows of the digest emails
+(``leads/email/_task_digest_task.*``, see ``leads/digests.py``) are rendered
+with Jinja2. They are kept once, as Django templates under
+``<app>/templates/``, written in the syntax both engines share: plain
+``{{ value }}`` lookups, ``{% if %}``/``{% else %}`` and ``{% for %}``, with
+no filters, ``{% empty %}`` or other engine-specific tags. The Jinja2 loader
+falls back to those directories, so ``<app>/jinja2/`` only holds a template
+that cannot be shared (the plain-text digest row, which turns autoescaping
+off with a different tag in each engine).
+The pages themselves, and ``base.html``, stay Django templates and pull the
+partials in with ``{% render_partial %}``, which picks the engine named by
+LIST_TEMPLATE_ENGINE. Jinja2 compiles templates to Python code, so a loop over
+thousands of rows avoids most of the per-node overhead of Django templates;
+compiled templates are also cached as bytecode on disk, so new worker
+processes skip the compile step.
+
+The environment offers the few Django helpers the partials need: ``url()``,
+``static()`` and the ``date``/``time`` filters with Django's format strings.
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.template.utils import get_app_template_dirs
+from django.urls import reverse
+from django.utils.timezone import template_localtime
+from jinja2 import ChoiceLoader, Environment, FileSystemBytecodeCache, FileSystemLoader
+
+
+def url(viewname, *args, **kwargs):
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def date(value, arg=None):
+    """Django's |date filter, including its conversion to the current time zone"""
+    return defaultfilters.date(template_localtime(value), arg)
+
+
+def time(value, arg=None):
+    """Django's |time filter, including its conversion to the current time zone"""
+    return defaultfilters.time(template_localtime(value), arg)
+
+
+def environment(**options):
+    if settings.JINJA2_BYTECODE_CACHE_DIR:
+        cache_dir = Path(settings.JINJA2_BYTECODE_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        options.setdefault('bytecode_cache', FileSystemBytecodeCache(str(cache_dir)))
+    # Shared partials are read from the Django template directories (see above)
+    options['loader'] = ChoiceLoader([options['loader'], FileSystemLoader(get_app_template_dirs('templates'))])
+    env = Environment(**options)
+    env.globals.update(url=url, static=static)
+    env.filters.update(date=date, time=time)
+    return env
@@ -10,8 +10,14 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
+# Optional: without it every template is rendered by Django. Looked up rather
+# than imported so that loading settings does not pay for importing Jinja2
+JINJA2_INSTALLED = find_spec('jinja2') is not None
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,14 +46,17 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'users',
     'leads',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'theopendecor.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'leads.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,13 +73,34 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'leads.context_processors.task_counts',
             ],
         },
     },
 ]
+if JINJA2_INSTALLED:
+    # Renders the list page row partials, shared with the Django engine (see theopendecor/jinja_env.py)
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'theopendecor.jinja_env.environment',
+        },
+    })
+# Engine that renders the row partials of the lead list and task board, and the
+# task rows of the digest emails: 'jinja2' (when installed) or 'django'
+LIST_TEMPLATE_ENGINE = os.environ.get('LIST_TEMPLATE_ENGINE', 'jinja2' if JINJA2_INSTALLED else 'django')
+# Compiled Jinja2 templates are cached here so new processes skip compiling them
+JINJA2_BYTECODE_CACHE_DIR = BASE_DIR / '.jinja2-cache'
 
 WSGI_APPLICATION = 'theopendecor.wsgi.application'
 
+# Startup (see theopendecor/warmup.py)
+# Prime URL, template, translation and static manifest caches when the WSGI/ASGI
+# application is loaded, so the first request a worker serves is not the slow one
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '0' if DEBUG else '1') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -122,10 +152,34 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Content-hashed names plus pre-built .gz/.br variants, written by collectstatic
+# (see theopendecor/staticfiles.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'theopendecor.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+# Serve STATIC_ROOT from StaticFilesMiddleware; runserver serves static files itself when DEBUG is on
+STATICFILES_SERVE = not DEBUG
+# Browser cache lifetime in seconds for unhashed static names (hashed names are cached for a year)
+STATICFILES_MAX_AGE = 60
+# STATIC_ROOT directories StaticFilesMiddleware never serves: uploads that were
+# collected while MEDIA_ROOT was still inside static/
+STATICFILES_EXCLUDE = ['Call Recordings']
+# Load the CSS/JS bundles written by `manage.py build_bundles` instead of the
+# individual vendor files (see theopendecor/bundles.py); run it before collectstatic
+ASSET_BUNDLES = not DEBUG
 
 # Media files (for file uploads)
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'static'
+# Outside STATICFILES_DIRS, so collectstatic never copies uploads (call
+# recordings) into STATIC_ROOT where StaticFilesMiddleware would serve them.
+# When upgrading, move existing recordings out of static/Call Recordings/
+# with `manage.py move_legacy_recordings`.
+MEDIA_ROOT = Path(os.environ.get('MEDIA_ROOT', BASE_DIR / 'media'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -136,3 +190,107 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Email
+# Printed to the console in development; set EMAIL_BACKEND and the EMAIL_HOST_*
+# variables to send through SMTP
+EMAIL_BACKEND = os.environ.get(
+    'EMAIL_BACKEND',
+    'django.core.mail.backends.console.EmailBackend' if DEBUG else 'django.core.mail.backends.smtp.EmailBackend',
+)
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '0') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+# Scheme and host that links in emails point at
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
+
+# Task digests (run daily with `manage.py send_task_digests`; see leads/digests.py)
+# Besides overdue and today's tasks, list those due in this many following days
+TASK_DIGEST_UPCOMING_DAYS = 3
+# Tasks listed per section; the rest are counted
+TASK_DIGEST_MAX_TASKS = 20
+
+# Lead ingestion webhook
+# Bearer tokens accepted by /leads/ingest/, mapped to the integration name
+# that becomes the default lead source. Set as "token:source,token:source".
+LEAD_INGEST_TOKENS = dict(
+    entry.split(':', 1) for entry in os.environ.get('LEAD_INGEST_TOKENS', '').split(',') if ':' in entry
+)
+# Maximum number of leads accepted in a single webhook request
+LEAD_INGEST_MAX_BATCH = 10000
+# Maximum webhook body size; larger than DATA_UPLOAD_MAX_MEMORY_SIZE so full bursts fit
+LEAD_INGEST_MAX_BYTES = 20 * 1024 * 1024
+
+# Background jobs (run with `manage.py run_workers`)
+# Attempts before a failing job is marked failed
+JOBS_MAX_ATTEMPTS = 5
+# Retry backoff: JOBS_BACKOFF_BASE * 2**(attempt-1) seconds, capped at JOBS_BACKOFF_MAX
+JOBS_BACKOFF_BASE = 10
+JOBS_BACKOFF_MAX = 3600
+# Seconds a running job may hold its lock before it is assumed dead and requeued
+JOBS_LOCK_TIMEOUT = 600
+
+# Call recording archive (run with `manage.py archive_recordings`)
+# Pack files live outside MEDIA_ROOT so they are never served directly
+RECORDING_ARCHIVE_ROOT = Path(os.environ.get('RECORDING_ARCHIVE_ROOT', BASE_DIR / 'recording_archive'))
+# Recordings older than this many days are archived
+RECORDING_ARCHIVE_AFTER_DAYS = 90
+# Recordings on leads in these stages are archived regardless of age
+RECORDING_ARCHIVE_STAGES = ['delivered', 'not_fit']
+# Start a new pack file once the current one reaches this size
+RECORDING_ARCHIVE_PACK_SIZE = 1024 * 1024 * 1024
+
+# Navigation task badges: longest time a cached per-user count is trusted
+# before it is recomputed (entries also expire when a task turns overdue)
+TASK_COUNTS_TTL = 60
+
+# Duplicate lead detection (batch scan with `manage.py find_duplicate_leads`)
+# Phone/email/name keys shared by more leads than this are treated as
+# placeholders and never used to link leads
+DEDUP_MAX_BLOCK_SIZE = 50
+
+# Pincode territories (see leads/territories.py)
+# CSV of prefix,city,region rows; after changing it, recompute the leads'
+# territories with `manage.py backfill_territories`
+PINCODE_TERRITORIES_FILE = Path(os.environ.get('PINCODE_TERRITORIES_FILE', BASE_DIR / 'leads' / 'data' / 'pincode_territories.csv'))
+
+# Lead assignment (see leads/assignment.py)
+# How new leads are spread over managers with a ManagerCapacity entry:
+# 'round_robin', 'weighted' (by capacity weight) or 'least_loaded'
+LEAD_ASSIGNMENT_STRATEGY = 'round_robin'
+# Leads in these stages no longer count towards a manager's open leads
+LEAD_CLOSED_STAGES = ['delivered', 'not_fit']
+
+# Lead archive (run with `manage.py archive_leads`; see leads/archive.py)
+# Leads with one of these statuses or stages are archived once untouched,
+# and without activity, for LEAD_ARCHIVE_AFTER_DAYS days and with no open tasks
+LEAD_ARCHIVE_STATUSES = ['inactive']
+LEAD_ARCHIVE_STAGES = ['delivered', 'not_fit']
+LEAD_ARCHIVE_AFTER_DAYS = 180
+
+# Product autocomplete (see leads/catalog.py)
+# Seconds an in-memory product index is used before it is reloaded (it is also
+# reloaded as soon as a product is saved or deleted)
+CATALOG_INDEX_TTL = 300
+# Seconds after a lead's products are saved before the names used on leads are
+# recollected (by a background job; saves in between share one rebuild)
+CATALOG_HISTORY_DELAY = 60
+
+# Saved lead views (see leads/saved_views.py)
+# Cached results are patched with the leads changed since they were last
+# opened, and rebuilt from scratch at most this many seconds apart
+SAVED_VIEW_REBUILD_AFTER = 3600
+
+# Request profiling (see leads/profiling.py)
+# Fraction of requests profiled; superusers can also profile any request by
+# sending the header "X-Profile: 1"
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+# Seconds between stack samples of a profiled request
+PROFILING_INTERVAL = 0.005
+# Collapsed-stack (flame graph) files and request logs, one pair per URL name
+PROFILING_ROOT = Path(os.environ.get('PROFILING_ROOT', BASE_DIR / 'profiles'))
+# Most recent profiled requests per URL name summarised on the Profiles page
+PROFILING_MAX_RECORDS = 1000
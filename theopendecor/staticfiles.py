@@ -0,0 +1,237 @@
+"""
+Static file storage and serving for production.
+
+``CompressedManifestStaticFilesStorage`` gives every collected file a
+content-hashed name (``core.3f2a9c1b7d4e.css``) and writes pre-built ``.gz``
+and, when the optional ``brotli`` package is installed, ``.br`` variants of
+text assets next to it at ``collectstatic`` time, so requests never compress
+anything.
+
+``StaticFilesMiddleware`` serves STATIC_URL from STATIC_ROOT when DEBUG is off
+(runserver serves static files itself in development). It picks the smallest
+variant the client's Accept-Encoding allows, and answers If-None-Match with
+304. Hashed names are sent with ``Cache-Control: immutable`` and a one year
+lifetime, so repeat page loads fetch no static bytes at all; unhashed names
+get a short lifetime and are revalidated by ETag. Files are memory-mapped
+once per process and served from the page cache; a file whose mtime or size
+changed (a later collectstatic) is mapped again on its next request. Uploads are never served:
+nothing under MEDIA_ROOT or the STATICFILES_EXCLUDE directories of STATIC_ROOT
+(call recordings collected while MEDIA_ROOT was still inside static/).
+"""
+import gzip
+import mimetypes
+import mmap
+import os
+import posixpath
+import threading
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are written
+    brotli = None
+
+# Binary formats (images, woff/woff2 fonts, audio) are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico', '.ttf', '.eot', '.otf'}
+# Variants that do not save at least this fraction of the size are not written
+MIN_SAVING = 0.05
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]  # in order of preference
+
+
+def compressors():
+    """(encoding, file suffix, compress function) for every available encoding"""
+    available = [('gzip', '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        available.insert(0, ('br', '.br', lambda data: brotli.compress(data, quality=11)))
+    return available
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest (content-hashed) storage that also writes .gz/.br variants of text assets"""
+
+    # Files missing from the manifest fall back to their unhashed name instead of a server error
+    manifest_strict = False
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def convert(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                # Vendor CSS refers to a few files that were never shipped; leave those references as they are
+                return matchobj.group(0)
+        return convert
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Both the original and the hashed copy are served, so both get variants
+        for name in sorted({*paths, *self.hashed_files.values()}):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                for variant in self.compress(name):
+                    yield name, variant, True
+
+    def compress(self, name):
+        """Write the compressed variants of one stored file worth having; yields their names"""
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for encoding, suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                with open(path + suffix, 'wb') as variant:
+                    variant.write(compressed)
+                yield name + suffix
+            elif os.path.exists(path + suffix):
+                # Stale variant of an earlier version of the file
+                os.remove(path + suffix)
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows (q > 0)"""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    if '*' in accepted:
+        accepted.update(encoding for encoding, _ in ENCODINGS)
+    return accepted
+
+
+class StaticAsset:
+    """One collected file and its compressed variants, memory-mapped"""
+
+    def __init__(self, path, immutable):
+        stat = path.stat()
+        self.path = path
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.content_type, _ = mimetypes.guess_type(path.name)
+        self.immutable = immutable
+        self.etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        self.variants = {None: self.map(path)}
+        for encoding, suffix in ENCODINGS:
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                self.variants[encoding] = self.map(variant)
+
+    def is_current(self):
+        """Whether the file on disk is still the one that was mapped"""
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == self.signature
+
+    @staticmethod
+    def map(path):
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            # Zero-length files cannot be mapped
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def response(self, request):
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding = next((encoding for encoding, _ in ENCODINGS if encoding in self.variants and encoding in accepted), None)
+        etag = f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            data = self.variants[encoding]
+            response = HttpResponse(b'' if request.method == 'HEAD' else memoryview(data), content_type=self.content_type or 'application/octet-stream')
+            response['Content-Length'] = len(data)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        if len(self.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        if self.immutable:
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={settings.STATICFILES_MAX_AGE}'
+        return response
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files with precompressed variants and immutable caching"""
+
+    # Async under ASGI, so async views are not pushed through a sync hop
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.STATICFILES_SERVE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.prefix = settings.STATIC_URL
+        self.root = Path(settings.STATIC_ROOT).resolve()
+        self.media_root = Path(settings.MEDIA_ROOT).resolve()
+        self.excluded = set(settings.STATICFILES_EXCLUDE)
+        # Content-hashed names from the manifest; empty when it has not been collected yet
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.assets = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        asset = self.match(request)
+        if asset is not None:
+            return asset.response(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # A stat (and an mmap on first use) costs less than a hop to a worker thread
+        asset = self.match(request)
+        if asset is not None:
+            return asset.response(request)
+        return await self.get_response(request)
+
+    def match(self, request):
+        """The StaticAsset a request asks for, or None to pass it on"""
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            return self.find(request.path_info[len(self.prefix):])
+        return None
+
+    def find(self, name):
+        """The StaticAsset for a name under STATIC_URL, or None"""
+        asset = self.assets.get(name)
+        # One stat per hit, so files rewritten by collectstatic are not served stale
+        if asset is not None and asset.is_current():
+            return asset
+        normalized = posixpath.normpath(name).lstrip('/')
+        if normalized.startswith('..') or '\x00' in normalized or normalized.endswith(('.gz', '.br')):
+            return None
+        if normalized.split('/', 1)[0] in self.excluded:
+            return None
+        path = self.root / normalized
+        if not path.is_file():
+            self.assets.pop(name, None)
+            return None
+        resolved = path.resolve()
+        if not resolved.is_relative_to(self.root) or resolved.is_relative_to(self.media_root):
+            return None
+        with self.lock:
+            # Only names that exist are cached, so probing random URLs cannot grow the cache
+            asset = self.assets.get(name)
+            if asset is None or not asset.is_current():
+                asset = self.assets[name] = StaticAsset(path, normalized in self.hashed_names)
+        return asset
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponseNotFound
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from leads.templatetags.bundles import load_manifest
+
+from .bundles import BUNDLES, build_bundles, read_static, unwrap_webpack_eval
+from .staticfiles import StaticFilesMiddleware
+
+
+class StaticFilesMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        for name in ('app.css', 'Call Recordings/call.wav', 'uploads/Call Recordings/call.wav'):
+            path = self.root / 'static' / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'body { color: red }' if name.endswith('.css') else b'RIFF')
+
+    def middleware(self, get_response=lambda request: HttpResponseNotFound(), **overrides):
+        options = {'STATICFILES_SERVE': True, 'STATIC_ROOT': self.root / 'static', 'MEDIA_ROOT': self.root / 'media', **overrides}
+        with override_settings(**options):
+            return StaticFilesMiddleware(get_response)
+
+    def get(self, middleware, path):
+        return middleware(RequestFactory().get(path))
+
+    def test_serves_collected_files(self):
+        response = self.get(self.middleware(), '/static/app.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'body { color: red }')
+
+    def test_recordings_collected_into_static_root_are_not_served(self):
+        response = self.get(self.middleware(), '/static/Call%20Recordings/call.wav')
+        self.assertEqual(response.status_code, 404)
+
+    def test_media_root_inside_static_root_is_not_served(self):
+        middleware = self.middleware(MEDIA_ROOT=self.root / 'static' / 'uploads')
+        self.assertEqual(self.get(middleware, '/static/uploads/Call%20Recordings/call.wav').status_code, 404)
+
+    def test_rewritten_file_is_mapped_again(self):
+        middleware = self.middleware()
+        first = self.get(middleware, '/static/app.css')
+        (self.root / 'static' / 'app.css').write_bytes(b'body { color: blue; margin: 0 }')
+        second = self.get(middleware, '/static/app.css')
+        self.assertEqual(second.content, b'body { color: blue; margin: 0 }')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_async_mode(self):
+        async def get_response(request):
+            return HttpResponseNotFound()
+
+        middleware = self.middleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertEqual(async_to_sync(middleware)(RequestFactory().get('/static/app.css')).status_code, 200)
+        self.assertEqual(async_to_sync(middleware)(RequestFactory().get('/leads/')).status_code, 404)
+
+
+class BundleTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = Path(tempfile.mkdtemp())
+        cls.addClassCleanup(shutil.rmtree, cls.root)
+        # Bundles are written to the first directory; sources are found in the real one
+        cls.enterClassContext(override_settings(STATICFILES_DIRS=[cls.root, *settings.STATICFILES_DIRS]))
+        cls.manifest = build_bundles(log=lambda message: None)
+
+    def test_manifest_names_are_content_hashes_of_the_written_files(self):
+        self.assertEqual(json.loads((self.root / 'bundles' / 'bundles.json').read_text()), json.loads(json.dumps(self.manifest)))
+        for bundle, name in self.manifest['bundles'].items():
+            with self.subTest(bundle=bundle):
+                digest = hashlib.sha256((self.root / name).read_bytes()).hexdigest()[:12]
+                self.assertEqual(name, f'bundles/{bundle.split(".")[0]}.{digest}.{bundle.split(".")[1]}')
+        self.assertEqual(set(self.manifest['critical']), {'base'})
+
+    def test_scripts_lose_the_inline_source_maps_of_the_vendor_builds(self):
+        for bundle in ('head.js', 'base.js'):
+            with self.subTest(bundle=bundle):
+                built = (self.root / self.manifest['bundles'][bundle]).read_text()
+                self.assertNotIn('sourceMappingURL=data:', built)
+                self.assertNotIn('eval("', built)
+                sources = sum(len(read_static(path)) for path in BUNDLES[bundle])
+                self.assertLess(len(built), sources * 0.4)
+
+    def test_unwrap_inlines_webpack_modules_only(self):
+        module = json.dumps('var a = 1;\n\n//# sourceMappingURL=data:application/json;base64,e30=\n//# sourceURL=webpack-internal:///./a.js\n')
+        self.assertEqual(unwrap_webpack_eval(f'function(m) {{ eval({module}); }}'), 'function(m) { var a = 1;\n\n; }')
+        self.assertEqual(unwrap_webpack_eval('eval("1 + 1")'), 'eval("1 + 1")')
+
+    def test_bundle_tags_load_the_built_files(self):
+        load_manifest.cache_clear()
+        self.addCleanup(load_manifest.cache_clear)
+        plain = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}
+        with override_settings(ASSET_BUNDLES=True, STORAGES=plain):
+            html = Template('{% load bundles %}{% bundle_js "base" %}').render(Context())
+        self.assertEqual(html, f'<script src="/static/{self.manifest["bundles"]["base.js"]}"></script>')
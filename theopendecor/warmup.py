@@ -0,0 +1,116 @@
+"""
+Warm-up run when the WSGI/ASGI application is loaded (WARMUP_ON_START).
+
+Django does a lot of its set-up lazily, on the first request that needs it:
+importing every URLconf and view module and building the reverse lookup
+tables, compiling templates into the cached loader, loading translation
+catalogs, reading the static files manifest, building the product
+autocomplete index and opening the database connection. Without warm-up the first request each new worker serves pays
+for all of it. ``warm_up()`` does that work before the worker accepts
+traffic; with a pre-forking server that loads the application before forking
+(``gunicorn --preload``) it is done once and shared by every worker.
+
+Only the project's own templates are compiled (not admin/Jazzmin ones), and
+database connections are closed again so that forked workers never share one.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import DatabaseError, connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def warm_urls():
+    """Import every URLconf and view module and build the reverse lookup tables"""
+    resolver = get_resolver()
+    resolver.reverse_dict  # populated on first access
+    return len(resolver.url_patterns)
+
+
+def project_templates():
+    """(backend, template name) for every template in a directory inside BASE_DIR"""
+    base = Path(settings.BASE_DIR).resolve()
+    for backend in engines.all():
+        for directory in backend.template_dirs:
+            directory = Path(directory).resolve()
+            if not directory.is_dir() or not directory.is_relative_to(base):
+                continue
+            for path in sorted(directory.rglob('*.html')):
+                yield backend, path.relative_to(directory).as_posix()
+
+
+def warm_templates():
+    """Compile the project's templates into each engine's cache; returns how many"""
+    compiled = 0
+    for backend, name in project_templates():
+        try:
+            backend.get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+            # A broken template should fail the request that uses it, not the worker
+            logger.warning('Warm-up could not compile %s: %s', name, error)
+        else:
+            compiled += 1
+    return compiled
+
+
+def warm_translations():
+    """Load the translation catalogs for the default language"""
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Home')
+
+
+def warm_static():
+    """Read the static files manifest, and the asset bundle manifest when bundles are on"""
+    staticfiles_storage.hashed_files  # the manifest is read when the storage is created
+    if settings.ASSET_BUNDLES:
+        from leads.templatetags.bundles import load_manifest
+        load_manifest()
+
+
+def warm_catalog():
+    """Build the product autocomplete index (see leads/catalog.py)"""
+    from leads.catalog import current_index
+    try:
+        return len(current_index())
+    except DatabaseError as error:
+        # Built on the first autocomplete request instead
+        logger.warning('Warm-up could not build the product index: %s', error)
+
+
+def warm_databases():
+    """Import the database backends and check they are reachable, then close the connections again"""
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except DatabaseError as error:
+            # Requests retry the connection themselves; the worker should still start
+            logger.warning('Warm-up could not connect to database %s: %s', connection.alias, error)
+    connections.close_all()
+
+
+STEPS = [
+    ('urls', warm_urls),
+    ('templates', warm_templates),
+    ('translations', warm_translations),
+    ('static', warm_static),
+    ('catalog', warm_catalog),
+    ('databases', warm_databases),
+]
+
+
+def warm_up():
+    """Run every warm-up step; returns {step: milliseconds}"""
+    timings = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        step()
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info('Warm-up finished in %.0f ms: %s', sum(timings.values()), timings)
+    return timings